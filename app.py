@@ -9,12 +9,18 @@ Features:
 - Event forums with comments and JSON API for AJAX
 """
 
-from flask import (Flask, render_template, url_for, request,
-                   redirect, flash, session, send_from_directory, jsonify)
+from flask import (Flask, render_template, url_for, request, g, Response,
+                   redirect, flash, session, send_from_directory, jsonify,
+                   stream_with_context, before_render_template,
+                   template_rendered)
+from jinja2 import FileSystemBytecodeCache
 from werkzeug.utils import secure_filename
+from flask_compress import Compress
+import click
 app = Flask(__name__)
 
 import secrets
+import hashlib
 import cs304dbi as dbi
 from datetime import datetime, timedelta, date
 from functools import wraps
@@ -22,10 +28,26 @@ import event as e
 import profile as profile_db
 import form
 import forum as forum_db
+import validation
+import series as series_db
+import importer
+import archive
+import notify
+import ics
+import search as search_db
 import bcrypt
 from pymysql.err import DataError
 import os
 import imghdr
+import time
+import random
+import threading
+import querylog
+import routing
+import metrics
+import sampler
+from caching import cache
+import caching
 
 app.config['PROFILE_UPLOADS'] = '/students/clump/profile_uploads'
 app.config['UPLOADS'] = '/students/clump/uploads'
@@ -37,17 +59,396 @@ app.secret_key = secrets.token_hex()
 # configure DBI
 print(dbi.conf('clump_db'))
 
+# Read replicas (see routing.py): my.cnf files of replicas of clump_db.
+# With none, everything runs on the primary
+app.config['DB_REPLICA_CNFS'] = []
+# after a write, the user's requests stay on the primary this long, so
+# they never read a replica that hasn't caught up with their write
+app.config['REPLICA_PIN_SECONDS'] = 5
+
 # This gets better error messages for certain common request errors
 app.config['TRAP_BAD_REQUEST_ERRORS'] = True
 
+# Query instrumentation (see querylog.py)
+# statements slower than this are logged along with their EXPLAIN
+app.config['SLOW_QUERY_MS'] = 200
+# add X-Query-Count / X-Query-Time / X-Query-Routes (statements per
+# primary/replica) headers to every response
+app.config['QUERY_STATS_HEADERS'] = False
+# max statements per request, by endpoint name, to catch N+1 regressions.
+# Over budget is logged, and fails the request when app.testing is on
+app.config['QUERY_BUDGETS'] = {
+    'calendar': 2,
+    # events, series, and the series' next occurrences (2)
+    'forum': 4,
+    'view_event_forum': 3,
+    # the user, events, series and created series' next occurrences (2);
+    # 6 on a user's first visit, which creates their feed token
+    'profile': 6,
+    'get_event_details': 4,
+    'get_event_forum': 2,
+    'api_search_events': 2,
+    'api_range_events': 3,
+    # events and series stamps and rows (the series' joined
+    # occurrences are separate for user feeds)
+    'user_feed': 7,
+    'category_feed': 5,
+    'get_comment_thread': 1,
+}
+
+# Longest from..to span /api/events will answer, in days
+app.config['EVENT_RANGE_MAX_DAYS'] = 62
+
+# Longest a weekly series may run, in weeks
+app.config['SERIES_MAX_WEEKS'] = 52
+
+# Most rows one /events/import upload may hold
+app.config['MAX_IMPORT_ROWS'] = 5000
+
+# Calendar feeds (/feeds/...) include events from this many days back
+app.config['FEED_PAST_DAYS'] = 30
+# event times are in this (IANA) time zone: feeds convert them to UTC
+# from it, and imported iCalendar times are converted to it
+app.config['FEED_TIMEZONE'] = 'America/New_York'
+
+# `flask archive-events` moves events older than this many days (with
+# their participants, forum and comments) to the archive tables
+app.config['ARCHIVE_AFTER_DAYS'] = 180
+# events moved per transaction
+app.config['ARCHIVE_BATCH_SIZE'] = 500
+
+# Activity digests (notify.py, `flask send-digests`): pending comments,
+# replies, joins and leaves go out together every this many seconds
+app.config['DIGEST_INTERVAL_SECONDS'] = 15 * 60
+# digests sent per SMTP connection
+app.config['DIGEST_BATCH_SIZE'] = 100
+# most recipients one cycle sends digests to (the rest wait for the next)
+app.config['DIGEST_MAX_RECIPIENTS'] = 1000
+# sent notifications are deleted after this many days
+app.config['DIGEST_KEEP_DAYS'] = 30
+app.config['MAIL_SERVER'] = 'localhost'
+app.config['MAIL_PORT'] = 25
+app.config['MAIL_USE_TLS'] = False
+app.config['MAIL_USERNAME'] = None
+app.config['MAIL_PASSWORD'] = None
+app.config['MAIL_FROM'] = 'Clump <clump@wellesley.edu>'
+# digests link back to the site here
+app.config['SITE_URL'] = 'https://clump.wellesley.edu'
+
+# Results per page for /api/search
+app.config['SEARCH_PAGE_SIZE'] = 20
+
+# Shared cache (see caching.py). On disk, so every gunicorn worker reads
+# the same entries and sees the others' invalidations; point CACHE_DIR at
+# a directory all workers share (or use RedisCache across machines)
+app.config['CACHE_TYPE'] = 'FileSystemCache'
+app.config['CACHE_DIR'] = 'shared_cache'
+# most entries kept before the oldest are pruned
+app.config['CACHE_THRESHOLD'] = 20000
+app.config['CACHE_DEFAULT_TIMEOUT'] = 300
+os.makedirs(app.config['CACHE_DIR'], exist_ok=True)
+# cached profile dashboards also expire after this long, which bounds
+# staleness from changes we don't invalidate on (e.g. a creator renaming)
+app.config['PROFILE_CACHE_SECONDS'] = 300
+cache.init_app(app)
+# {% cache %} fragments (event cards, calendar grid) live this long; their
+# keys include the data's version, so writes never serve a stale one
+app.config['FRAGMENT_CACHE_SECONDS'] = 600
+
+# Anonymous full-page cache (see caching.py and serve_cached_page)
+app.config['PAGE_CACHE_ENDPOINTS'] = {'calendar', 'forum', 'view_event_forum'}
+# a cached page is served as-is for this many seconds...
+app.config['PAGE_CACHE_SECONDS'] = 30
+# ...then, for up to this many more, served stale while one background
+# re-render replaces it
+app.config['PAGE_CACHE_STALE_SECONDS'] = 300
+
+# Response compression (Flask-Compress), negotiated from Accept-Encoding
+app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+# bodies smaller than this (bytes) are sent as they are
+app.config['COMPRESS_MIN_SIZE'] = 1024
+app.config['COMPRESS_MIMETYPES'] = ['text/html', 'text/css',
+                                    'application/javascript',
+                                    'application/json', 'text/calendar']
+Compress(app)
+
+# Faster JSON encoding (see fastjson.py) when orjson is installed
+try:
+    from fastjson import OrjsonProvider
+    app.json = OrjsonProvider(app)
+except ImportError:
+    pass
+
+# Request profiling (see sampler.py), off by default.
+# fraction of requests to profile, e.g. 0.01
+app.config['PROFILE_SAMPLE_RATE'] = 0.0
+# logged in users (by uid) who may profile a request on demand by
+# sending the X-Clump-Profile header
+app.config['PROFILE_ADMIN_UIDS'] = set()
+app.config['PROFILE_DIR'] = 'profiles'
+app.config['PROFILE_INTERVAL_MS'] = 5
+
+# Compiled templates are kept on local disk, shared by every worker on
+# the host, so a recycled worker doesn't recompile them on its first
+# requests. Fill it before starting the workers: flask warm-templates
+app.config['TEMPLATE_CACHE_DIR'] = 'template_cache'
+os.makedirs(app.config['TEMPLATE_CACHE_DIR'], exist_ok=True)
+app.jinja_env.bytecode_cache = FileSystemBytecodeCache(
+    app.config['TEMPLATE_CACHE_DIR'])
+
 # =================
 # HELPER FUNCTIONS 
 # =================
 
 # Helper function to get connection
-def get_conn():
-    """Get database connection"""
-    return dbi.connect()
+def get_conn(fresh=False):
+    """Get the database connection for this request (opened on first use,
+    routed between the primary and replicas by routing.py, instrumented
+    by querylog, closed when the request ends).
+    fresh: the caller caches what it reads for other requests, so the
+    rest of this request reads from the primary (a replica may lag)"""
+    if 'conn' not in g:
+        g.conn = querylog.InstrumentedConnection(
+            routing.RoutingConnection(
+                dbi.connect,
+                routing.replica_connector(app.config['DB_REPLICA_CNFS'],
+                                          'clump_db'),
+                pinned=pinned_to_primary()),
+            slow_ms=app.config['SLOW_QUERY_MS'])
+        g.conn.stats.listeners.append(metrics.record_query)
+        metrics.DB_CONNECTIONS_OPENED.inc()
+        metrics.DB_CONNECTIONS_OPEN.inc()
+    if fresh:
+        g.conn.pin()
+    return g.conn
+
+def pinned_to_primary():
+    """
+    True if this request must not read from a replica: it may write (so
+    its checks must see current data), it fills the page cache, or its
+    user wrote in the last REPLICA_PIN_SECONDS
+    """
+    return (request.method not in ('GET', 'HEAD')
+            or 'page_cache_key' in g
+            or session.get('primary_until', 0) > time.time())
+
+@app.after_request
+def pin_writer_to_primary(response):
+    """After a write, keep the user's next requests on the primary"""
+    conn = g.get('conn')
+    if conn is not None and conn.wrote and app.config['DB_REPLICA_CNFS']:
+        session['primary_until'] = (time.time() +
+                                    app.config['REPLICA_PIN_SECONDS'])
+    return response
+
+@app.before_request
+def start_request_metrics():
+    """Start the latency timer and count the request as in flight"""
+    g.request_start = time.perf_counter()
+    metrics.IN_FLIGHT.labels(endpoint=request.endpoint or 'unknown').inc()
+
+@app.after_request
+def count_response(response):
+    """Count the response by endpoint and status"""
+    metrics.REQUESTS.labels(endpoint=request.endpoint or 'unknown',
+                            status=response.status_code).inc()
+    return response
+
+@app.teardown_request
+def finish_request_metrics(exception):
+    """Record the request latency and take it out of the in-flight gauge"""
+    start = g.pop('request_start', None)
+    if start is None:
+        return
+    endpoint = request.endpoint or 'unknown'
+    metrics.IN_FLIGHT.labels(endpoint=endpoint).dec()
+    metrics.REQUEST_SECONDS.labels(endpoint=endpoint,
+                                   method=request.method).observe(
+                                       time.perf_counter() - start)
+
+@app.after_request
+def report_query_stats(response):
+    """Log this request's query count/time and enforce the query budget"""
+    conn = g.get('conn')
+    if conn is None:
+        return response
+    stats = conn.stats
+    total_ms = stats.total_seconds * 1000
+    metrics.DB_QUERIES_PER_REQUEST.observe(stats.count)
+
+    querylog.logger.info('%s %s: %d queries, %.1f ms', request.method,
+                         request.path, stats.count, total_ms)
+    if app.config['QUERY_STATS_HEADERS']:
+        response.headers['X-Query-Count'] = str(stats.count)
+        response.headers['X-Query-Time'] = f'{total_ms:.1f}ms'
+        response.headers['X-Query-Routes'] = ' '.join(
+            f'{name}={count}' for name, count in sorted(conn.routes.items()))
+
+    budget = app.config['QUERY_BUDGETS'].get(request.endpoint)
+    if budget is not None and stats.count > budget:
+        message = (f'{request.endpoint} ran {stats.count} queries '
+                   f'(budget {budget}): ' +
+                   '; '.join(q.func for q in stats.queries))
+        querylog.logger.warning(message)
+        if app.testing:
+            raise AssertionError(message)
+    return response
+
+@app.before_request
+def start_profiler():
+    """Profile this request if it is sampled, or an admin asked for it"""
+    asked = ('X-Clump-Profile' in request.headers
+             and session.get('uid') in app.config['PROFILE_ADMIN_UIDS'])
+    if asked or random.random() < app.config['PROFILE_SAMPLE_RATE']:
+        g.profiler = sampler.RequestSampler(
+            threading.get_ident(),
+            interval=app.config['PROFILE_INTERVAL_MS'] / 1000)
+        g.profiler.start()
+
+@app.after_request
+def save_profile(response):
+    """Stop the request's profiler (if any) and save its folded stacks"""
+    profiler = g.pop('profiler', None)
+    if profiler is None:
+        return response
+    profiler.stop()
+    path = profiler.save(app.config['PROFILE_DIR'],
+                         request.endpoint or 'unknown')
+    totals = profiler.phase_totals()
+    app.logger.info('profiled %s %s -> %s (%s)', request.method,
+                    request.path, path, dict(totals))
+    if 'X-Clump-Profile' in request.headers:
+        response.headers['X-Clump-Profile'] = os.path.basename(path)
+    return response
+
+@app.teardown_request
+def stop_profiler(exception):
+    """Make sure a failed request doesn't leave its profiler running"""
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.stop()
+
+@app.teardown_appcontext
+def close_conn(exception):
+    """Close the request's database connection, if one was opened"""
+    conn = g.pop('conn', None)
+    if conn is not None:
+        conn.close()
+        metrics.DB_CONNECTIONS_OPEN.dec()
+
+@before_render_template.connect_via(app)
+def start_template_timer(sender, template, context, **extra):
+    """Note when a render_template call starts"""
+    g.setdefault('template_starts', []).append(time.perf_counter())
+
+@template_rendered.connect_via(app)
+def record_template_time(sender, template, context, **extra):
+    """Record how long the template took to render, by template name"""
+    starts = g.get('template_starts')
+    if starts:
+        metrics.TEMPLATE_SECONDS.labels(template=template.name).observe(
+            time.perf_counter() - starts.pop())
+
+# WSGI environ key set by refresh_page so its re-render skips the cache
+# lookup. Not a header: clients can't set it, so they can't skip the cache
+PAGE_REFRESH_ENVIRON = 'clump.page_refresh'
+# Paths with a background refresh running, so each is refreshed once
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+@app.before_request
+def serve_cached_page():
+    """
+    Answer GETs of the public pages by visitors with no session (so no
+    login and no flash messages) from the page cache. Misses fall through
+    and are stored by store_cached_page; stale hits are answered at once
+    and refreshed in the background
+    """
+    if request.method in ('POST', 'DELETE'):
+        # every write route needs a login; anonymous POSTs can't purge
+        g.purge_pages = 'uid' in session
+        return None
+    if (request.method != 'GET' or session
+            or request.endpoint not in app.config['PAGE_CACHE_ENDPOINTS']):
+        return None
+    key = caching.page_key(request.full_path, datetime.now().date())
+    entry = None
+    if not request.environ.get(PAGE_REFRESH_ENVIRON):
+        entry = cache.get(key)
+
+    if entry is None:
+        metrics.PAGE_CACHE.labels(endpoint=request.endpoint,
+                                  result='miss').inc()
+        g.page_cache_key = key
+        return None
+
+    if time.time() - entry['stored'] < app.config['PAGE_CACHE_SECONDS']:
+        result = 'hit'
+    else:
+        result = 'stale'
+        refresh_page_later(request.full_path)
+    metrics.PAGE_CACHE.labels(endpoint=request.endpoint, result=result).inc()
+    response = Response(entry['body'], status=entry['status'],
+                        mimetype=entry['mimetype'])
+    response.headers['X-Page-Cache'] = result.upper()
+    return response
+
+@app.after_request
+def store_cached_page(response):
+    """Save a page that serve_cached_page missed, if still anonymous"""
+    key = g.pop('page_cache_key', None)
+    if key and response.status_code == 200 and not session:
+        cache.set(key, {'body': response.get_data(),
+                        'status': response.status_code,
+                        'mimetype': response.mimetype,
+                        'stored': time.time()},
+                  timeout=app.config['PAGE_CACHE_SECONDS'] +
+                          app.config['PAGE_CACHE_STALE_SECONDS'])
+        response.headers['X-Page-Cache'] = 'MISS'
+    return response
+
+@app.after_request
+def purge_pages_after_write(response):
+    """Any successful write may change a public page, so drop them all"""
+    if g.pop('purge_pages', False) and response.status_code < 400:
+        caching.purge_pages()
+    return response
+
+def refresh_page_later(full_path):
+    """Re-render a stale cached page on a background thread"""
+    with _refreshing_lock:
+        if full_path in _refreshing:
+            return
+        _refreshing.add(full_path)
+    threading.Thread(target=refresh_page, args=(full_path,),
+                     daemon=True).start()
+
+def refresh_page(full_path):
+    """
+    Run an anonymous GET of full_path through the app (hooks included),
+    so store_cached_page saves the fresh page
+    """
+    try:
+        with app.test_request_context(
+                full_path, environ_base={PAGE_REFRESH_ENVIRON: True}):
+            app.full_dispatch_request()
+    except Exception:
+        app.logger.exception('refreshing cached page %s failed', full_path)
+    finally:
+        with _refreshing_lock:
+            _refreshing.discard(full_path)
+
+# Helper function to save an uploaded photo
+def save_upload(f, folder, filename, kind):
+    """Save upload f as folder/filename (read-only) and record its size
+    and save time under the given kind ('event' or 'profile')"""
+    start = time.perf_counter()
+    pathname = os.path.join(app.config[folder], filename)
+    f.save(pathname)
+    os.chmod(pathname, 0o444)  # readable by all team members
+    metrics.UPLOAD_SECONDS.labels(kind=kind).observe(
+        time.perf_counter() - start)
+    metrics.UPLOAD_BYTES.labels(kind=kind).observe(os.path.getsize(pathname))
 
 # Helper function to require login
 def login_required(f):
@@ -70,6 +471,187 @@ def to_time(t):
         t += ":00"
     return datetime.strptime(t, "%H:%M:%S").time()
 
+# Helper functions for the cached profile dashboard
+def load_profile_dashboard(uid):
+    """
+    Return (user, created_events, joined_events) for the profile page,
+    from the cache when possible (a hit needs no database connection).
+    Times are formatted before caching
+    """
+    key = caching.profile_key(uid)
+    dashboard = cache.get(key)
+    if dashboard is None:
+        user, created_events, joined_events = \
+            profile_db.get_profile_dashboard(get_conn(fresh=True), uid)
+        for evt in created_events + joined_events:
+            evt['start_formatted'] = e.format_time(evt.get('start'))
+            evt['end_formatted'] = e.format_time(evt.get('end'))
+        dashboard = (user, created_events, joined_events)
+        cache.set(key, dashboard, timeout=app.config['PROFILE_CACHE_SECONDS'])
+    return dashboard
+
+def event_profile_uids(conn, eid):
+    """
+    uids whose profile dashboards show event eid: its participants
+    (the creator is always one). Call before deleting the event
+    """
+    return forum_db.get_participant_uids(conn, eid)
+
+# Helper functions to shape the JSON API payloads. Shared with
+# async_api.py so both API tiers answer with identical bodies
+def build_event_response(event_data, participants, current_count, uid):
+    """
+    Build the event side panel payload from an event row, its
+    participants and the participant count, for the user uid (or None)
+    """
+    # Check if current user is logged in AND is creator
+    logged_in = uid is not None
+    is_creator = logged_in and uid == event_data['addedBy']
+    is_participant = False
+
+    if logged_in:
+        # Check if user is already a participant
+        is_participant = any(p['uid'] == uid for p in participants)
+    
+    # Check if event has passed
+    event_has_passed = event_data['date'] < datetime.now().date()
+    
+    # Format the response
+    return {
+        'eid': event_data['eid'],
+        # set instead of eid for an occurrence of a series (series.py)
+        'sid': event_data.get('sid'),
+        'title': event_data['title'],
+        'date': event_data['date'].strftime('%A, %B %d, %Y'),
+        'start': e.format_time(event_data['start']),
+        'end': e.format_time(event_data['end']),
+        'desc': event_data['desc'],
+        'city': event_data['city'],
+        'state': event_data['state'],
+        'cap': event_data['cap'],
+        'current_participants': current_count,
+        'flexible': event_data['flexible'],
+        'category': event_data['category'],
+        'creator_name': event_data['creator_name'],
+        'addedBy': event_data['addedBy'],
+        'logged_in': logged_in,
+        'is_creator': is_creator,
+        'is_participant': is_participant,
+        'event_has_passed': event_has_passed,
+        'participants': [{
+                'uid': p['uid'],
+                'name': p['name'],
+                'year': p['year'],
+                'pronouns': p['pronouns']
+            } for p in participants
+        ]
+    }
+
+def photo_url(endpoint, **values):
+    """
+    The path of a photo route (event_photo or series_photo), built from
+    the app's url_map instead of url_for so async_api.py, which has no
+    Flask request context, builds the same one
+    """
+    return app.url_map.bind('').build(endpoint, values)
+
+def api_etag(*parts):
+    """ETag built from version stamp parts, without building the payload"""
+    key = '|'.join(str(part) for part in parts)
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:24]
+
+def event_etag(eid, stamp, uid):
+    """
+    ETag of the /api/event/<eid> payload for user uid (or None), from
+    event.get_event_stamp. Today's date is part of it because
+    event_has_passed flips at midnight with no write to the event
+    """
+    return api_etag('event', eid, stamp['updated_at'],
+                    stamp['participant_rev'], uid, datetime.now().date())
+
+def occurrence_etag(sid, day, stamp, uid):
+    """
+    ETag of the /api/series/<sid>/<day> payload for user uid (or None),
+    from series.get_occurrence_stamp, like event_etag
+    """
+    return api_etag('occurrence', sid, day, stamp['updated_at'],
+                    stamp['exception_updated_at'], stamp['joined'],
+                    stamp['joined_checksum'], uid, datetime.now().date())
+
+def forum_etag(stamp, uid, compact=False):
+    """ETag of the /api/event/<eid>/forum payload, from forum.get_forum_stamp"""
+    return api_etag('forum', stamp['fid'], stamp['comment_rev'], uid, compact)
+
+# Keys of each comment in the forum payload; with ?format=compact each
+# comment is instead a list of these values, in this order
+COMMENT_FIELDS = ['commId', 'text', 'author_name', 'author_uid', 'postedAt',
+                  'parent_commId']
+
+def event_version(evt):
+    """
+    Identity and version of an event row or series occurrence (see
+    series.py), for ETags and fragment keys over a list of them
+    """
+    if evt.get('sid'):
+        return (f"s{evt['sid']}:{evt['date']}:{evt['start']}:{evt['end']}:"
+                f"{evt['updated_at']}")
+    return f"{evt['eid']}:{evt['updated_at']}"
+
+@app.template_global()
+def event_api_url(evt):
+    """API path of an event row or of one occurrence of a series"""
+    if evt.get('sid'):
+        return url_for('get_occurrence_details', sid=evt['sid'],
+                       day=evt['date'].isoformat())
+    return url_for('get_event_details', eid=evt['eid'])
+
+@app.template_global()
+def fragment_key(*parts):
+    """
+    Version key for a {% cache %} template fragment, from the stamps of
+    the data it shows (e.g. eid, updated_at, participant_rev)
+    """
+    return '|'.join(str(part) for part in parts)
+
+def comment_values(comment):
+    """A comment row's COMMENT_FIELDS values, ready for JSON"""
+    posted_at = comment['postedAt']
+
+    if posted_at:
+        posted_at_value = posted_at.isoformat()
+    else:
+        posted_at_value = None
+
+    return [comment['commId'], comment['text'], comment['author_name'],
+            comment['author_uid'], posted_at_value,
+            comment.get('parent_commId')]
+
+def build_forum_response(fid, comments, uid, compact=False):
+    """
+    Build the forum payload from comment rows, for the user uid (or None).
+    compact: send comments as value lists under a single 'fields' header
+    instead of one dictionary per comment
+    """
+    # Format comments for JSON response
+    formatted_comments = []
+    for comment in comments:
+        values = comment_values(comment)
+        if compact:
+            formatted_comments.append(values)
+        else:
+            formatted_comments.append(dict(zip(COMMENT_FIELDS, values)))
+    
+    response = {
+        'fid': fid,
+        'comments': formatted_comments,
+        'logged_in': uid is not None,
+        'current_uid': uid,
+        'comment_count': len(formatted_comments)
+    }
+    if compact:
+        response['fields'] = COMMENT_FIELDS
+    return response
+
 # ==========
 # APP ROUTES
 # ==========
@@ -112,20 +694,22 @@ def calendar(date_str=None):
     # Get category filter from query params
     category_filter = request.args.get('category')
     
-    # Fetch ALL events for the week
-    events = e.get_week_events(conn, start_of_week, end_of_week)
-
-    # Filter by category if specified
-    if category_filter and category_filter != 'all':
-        events = [evt for evt in events if evt['category'] == category_filter]
+    # Fetch the week's events (in the chosen category, if any)
+    events = e.get_week_events(
+        conn, start_of_week, end_of_week,
+        category_filter if category_filter != 'all' else None)
 
     # Get today's date for highlighting
     today = datetime.now().date()
 
     # Get logged in status
     logged_in = 'uid' in session
+
+    # The grid fragment is cached under the week's event versions
+    grid_version = api_etag(*(event_version(evt) for evt in events))
     
     return render_template('calendar.html', 
+                         grid_version=grid_version,
                          page_title='Calendar Home',
                          events=events,
                          week_start=start_of_week,
@@ -167,6 +751,7 @@ def create_event():
     desc = request.form.get('event-desc', '').strip()
     cap_str = request.form.get('event-cap', '').strip()
     cid_str = request.form.get('event-cid', '').strip()
+    repeat_str = request.form.get('event-repeat-until', '').strip()
 
     filename = None
     f = request.files.get('event-photo')
@@ -180,75 +765,16 @@ def create_event():
             f'event_{uid}_{secrets.token_hex(8)}.{ext}'
         )
 
-    error = False
-
-    # LENGTH VALIDATIONS 
-    if len(title) > 30:
-        flash("Title must be 30 characters or less.", 'error')
-        error = True
-    if len(city) > 30:
-        flash("City must be 30 characters or less.", 'error')
-        error = True
-    if len(state) > 20:
-        flash("State must be 20 characters or less.", 'error')
-        error = True
-    if desc and len(desc) > 300:
-        flash("Description must be 300 characters or less.", 'error')
-        error = True
-
-    #required field checks 
-    if not title:
-        flash("Title is required.", 'error')
-        error = True
-    if not date_str:
-        flash("Date is required.", 'error')
-        error = True
-    if not start_str:
-        flash("Start time is required.", 'error')
-        error = True
-    if not end_str:
-        flash("End time is required.", 'error')
-        error = True
-    if not city:
-        flash("City is required.", 'error')
-        error = True
-    if not state:
-        flash("State is required.", 'error')
-        error = True
-    if not cid_str:
-        flash("Category is required.", 'error')
-        error = True
-
-    # TIME VALIDATION 
-    if start_str and end_str and start_str > end_str:
-        flash("End time cannot be before start time.", 'error')
-        error = True
-
-    #capacity handling that defaults to 10 
-    cap = None
-    if cap_str:
-        try:
-            cap = int(cap_str)
-            if cap < 2:
-                flash("Capacity must be at least 2.", 'error')
-                error = True
-            elif cap > 10000:
-                flash("Capacity cannot exceed 10,000.", 'error')
-                error = True
-        except (ValueError, OverflowError):
-            flash("Capacity must be a valid positive integer.", 'error')
-            error = True
-    else:
-        cap = 10
-
-    #checking valid category 
-    cid = None
-    if cid_str:
-        if cid_str.isnumeric():
-            cid = int(cid_str)
-        else:
-            flash("Invalid category.", 'error')
-            error = True
+    # same rules as the bulk importer (see validation.py)
+    cap, cid, start_str, end_str, errors = validation.validate_event(
+        title, date_str, start_str, end_str, city, state, desc,
+        cap_str, cid_str)
+    if repeat_str:
+        errors += validation.validate_repeat(
+            date_str, repeat_str, app.config['SERIES_MAX_WEEKS'])
+    for message in errors:
+        flash(message, 'error')
+    error = bool(errors)
 
     # if a file was provided, verify it is actually an image before saving
     if f and f.filename:
@@ -273,7 +799,8 @@ def create_event():
             state=state,
             desc=desc,
             cap=cap_str,
-            cid=cid
+            cid=cid,
+            repeat_until=repeat_str
         )
     
     # Get flexible checkbox value
@@ -281,20 +808,27 @@ def create_event():
 
     # Save uploaded file (only after validations pass)
     if filename:
-        pathname = os.path.join(app.config['UPLOADS'], filename)
-        f.save(pathname)
-        os.chmod(pathname, 0o444)  # readable by all team members
+        save_upload(f, 'UPLOADS', filename, 'event')
 
     try:
-        #insert event and auto-add creator 
-        eid = form.insert_event(
-            conn,
-            title, date_str, start_str, end_str,
-            desc, uid, city, state, cap, 
-            flexible=flexible, cid=cid, filename=filename
-        )
+        if repeat_str:
+            # one series row; occurrences are expanded when shown
+            series_db.insert_series(
+                conn,
+                title, date_str, repeat_str, start_str, end_str,
+                desc, uid, city, state, cap,
+                flexible=flexible, cid=cid, filename=filename
+            )
+        else:
+            #insert event and auto-add creator (one transaction)
+            form.insert_event(
+                conn,
+                title, date_str, start_str, end_str,
+                desc, uid, city, state, cap, 
+                flexible=flexible, cid=cid, filename=filename
+            )
 
-        form.add_participant(conn, eid, uid)
+        caching.invalidate_profiles([uid])
 
     except DataError:
         flash("Title is too long. Please shorten it.", "error")
@@ -310,13 +844,44 @@ def create_event():
             state=state,
             desc=desc,
             cap=cap_str,
-            cid=cid
+            cid=cid,
+            repeat_until=repeat_str
         )
 
     flash("Event created and you have been added as a participant.", 
           'success')
     return redirect(url_for('calendar'))
 
+@app.route('/events/import', methods=['POST'])
+@login_required
+def import_events():
+    """
+    Create many events at once from an uploaded CSV or iCalendar file
+    (form field 'file'; see importer.py for the columns). Every row is
+    checked with the create event rules. Returns JSON: how many rows
+    were read and created, the new eids, and each bad row's errors
+    """
+    uid = session['uid']
+    f = request.files.get('file')
+    if not f or not f.filename:
+        return jsonify({'error': 'Choose a .csv or .ics file'}), 400
+    try:
+        rows = importer.read_rows(f.filename, f.read(),
+                                  app.config['FEED_TIMEZONE'])
+    except UnicodeDecodeError:
+        return jsonify({'error': 'Import files must be UTF-8 text'}), 400
+    except ValueError as err:
+        return jsonify({'error': str(err)}), 400
+    if len(rows) > app.config['MAX_IMPORT_ROWS']:
+        return jsonify({'error': f"Import at most "
+                        f"{app.config['MAX_IMPORT_ROWS']} events at a "
+                        f"time"}), 400
+
+    report = importer.import_rows(get_conn(), uid, rows)
+    if report['created']:
+        caching.invalidate_profiles([uid])
+    return jsonify(report)
+
 @app.route('/forum')
 def forum():
     """Display main forum page with all events and their forums"""
@@ -326,14 +891,9 @@ def forum():
         # Get show_past parameter from query string (default False)
         show_past = request.args.get('show_past', 'false').lower() == 'true'
         
-        # Get all events with their forums
+        # Get all events with their forums (rows format their own times)
         events = forum_db.get_all_events_with_forums(conn, show_past)
         
-        # Format times for each event
-        for evt in events:
-            evt['start_formatted'] = e.format_time(evt.get('start'))
-            evt['end_formatted'] = e.format_time(evt.get('end'))
-        
         return render_template('forum.html', 
                                page_title='Forum', 
                                events=events, 
@@ -364,12 +924,14 @@ def view_event_forum(eid):
         evt['end_formatted'] = e.format_time(evt.get('end'))
         
         # Get participants
-        participants = forum_db.get_event_participants(conn, eid)
+        participants = forum_db.get_event_participants(conn, eid,
+                                                       evt['archived'])
         evt['participants'] = participants
         evt['participant_count'] = len(participants)
         
         # Get comments for this forum
-        comments = forum_db.get_forum_comments(conn, evt['fid'])
+        comments = forum_db.get_forum_comments(conn, evt['fid'],
+                                               evt['archived'])
 
         # Get today's date for comparison
         today = datetime.now().date()
@@ -446,6 +1008,7 @@ def join_event(eid):
         
         # Check if already joined
         if forum_db.is_user_participant(conn, eid, session['uid']):
+            metrics.JOINS.labels(outcome='duplicate').inc()
             flash('You have already joined this event', 'error')
             next_url = request.args.get('next') or url_for(
                 'view_event_forum', eid=eid)
@@ -455,8 +1018,11 @@ def join_event(eid):
         success = forum_db.add_participant(conn, eid, session['uid'])
         
         if success:
+            metrics.JOINS.labels(outcome='success').inc()
+            caching.invalidate_profiles([session['uid'], event['addedBy']])
             flash('Successfully joined the event!', 'success')
         else:
+            metrics.JOINS.labels(outcome='full').inc()
             flash('Event is full', 'error')
         
         next_url = request.args.get('next') or url_for(
@@ -487,6 +1053,7 @@ def leave_event(eid):
         
         # Remove participant
         forum_db.remove_participant(conn, eid, session['uid'])
+        caching.invalidate_profiles([session['uid'], creator_uid])
         
         flash('Successfully left the event', 'success')
 
@@ -660,13 +1227,12 @@ def edit_event(eid):
             )
         
         if new_filename:
-            pathname = os.path.join(app.config['UPLOADS'], new_filename)
-            f.save(pathname)
-            os.chmod(pathname, 0o444)
+            save_upload(f, 'UPLOADS', new_filename, 'event')
 
         # Update event in database
         e.update_event(conn, eid, title, desc, date_str, start_str, end_str,
                        city, state, cap, flexible, cid, filename=new_filename)
+        caching.invalidate_profiles(event_profile_uids(conn, eid))
 
         flash('Event updated successfully', 'success')
         return redirect(url_for('view_event_forum', eid=eid))
@@ -694,9 +1260,15 @@ def delete_event(eid):
         if event['addedBy'] != session['uid']:
             flash('You can only delete your own events', 'error')
             return redirect(url_for('view_event_forum', eid=event['eid']))
+
+        if event['archived']:
+            flash('Archived events cannot be deleted', 'error')
+            return redirect(url_for('view_event_forum', eid=eid))
         
         # Delete event
+        affected_uids = event_profile_uids(conn, eid)
         e.delete_event_by_id(conn, eid)
+        caching.invalidate_profiles(affected_uids)
         
         flash('Event deleted successfully', 'success')
         return redirect(url_for('forum'))
@@ -705,6 +1277,162 @@ def delete_event(eid):
         flash(f'Error deleting event: {str(ex)}', 'error')
         return redirect(url_for('forum'))
 
+# A recurring series (series.py) is edited and deleted as a whole from
+# its own form; one occurrence can also be moved to other times there
+
+@app.route('/series/<int:sid>/edit', methods=['GET', 'POST'])
+@login_required
+def edit_series(sid):
+    """
+    Edit a whole series (only for its creator). With ?day=YYYY-MM-DD the
+    form also offers moving that one occurrence
+    """
+    conn = get_conn()
+    categories = form.get_categories(conn)
+
+    series = series_db.get_series_by_id(conn, sid)
+    if not series:
+        flash('Event not found', 'error')
+        return redirect(url_for('calendar'))
+
+    if series['addedBy'] != session['uid']:
+        flash('You can only edit your own events', 'error')
+        return redirect(url_for('calendar'))
+
+    if series['last_date'] < datetime.now().date():
+        flash('Cannot edit past events', 'error')
+        return redirect(url_for('calendar'))
+
+    found = find_occurrence(conn, sid, request.args.get('day', ''))
+    occurrence = found[2] if found else None
+
+    if request.method == 'POST':
+        title = request.form.get('title', '').strip()
+        desc = request.form.get('desc', '').strip()
+        start_str = request.form.get('start', '').strip()
+        end_str = request.form.get('end', '').strip()
+        city = request.form.get('city', '').strip()
+        state = request.form.get('state', '').strip()
+        cap_str = request.form.get('cap', '').strip()
+        flexible = request.form.get('flexible') == 'on'
+        cid_str = request.form.get('cid', '').strip()
+        repeat_str = request.form.get('repeat_until', '').strip()
+
+        # the first date stays: occurrences are joined by date
+        first_str = series['first_date'].isoformat()
+        cap, cid, start_str, end_str, errors = validation.validate_event(
+            title, first_str, start_str, end_str, city, state, desc,
+            cap_str, cid_str)
+        errors += validation.validate_repeat(
+            first_str, repeat_str, app.config['SERIES_MAX_WEEKS'])
+        for message in errors:
+            flash(message, 'error')
+        error = bool(errors)
+
+        # optional replacement photo upload
+        new_filename = None
+        f = request.files.get('event-photo')
+        if f and f.filename:
+            ext = f.filename.split('.')[-1].lower()
+            new_filename = secure_filename(
+                f'event_{session["uid"]}_{secrets.token_hex(8)}.{ext}'
+            )
+            if imghdr.what(f) not in ('jpeg', 'png', 'gif', 'jpg'):
+                flash('Uploaded file is not a supported image type.', 'error')
+                error = True
+
+        if error:
+            # keep what the user typed
+            series.update(title=title, desc=desc, start=start_str,
+                          end=end_str, city=city, state=state, cap=cap,
+                          cid=cid, last_date=repeat_str)
+            return render_template('edit_event.html',
+                                   page_title='Edit Event',
+                                   categories=categories,
+                                   event=series,
+                                   occurrence=occurrence)
+
+        if new_filename:
+            save_upload(f, 'UPLOADS', new_filename, 'event')
+
+        # read first: a shorter series loses the later joins
+        affected_uids = series_db.get_series_profile_uids(conn, series)
+        series_db.update_series(conn, sid, title, desc, repeat_str,
+                                start_str, end_str, city, state, cap,
+                                flexible, cid, filename=new_filename)
+        caching.invalidate_profiles(affected_uids)
+
+        flash('Event updated successfully', 'success')
+        return redirect(url_for('calendar'))
+
+    return render_template('edit_event.html',
+                           page_title='Edit Event',
+                           categories=categories,
+                           event=series,
+                           occurrence=occurrence)
+
+@app.route('/series/<int:sid>/<day>/move', methods=['POST'])
+@login_required
+def move_occurrence(sid, day):
+    """Give one occurrence of a series other times (only for its creator)"""
+    conn = get_conn()
+    found = find_occurrence(conn, sid, day)
+    if not found:
+        flash('Event not found', 'error')
+        return redirect(url_for('calendar'))
+    series, day, occurrence = found
+
+    if series['addedBy'] != session['uid']:
+        flash('You can only edit your own events', 'error')
+        return redirect(url_for('calendar', date_str=day.isoformat()))
+
+    if day < datetime.now().date():
+        flash('Cannot edit past events', 'error')
+        return redirect(url_for('calendar', date_str=day.isoformat()))
+
+    start = validation.parse_time(request.form.get('start', '').strip())
+    end = validation.parse_time(request.form.get('end', '').strip())
+    if start is None or end is None:
+        flash('Start and end times are required.', 'error')
+    elif start > end:
+        flash('End time cannot be before start time.', 'error')
+    else:
+        series_db.move_occurrence(conn, sid, day, start.strftime('%H:%M'),
+                                  end.strftime('%H:%M'))
+        caching.invalidate_profiles(
+            [p['uid'] for p in
+             series_db.get_occurrence_participants(conn, series, day)])
+        flash('Event updated successfully', 'success')
+        return redirect(url_for('calendar', date_str=day.isoformat()))
+    return redirect(url_for('edit_series', sid=sid, day=day.isoformat()))
+
+@app.route('/series/<int:sid>/delete', methods=['POST'])
+@login_required
+def delete_series(sid):
+    """Delete a whole series, every occurrence (only for its creator)"""
+    try:
+        conn = get_conn()
+        series = series_db.get_series_by_id(conn, sid)
+
+        if not series:
+            flash('Event not found', 'error')
+            return redirect(url_for('calendar'))
+
+        if series['addedBy'] != session['uid']:
+            flash('You can only delete your own events', 'error')
+            return redirect(url_for('calendar'))
+
+        affected_uids = series_db.get_series_profile_uids(conn, series)
+        series_db.delete_series(conn, sid)
+        caching.invalidate_profiles(affected_uids)
+
+        flash('Event deleted successfully', 'success')
+        return redirect(url_for('calendar'))
+
+    except Exception as ex:
+        flash(f'Error deleting event: {str(ex)}', 'error')
+        return redirect(url_for('calendar'))
+
 @app.route('/forum/comment/<int:commId>/delete', methods=['POST'])
 @login_required
 def delete_comment(commId):
@@ -723,7 +1451,7 @@ def delete_comment(commId):
             flash('You can only delete your own comments', 'error')
             return redirect(url_for('view_event_forum', eid=comment['eid']))
         
-        # Delete comment
+        # Delete the comment and its replies
         forum_db.delete_comment_by_id(conn, commId)
         
         flash('Comment deleted successfully', 'success')
@@ -906,44 +1634,24 @@ def logout():
 def profile():
     """View user profile"""
     try:
-        conn = get_conn()
-
-        # Get show_past parameter (default False)
-        show_past_created = request.args.get('show_past_created', 
-                                             'false').lower() == 'true'
-        show_past_joined = request.args.get('show_past_joined', 
-                                            'false').lower() == 'true'
-        
-        # Get user info
-        user = profile_db.get_user_profile(conn, session['uid'])
-        
-        # Get user's events (as creator)
-        created_events = profile_db.get_user_created_events(conn, 
-                                                             session['uid'],
-                                                             show_past_created)
-        
-        # Get events user is participating in
-        joined_events = profile_db.get_user_joined_events(conn, 
-                                                           session['uid'],
-                                                           show_past_joined)
+        # Get user info and their upcoming created / joined events.
+        # Past events are paged in by profile.js from the API below
+        user, created_events, joined_events = load_profile_dashboard(
+            session['uid'])
 
-        # Format times for created events
-        for evt in created_events:
-            evt['start_formatted'] = e.format_time(evt.get('start'))
-            evt['end_formatted'] = e.format_time(evt.get('end'))
-        
-        # Format times for joined events
-        for evt in joined_events:
-            evt['start_formatted'] = e.format_time(evt.get('start'))
-            evt['end_formatted'] = e.format_time(evt.get('end'))
+        feed_token = user['feed_token']
+        if not feed_token:
+            feed_token = profile_db.create_feed_token(get_conn(),
+                                                      session['uid'])
+            caching.invalidate_profiles([session['uid']])
         
         return render_template('profile.html', 
                              page_title='Profile',
+                             feed_url=url_for('user_feed', token=feed_token,
+                                              _external=True),
                              user=user,
                              created_events=created_events,
-                             joined_events=joined_events,
-                             show_past_created=show_past_created,
-                             show_past_joined=show_past_joined)
+                             joined_events=joined_events)
     
     except Exception as ex:
         flash(f'Error loading profile: {str(ex)}', 'error')
@@ -1058,10 +1766,10 @@ def edit_profile():
         session['name'] = name
 
         if new_filename:
-            pathname = os.path.join(app.config['PROFILE_UPLOADS'], new_filename)
-            f.save(pathname)
-            os.chmod(pathname, 0o444)
+            save_upload(f, 'PROFILE_UPLOADS', new_filename, 'profile')
             profile_db.upsert_profile_photo(conn, session['uid'], new_filename)
+
+        caching.invalidate_profiles([session['uid']])
         
         flash('Profile updated successfully', 'success')
         return redirect(url_for('profile'))
@@ -1081,8 +1789,13 @@ def delete_account():
         uid = session['uid']
         name = session.get('name', 'User')
         
+        # whose dashboards show the account's events, found before the
+        # cascade removes them
+        affected_uids = profile_db.get_account_profile_uids(conn, uid)
+
         # Delete user (CASCADE will handle events, participants, comments)
         profile_db.delete_user(conn, uid)
+        caching.invalidate_profiles(affected_uids)
         
         # Clear session
         session.clear()
@@ -1117,6 +1830,118 @@ def event_photo(eid):
     return send_from_directory(app.config['UPLOADS'], filename)
 
 
+@app.route('/series-photo/<int:sid>')
+def series_photo(sid):
+    """Serve a series' uploaded photo (if any)."""
+    series = series_db.get_series_by_id(get_conn(), sid)
+    filename = series['filename'] if series else None
+
+    if not filename or '/' in filename or '\\' in filename or '..' in filename:
+        return Response('No photo', status=404, mimetype='text/plain')
+
+    return send_from_directory(app.config['UPLOADS'], filename)
+
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus scrape endpoint (see metrics.py)"""
+    body, content_type = metrics.render()
+    return Response(body, content_type=content_type)
+
+
+# ==============
+# CALENDAR FEEDS
+# ==============
+
+@app.route('/feeds/user/<token>.ics')
+def user_feed(token):
+    """
+    (Public, by secret token) iCalendar feed of the events a user joined
+    or created, for calendar apps to subscribe to. The token is shown
+    on the profile page
+    """
+    uid = profile_db.get_uid_by_feed_token(get_conn(), token)
+    if uid is None:
+        return Response('Unknown feed', status=404, mimetype='text/plain')
+    return feed_response('clump: my events', uid=uid)
+
+@app.route('/feeds/category/<category>.ics')
+def category_feed(category):
+    """
+    (Public) iCalendar feed of the events in one calendar category, or
+    in every category for 'all'
+    """
+    if category == 'all':
+        return feed_response('clump events')
+    conn = get_conn()
+    if category not in {row['category'] for row in
+                        form.get_categories(conn)}:
+        return Response('Unknown category', status=404,
+                        mimetype='text/plain')
+    return feed_response(f'clump: {category}', category=category)
+
+def feed_response(name, uid=None, category=None):
+    """
+    Stream a feed's events (see event.feed_query) and series occurrences
+    (series.get_feed_occurrences) as an iCalendar file, or answer 304 if
+    the calendar app's copy is current. Calendar apps poll every few
+    minutes, so unchanged feeds cost a few small queries
+    """
+    conn = get_conn()
+    today = date.today()
+    since = today - timedelta(days=app.config['FEED_PAST_DAYS'])
+    # today is part of it because the window moves at midnight
+    etag = api_etag('feed', name,
+                    e.get_feed_stamp(conn, since, uid, category),
+                    series_db.get_feed_stamp(conn, since, uid, category),
+                    today)
+    if request.if_none_match.contains_weak(etag):
+        return revalidate_headers(Response(status=304), etag)
+
+    # read before the events, which stream on the connection
+    occurrences = series_db.get_feed_occurrences(conn, since, uid, category)
+    rows = series_db.merge_by_time(
+        e.iter_feed_events(conn, since, uid, category), occurrences)
+    tzid = app.config['FEED_TIMEZONE']
+    host = request.host
+
+    def generate():
+        yield ics.calendar_start(name, tzid)
+        for evt in rows:
+            end = None
+            if evt['start'] is None:
+                # no start time: an all-day event
+                start = evt['date']
+            else:
+                day = datetime.combine(evt['date'], datetime.min.time())
+                start = day + evt['start']
+                if evt['end'] is not None and evt['end'] >= evt['start']:
+                    end = day + evt['end']
+            if evt.get('sid'):
+                # an occurrence: its panel is on the calendar's week
+                uid_part = f"series-{evt['sid']}-{evt['date'].isoformat()}"
+                url = url_for('calendar', date_str=evt['date'].isoformat(),
+                              _external=True)
+            else:
+                uid_part = f"event-{evt['eid']}"
+                url = url_for('view_event_forum', eid=evt['eid'],
+                              _external=True)
+            yield ics.vevent(
+                f'{uid_part}@{host}', evt['updated_at'],
+                start, end, tzid,
+                summary=evt['title'],
+                description=evt['desc'],
+                location=f"{evt['city']}, {evt['state']}",
+                categories=evt['category'],
+                url=url,
+                x_clump_capacity=evt['cap'])
+        yield ics.CALENDAR_END
+
+    return revalidate_headers(
+        Response(stream_with_context(generate()),
+                 mimetype='text/calendar'), etag)
+
+
 # =======================
 # API ENDPOINTS FOR AJAX
 # =======================
@@ -1129,11 +1954,20 @@ def get_event_details(eid):
     returning JSON for the event side panel
     """
     conn = get_conn()
+    uid = session.get('uid')
+
+    # A client revalidating its copy only costs the version stamp query
+    stamp = e.get_event_stamp(conn, eid)
+    if not stamp: # If event DNE
+        return jsonify({'error': 'Event not found'}), 404
+    etag = event_etag(eid, stamp, uid)
+    if request.if_none_match.contains_weak(etag):
+        return revalidate_headers(Response(status=304), etag)
     
     # Get event details using event.py module
     event_data = e.get_event_by_id(conn, eid)
     
-    if not event_data: # If event DNE
+    if not event_data: # Deleted since the stamp was read
         return jsonify({'error': 'Event not found'}), 404
     
     # Get all participants for event
@@ -1142,54 +1976,201 @@ def get_event_details(eid):
     # Get participant count
     current_count = e.get_participant_count(conn, eid)
 
-    # Check if current user is logged in AND is creator
-    logged_in = 'uid' in session
-    is_creator = logged_in and session.get('uid') == event_data['addedBy']
-    is_participant = False
+    response = build_event_response(event_data, participants, current_count,
+                                    uid)
 
-    if logged_in:
-        # Check if user is already a participant
-        is_participant = any(p['uid'] == session['uid'] for p in participants)
-    
-    # Check if event has passed
-    event_has_passed = event_data['date'] < datetime.now().date()
-    
-    # Format the response
-    response = {
-        'eid': event_data['eid'],
-        'title': event_data['title'],
-        'date': event_data['date'].strftime('%A, %B %d, %Y'),
-        'start': e.format_time(event_data['start']),
-        'end': e.format_time(event_data['end']),
-        'desc': event_data['desc'],
-        'city': event_data['city'],
-        'state': event_data['state'],
-        'cap': event_data['cap'],
-        'current_participants': current_count,
-        'flexible': event_data['flexible'],
-        'category': event_data['category'],
-        'creator_name': event_data['creator_name'],
-        'addedBy': event_data['addedBy'],
-        'logged_in': logged_in,
-        'is_creator': is_creator,
-        'is_participant': is_participant,
-        'event_has_passed': event_has_passed,
-        'participants': [{
-                'uid': p['uid'],
-                'name': p['name'],
-                'year': p['year'],
-                'pronouns': p['pronouns']
-            } for p in participants
-        ]
-    }
-
-    photo_url = None
+    response['photo_url'] = None
     if event_data.get('filename'):
-        photo_url = url_for('event_photo', eid=eid)
+        response['photo_url'] = photo_url('event_photo', eid=eid)
+
+    return revalidate_headers(jsonify(response), etag)
+
+def revalidate_headers(response, etag=None):
+    """
+    Let the browser (and calendar.js) keep a copy of a per-user API
+    response, but check back with its ETag before every reuse. The ETag
+    is weak so it survives compression (Flask-Compress rewrites strong
+    ones per encoding); match it with if_none_match.contains_weak
+    """
+    if etag is not None:
+        response.set_etag(etag, weak=True)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+def past_events_page(fetch_page, fields):
+    """
+    Shared body of the past-events API endpoints. fetch_page is one of
+    the profile.get_user_past_*_events functions; fields are the extra
+    columns to return for each event
+    """
+    try:
+        limit = max(1, min(int(request.args.get('limit', 20)), 100))
+        before = None
+        if request.args.get('cursor'):
+            # cursor is "<YYYY-MM-DD>.<eid>" of the last event shown
+            date_str, eid_str = request.args['cursor'].split('.')
+            before = (datetime.strptime(date_str, '%Y-%m-%d').date(),
+                      int(eid_str))
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor or limit'}), 400
+
+    rows = fetch_page(get_conn(), session['uid'], before, limit)
+    page = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        last = page[-1]
+        next_cursor = f"{last['date'].isoformat()}.{last['eid']}"
+
+    events = []
+    for evt in page:
+        item = {
+            'eid': evt['eid'],
+            'title': evt['title'],
+            'date': evt['date'].strftime('%b %d, %Y'),
+            'start_formatted': e.format_time(evt['start']),
+            'category': evt['category'],
+            'url': url_for('view_event_forum', eid=evt['eid']),
+        }
+        for field in fields:
+            item[field] = evt[field]
+        events.append(item)
+
+    return jsonify({'events': events, 'next_cursor': next_cursor})
+
+@app.route('/api/profile/past-created')
+@login_required
+def api_past_created_events():
+    """API endpoint: one page of the user's past created events"""
+    return past_events_page(profile_db.get_user_past_created_events,
+                            ['participant_count'])
 
-    response['photo_url'] = photo_url
+@app.route('/api/profile/past-joined')
+@login_required
+def api_past_joined_events():
+    """API endpoint: one page of past events the user joined"""
+    return past_events_page(profile_db.get_user_past_joined_events,
+                            ['creator_name'])
+
+# Columns of each row in /api/events, in order
+# (eid is null for an occurrence of a series, which has a sid instead)
+RANGE_FIELDS = ['eid', 'date', 'start', 'end', 'title', 'city', 'state',
+                'category', 'cap', 'has_photo', 'sid']
+
+@app.route('/api/events')
+def api_range_events():
+    """
+    (Public) API endpoint for every event between two dates (inclusive):
+    /api/events?from=YYYY-MM-DD&to=YYYY-MM-DD&category=...
+    Streams compact rows, {"fields": [...], "rows": [[...], ...]}, with
+    one array per event in RANGE_FIELDS order, sorted by date and start
+    """
+    try:
+        date_from = datetime.strptime(request.args.get('from', ''),
+                                      '%Y-%m-%d').date()
+        date_to = datetime.strptime(request.args.get('to', ''),
+                                    '%Y-%m-%d').date()
+    except ValueError:
+        return jsonify({'error': 'from and to must be YYYY-MM-DD'}), 400
+
+    if date_to < date_from:
+        return jsonify({'error': 'to is before from'}), 400
+    max_days = app.config['EVENT_RANGE_MAX_DAYS']
+    if (date_to - date_from).days + 1 > max_days:
+        return jsonify({'error': f'Range is limited to {max_days} days'}), 400
+
+    category = request.args.get('category')
+    if category == 'all':
+        category = None
 
-    return jsonify(response)
+    conn = get_conn()
+    # calendar.js keeps weeks it has seen; unchanged ones cost two
+    # queries. Series occurrences are expanded here, so they are part
+    # of the ETag directly
+    occurrences = series_db.get_range_occurrences(conn, date_from, date_to,
+                                                  category)
+    etag = api_etag(e.get_range_stamp(conn, date_from, date_to, category),
+                    *(event_version(occ) for occ in occurrences))
+    if request.if_none_match.contains_weak(etag):
+        return revalidate_headers(Response(status=304), etag)
+
+    rows = series_db.merge_by_time(
+        e.iter_range_events(conn, date_from, date_to, category),
+        occurrences)
+
+    def generate():
+        yield '{"fields": ' + app.json.dumps(RANGE_FIELDS) + ', "rows": ['
+        separator = ''
+        for evt in rows:
+            yield separator + app.json.dumps([
+                evt['eid'],
+                evt['date'].isoformat(),
+                e.format_time(evt['start']),
+                e.format_time(evt['end']),
+                evt['title'],
+                evt['city'],
+                evt['state'],
+                evt['category'],
+                evt['cap'],
+                bool(evt['filename']),
+                evt.get('sid')
+            ])
+            separator = ','
+        yield ']}'
+
+    return revalidate_headers(
+        Response(stream_with_context(generate()),
+                 mimetype='application/json'), etag)
+
+@app.route('/api/search')
+def api_search_events():
+    """
+    (Public) API endpoint for ranked full-text event search.
+    Query params: q (required), from / to (YYYY-MM-DD), category, page
+    """
+    text = request.args.get('q', '').strip()
+    if not text:
+        return jsonify({'error': 'Search text is required'}), 400
+    if len(text) > 100:
+        return jsonify({'error': 'Search text too long'}), 400
+
+    try:
+        date_from = date_to = None
+        if request.args.get('from'):
+            date_from = datetime.strptime(request.args['from'],
+                                          '%Y-%m-%d').date()
+        if request.args.get('to'):
+            date_to = datetime.strptime(request.args['to'], '%Y-%m-%d').date()
+        page = max(1, int(request.args.get('page', 1)))
+    except ValueError:
+        return jsonify({'error': 'Invalid date or page'}), 400
+
+    per_page = app.config['SEARCH_PAGE_SIZE']
+    category = request.args.get('category')
+    if category == 'all':
+        category = None
+
+    rows = search_db.search_events(get_conn(), text, date_from, date_to,
+                                   category, limit=per_page,
+                                   offset=(page - 1) * per_page)
+
+    return jsonify({
+        'events': [{
+            'eid': evt['eid'],
+            'title': evt['title'],
+            'desc': evt['desc'],
+            'date': evt['date'].isoformat(),
+            'start': e.format_time(evt['start']),
+            'end': e.format_time(evt['end']),
+            'city': evt['city'],
+            'state': evt['state'],
+            'category': evt['category'],
+            'score': float(evt['score']),
+            'url': url_for('view_event_forum', eid=evt['eid'])
+        } for evt in rows[:per_page]],
+        'page': page,
+        'has_more': len(rows) > per_page
+    })
 
 @app.route('/api/event/<int:eid>/delete', methods=['DELETE'])
 @login_required
@@ -1206,9 +2187,15 @@ def delete_event_api(eid):
         
         if event['addedBy'] != session['uid']:
             return jsonify({'success': False, 'error': 'Unauthorized'}), 403
+
+        if event['archived']:
+            return jsonify({'success': False, 'error':
+                            'Archived events cannot be deleted'}), 400
         
         # Delete event
+        affected_uids = event_profile_uids(conn, eid)
         e.delete_event_by_id(conn, eid)
+        caching.invalidate_profiles(affected_uids)
         
         return jsonify({'success': True})
     
@@ -1236,6 +2223,7 @@ def api_join_event(eid):
         
         # Check if already joined
         if forum_db.is_user_participant(conn, eid, session['uid']):
+            metrics.JOINS.labels(outcome='duplicate').inc()
             return jsonify({'success': False, 'error': 
                             'Already joined'}), 400
         
@@ -1243,9 +2231,12 @@ def api_join_event(eid):
         success = forum_db.add_participant(conn, eid, session['uid'])
         
         if success:
+            metrics.JOINS.labels(outcome='success').inc()
+            caching.invalidate_profiles([session['uid'], event['addedBy']])
             return jsonify({'success': True, 'message': 
                             'Successfully joined event'})
         else:
+            metrics.JOINS.labels(outcome='full').inc()
             return jsonify({'success': False, 'error': 
                             'Event is full'}), 400
     
@@ -1268,6 +2259,7 @@ def api_leave_event(eid):
         
         # Remove participant
         forum_db.remove_participant(conn, eid, session['uid'])
+        caching.invalidate_profiles([session['uid'], creator_uid])
         
         return jsonify({'success': True, 'message': 'Successfully left event'})
     
@@ -1278,61 +2270,55 @@ def api_leave_event(eid):
 def get_event_forum(eid):
     """
     API endpoint to get forum comments for an event
-    Returns JSON with forum data
+    Returns JSON with forum data; ?format=compact sends each comment as
+    a list of values in the order given by 'fields'
     """
     try:
         conn = get_conn()
-        
-        # Get the forum id for this event
-        fid = forum_db.get_forum_id_by_event(conn, eid)
-        
-        if not fid:
-            return jsonify({'error': 'Forum not found'}), 404
-        
-        # Get comments for this forum
-        comments = forum_db.get_forum_comments(conn, fid)
-        
-        # Format comments for JSON response
-        formatted_comments = []
-        for comment in comments:
-            posted_at = comment['postedAt']
+        # Get the forum id and comment version for this event
+        return forum_json(conn, forum_db.get_forum_stamp(conn, eid))
 
-            if posted_at:
-                posted_at_value = posted_at.isoformat()
-            else:
-                posted_at_value = None
-
-            formatted_comments.append({
-                'commId': comment['commId'],
-                'text': comment['text'],
-                'author_name': comment['author_name'],
-                'author_uid': comment['author_uid'],
-                'postedAt': posted_at_value,
-                'parent_commId': comment.get('parent_commId')
-            })
-        
-        # Check if user is logged in
-        logged_in = 'uid' in session
-        current_uid = session.get('uid') if logged_in else None
-        
-        return jsonify({
-            'fid': fid,
-            'comments': formatted_comments,
-            'logged_in': logged_in,
-            'current_uid': current_uid,
-            'comment_count': len(formatted_comments)
-        })
-    
     except Exception as ex:
         return jsonify({'error': str(ex)}), 500
 
+def forum_json(conn, stamp):
+    """
+    Respond with the forum whose stamp (forum.get_forum_stamp) is given,
+    or 404 if stamp is None. ?format=compact as in get_event_forum
+    """
+    uid = session.get('uid')
+    compact = request.args.get('format') == 'compact'
+
+    if not stamp:
+        return jsonify({'error': 'Forum not found'}), 404
+
+    # Nothing new since the client's copy: skip loading the comments
+    etag = forum_etag(stamp, uid, compact)
+    if request.if_none_match.contains_weak(etag):
+        return revalidate_headers(Response(status=304), etag)
+
+    # Get comments for this forum (a series' forum is never archived)
+    fid = stamp['fid']
+    comments = forum_db.get_forum_comments(conn, fid, stamp.get('archived'))
+
+    return revalidate_headers(
+        jsonify(build_forum_response(fid, comments, uid, compact)), etag)
+
 @app.route('/api/event/<int:eid>/forum/comment', methods=['POST'])
 @login_required
 def api_add_comment(eid):
     """
     API endpoint to add a comment to an event's forum
     """
-    try:        
+    return add_comment_json(
+        lambda conn: forum_db.get_forum_id_by_event(conn, eid))
+
+def add_comment_json(find_fid):
+    """
+    Add the comment in the JSON request body to a forum, found by calling
+    find_fid(conn), and respond with its commId
+    """
+    try:
         data = request.get_json()
         if not data:
             return jsonify({'error': 'Invalid request'}), 400
@@ -1348,8 +2334,8 @@ def api_add_comment(eid):
         conn = get_conn()
         
         # Get the forum id for this event
-        fid = forum_db.get_forum_id_by_event(conn, eid)
-        
+        fid = find_fid(conn)
+
         if not fid:
             return jsonify({'error': 'Forum not found'}), 404
         
@@ -1366,6 +2352,163 @@ def api_add_comment(eid):
         return jsonify({'error': str(ex)}), 500
 
 
+# Occurrences of recurring series (series.py). Each is addressed by its
+# series and date, /api/series/<sid>/<YYYY-MM-DD>, and answers like the
+# /api/event/<eid> routes, except that all of a series' occurrences
+# share the series' forum
+
+def find_occurrence(conn, sid, day):
+    """
+    Return (series, date, occurrence) for a series' occurrence on the
+    day given as 'YYYY-MM-DD', or None if there is no such occurrence
+    """
+    try:
+        day = datetime.strptime(day, '%Y-%m-%d').date()
+    except ValueError:
+        return None
+    series = series_db.get_series_by_id(conn, sid)
+    if not series:
+        return None
+    occurrence = series_db.get_occurrence(conn, series, day)
+    if not occurrence:
+        return None
+    return series, day, occurrence
+
+@app.route('/api/series/<int:sid>/<day>')
+def get_occurrence_details(sid, day):
+    """(Public) API endpoint: like get_event_details, for an occurrence"""
+    conn = get_conn()
+    uid = session.get('uid')
+    try:
+        occurrence_day = datetime.strptime(day, '%Y-%m-%d').date()
+    except ValueError:
+        return jsonify({'error': 'Event not found'}), 404
+    stamp = series_db.get_occurrence_stamp(conn, sid, occurrence_day)
+    if not stamp:
+        return jsonify({'error': 'Event not found'}), 404
+
+    # Answer an unchanged occurrence before building the payload
+    etag = occurrence_etag(sid, occurrence_day, stamp, uid)
+    if request.if_none_match.contains_weak(etag):
+        return revalidate_headers(Response(status=304), etag)
+
+    found = find_occurrence(conn, sid, day)
+    if not found:
+        return jsonify({'error': 'Event not found'}), 404
+    series, day, occurrence = found
+
+    participants = series_db.get_occurrence_participants(conn, series, day)
+    response = build_event_response(occurrence, participants,
+                                    len(participants), uid)
+    response['photo_url'] = None
+    if occurrence['filename']:
+        response['photo_url'] = photo_url('series_photo', sid=sid)
+    return revalidate_headers(jsonify(response), etag)
+
+@app.route('/api/series/<int:sid>/<day>/join', methods=['POST'])
+@login_required
+def api_join_occurrence(sid, day):
+    """API endpoint to join one occurrence of a series"""
+    try:
+        conn = get_conn()
+        uid = session['uid']
+        found = find_occurrence(conn, sid, day)
+        if not found:
+            return jsonify({'success': False, 'error':
+                            'Event not found'}), 404
+        series, day, occurrence = found
+
+        if day < datetime.now().date():
+            return jsonify({'success': False, 'error':
+                            'Cannot join past events'}), 400
+
+        if (uid == series['addedBy'] or
+                series_db.is_occurrence_participant(conn, sid, day, uid)):
+            metrics.JOINS.labels(outcome='duplicate').inc()
+            return jsonify({'success': False, 'error':
+                            'Already joined'}), 400
+
+        if series_db.add_occurrence_participant(conn, series, day, uid):
+            caching.invalidate_profiles([uid, series['addedBy']])
+            metrics.JOINS.labels(outcome='success').inc()
+            return jsonify({'success': True, 'message':
+                            'Successfully joined event'})
+        metrics.JOINS.labels(outcome='full').inc()
+        return jsonify({'success': False, 'error': 'Event is full'}), 400
+
+    except Exception as ex:
+        return jsonify({'success': False, 'error': str(ex)}), 500
+
+@app.route('/api/series/<int:sid>/<day>/leave', methods=['POST'])
+@login_required
+def api_leave_occurrence(sid, day):
+    """API endpoint to leave one occurrence of a series"""
+    try:
+        conn = get_conn()
+        found = find_occurrence(conn, sid, day)
+        if not found:
+            return jsonify({'success': False, 'error':
+                            'Event not found'}), 404
+        series, day, occurrence = found
+
+        if series['addedBy'] == session['uid']:
+            return jsonify({'success': False, 'error':
+                            'You  cannot leave your own event'}), 403
+
+        series_db.remove_occurrence_participant(conn, sid, day,
+                                                session['uid'])
+        caching.invalidate_profiles([session['uid'], series['addedBy']])
+        return jsonify({'success': True, 'message': 'Successfully left event'})
+
+    except Exception as ex:
+        return jsonify({'success': False, 'error': str(ex)}), 500
+
+@app.route('/api/series/<int:sid>/<day>/delete', methods=['DELETE'])
+@login_required
+def cancel_occurrence_api(sid, day):
+    """API endpoint to cancel one occurrence of a series (creator only)"""
+    try:
+        conn = get_conn()
+        found = find_occurrence(conn, sid, day)
+        if not found:
+            return jsonify({'success': False, 'error':
+                            'Event not found'}), 404
+        series, day, occurrence = found
+
+        if series['addedBy'] != session['uid']:
+            return jsonify({'success': False, 'error': 'Unauthorized'}), 403
+
+        # everyone taking part sees it on their profile
+        affected_uids = [p['uid'] for p in
+                         series_db.get_occurrence_participants(conn, series,
+                                                               day)]
+        series_db.cancel_occurrence(conn, sid, day)
+        caching.invalidate_profiles(affected_uids)
+        return jsonify({'success': True})
+
+    except Exception as ex:
+        return jsonify({'success': False, 'error': str(ex)}), 500
+
+@app.route('/api/series/<int:sid>/<day>/forum')
+def get_occurrence_forum(sid, day):
+    """API endpoint to get the forum a series' occurrences share"""
+    try:
+        conn = get_conn()
+        return forum_json(conn, series_db.get_forum_stamp(conn, sid))
+
+    except Exception as ex:
+        return jsonify({'error': str(ex)}), 500
+
+@app.route('/api/series/<int:sid>/<day>/forum/comment', methods=['POST'])
+@login_required
+def api_add_occurrence_comment(sid, day):
+    """API endpoint to comment in the forum of a series"""
+    def find_fid(conn):
+        stamp = series_db.get_forum_stamp(conn, sid)
+        return stamp['fid'] if stamp else None
+    return add_comment_json(find_fid)
+
+
 @app.route('/api/comment/<int:commId>/reply', methods=['POST'])
 @login_required
 def api_reply_to_comment(commId):
@@ -1375,12 +2518,11 @@ def api_reply_to_comment(commId):
     try:
         conn = get_conn()
 
-        # Find which event this comment belongs to
+        # Find the comment being replied to (and its forum)
         comment = forum_db.get_comment_info(conn, commId)
         if not comment:
             return jsonify({'error': 'Comment not found'}), 404
 
-        eid = comment['eid']
         data = request.get_json() or {}
         if not data:
             return jsonify({'error': 'Invalid request'}), 400
@@ -1392,10 +2534,8 @@ def api_reply_to_comment(commId):
         if len(text) > 300:
             return jsonify({'error': 'Reply too long'}), 400
 
-        # Get forum id for this event
-        fid = forum_db.get_forum_id_by_event(conn, eid)
-        if not fid:
-            return jsonify({'error': 'Forum not found'}), 404
+        # Replies go in the parent's forum (an event's or a series')
+        fid = comment['fid']
 
         new_commId = forum_db.insert_reply(
             conn, text, session['uid'], fid, commId
@@ -1408,6 +2548,33 @@ def api_reply_to_comment(commId):
             'parent_commId': commId
         })
 
+    except ValueError as ex:
+        # the parent is gone or its thread is too deep
+        return jsonify({'error': str(ex)}), 400
+    except Exception as ex:
+        return jsonify({'error': str(ex)}), 500
+
+@app.route('/api/comment/<int:commId>/thread')
+def get_comment_thread(commId):
+    """
+    API endpoint for a comment and all its replies, in thread order (each
+    reply after its parent), each with its depth below the comment
+    """
+    try:
+        conn = get_conn()
+        comments = forum_db.get_comment_thread(conn, commId)
+        if not comments:
+            return jsonify({'error': 'Comment not found'}), 404
+
+        return jsonify({
+            'commId': commId,
+            'comments': [dict(zip(COMMENT_FIELDS, comment_values(comment)),
+                              depth=comment['depth'])
+                         for comment in comments],
+            'current_uid': session.get('uid'),
+            'comment_count': len(comments)
+        })
+
     except Exception as ex:
         return jsonify({'error': str(ex)}), 500
 
@@ -1476,12 +2643,13 @@ def api_delete_comment(commId):
                 'error': 'You can only delete your own comments'
                 }), 403
         
-        # Delete comment
-        forum_db.delete_comment_by_id(conn, commId)
+        # Delete the comment and its replies
+        deleted = forum_db.delete_comment_by_id(conn, commId)
         
         return jsonify({
             'success': True,
-            'message': 'Comment deleted successfully'
+            'message': 'Comment deleted successfully',
+            'deleted': deleted
         })
     
     except Exception as ex:
@@ -1491,7 +2659,22 @@ def api_delete_comment(commId):
 # HELPER FILTER FOR TEMPLATES
 # ===========================
 
-@app.template_filter('time_ago')
+def timed_filter(name):
+    """Register a template filter whose run time is recorded in metrics"""
+    def register(f):
+        @wraps(f)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return f(*args, **kwargs)
+            finally:
+                metrics.FILTER_SECONDS.labels(filter=name).observe(
+                    time.perf_counter() - start)
+        app.add_template_filter(timed, name)
+        return f
+    return register
+
+@timed_filter('time_ago')
 def time_ago_filter(timestamp):
     """
     Format timestamp as 'X hours ago', 'X days ago', etc.
@@ -1524,6 +2707,129 @@ def time_ago_filter(timestamp):
         return f'{days} day{"s" if days != 1 else ""} ago'
 
 
+# ============
+# CLI COMMANDS
+# ============
+
+@app.cli.command('warm-templates')
+def warm_templates():
+    """Compile every template into the shared bytecode cache"""
+    names = app.jinja_env.list_templates(extensions=['html'])
+    for name in names:
+        app.jinja_env.get_template(name)
+    print(f"compiled {len(names)} templates into "
+          f"{app.config['TEMPLATE_CACHE_DIR']}/")
+
+
+@app.cli.command('import-events')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--uid', type=int, required=True,
+              help='uid of the user the events are created by')
+def import_events_command(path, uid):
+    """Create events from a CSV or iCalendar file (see importer.py)"""
+    with open(path, 'rb') as f:
+        rows = importer.read_rows(path, f.read(),
+                                  app.config['FEED_TIMEZONE'])
+    conn = dbi.connect()
+    try:
+        report = importer.import_rows(conn, uid, rows)
+    finally:
+        conn.close()
+    for error in report['errors']:
+        print(f"row {error['row']}: {' '.join(error['errors'])}")
+    print(f"created {report['created']} of {report['rows']} events")
+    if report['created']:
+        caching.invalidate_profiles([uid])
+        caching.purge_pages()
+
+
+
+@app.cli.command('archive-events')
+@click.option('--days', type=int, default=None,
+              help='archive events older than this (ARCHIVE_AFTER_DAYS)')
+@click.option('--batch', type=int, default=None,
+              help='events moved per transaction (ARCHIVE_BATCH_SIZE)')
+def archive_events_command(days, batch):
+    """Move past events to the archive tables (see archive.py)"""
+    if days is None:
+        days = app.config['ARCHIVE_AFTER_DAYS']
+    if batch is None:
+        batch = app.config['ARCHIVE_BATCH_SIZE']
+    before = datetime.now().date() - timedelta(days=days)
+    conn = dbi.connect()
+    affected_uids = set()
+    try:
+        moved = archive.archive_events(conn, before, batch, affected_uids)
+    finally:
+        conn.close()
+        # dashboards and pages showed the moved events as upcoming or
+        # recent; drop them even if a later batch failed
+        caching.invalidate_profiles(affected_uids)
+        caching.purge_pages()
+    print(f"archived {moved} events dated before {before.isoformat()}")
+
+
+@app.cli.command('send-digests')
+@click.option('--once', is_flag=True, help='send one round and exit')
+def send_digests_command(once):
+    """Email activity digests every DIGEST_INTERVAL_SECONDS (notify.py)"""
+    connect_smtp = notify.smtp_connector(
+        app.config['MAIL_SERVER'], app.config['MAIL_PORT'],
+        app.config['MAIL_USERNAME'], app.config['MAIL_PASSWORD'],
+        app.config['MAIL_USE_TLS'])
+    while True:
+        started = time.monotonic()
+        conn = None
+        try:
+            conn = dbi.connect()
+            sent = notify.dispatch(conn, connect_smtp,
+                                   app.config['MAIL_FROM'],
+                                   app.config['SITE_URL'],
+                                   app.config['DIGEST_BATCH_SIZE'],
+                                   app.config['DIGEST_MAX_RECIPIENTS'])
+            notify.prune_sent(conn, app.config['DIGEST_KEEP_DAYS'])
+            print(f'{datetime.now():%Y-%m-%d %H:%M:%S} sent {sent} digests',
+                  flush=True)
+        except Exception as ex:
+            # keep the loop alive; what wasn't sent goes next round
+            if once:
+                raise
+            print(f'{datetime.now():%Y-%m-%d %H:%M:%S} digest round '
+                  f'failed: {ex}', flush=True)
+        finally:
+            if conn is not None:
+                conn.close()
+        if once:
+            return
+        time.sleep(max(0, app.config['DIGEST_INTERVAL_SECONDS'] -
+                       (time.monotonic() - started)))
+
+
+@app.cli.command('partition-archive')
+@click.option('--months', type=int, default=3,
+              help='months past the archive horizon to add partitions for')
+@click.option('--drop-before', type=click.DateTime(formats=['%Y-%m-%d']),
+              default=None,
+              help='delete archived events of whole months before this date')
+def partition_archive_command(months, drop_before):
+    """Add monthly partitions to events_archive, and drop old ones"""
+    horizon = (datetime.now().date() -
+               timedelta(days=app.config['ARCHIVE_AFTER_DAYS']))
+    through = horizon + timedelta(days=31 * months)
+    conn = dbi.connect()
+    try:
+        added = archive.add_partitions(conn, through)
+        dropped = []
+        if drop_before:
+            dropped = archive.drop_partitions(conn, drop_before.date())
+    finally:
+        conn.close()
+    print(f"added {len(added)} partitions through {through:%Y-%m}"
+          f"{': ' + ', '.join(added) if added else ''}")
+    if drop_before:
+        print(f"dropped {len(dropped)} partitions"
+              f"{': ' + ', '.join(dropped) if dropped else ''}")
+
 if __name__ == '__main__':
     import sys, os
     if len(sys.argv) > 1:
@@ -0,0 +1,227 @@
+"""
+archive.py - Moving past events out of the hot tables
+authors: Beatrix Kim, Bessie Li, Samiksha Singh
+
+Events older than a horizon are moved, with their participants, forum
+and comments, to the *_archive tables (migrations/007_archive_tables.sql)
+so that events, participants, forum and comments only hold recent
+history. Pages that show past events read both through union_all.
+
+events_archive is partitioned by month (see migration 008), and
+add_partitions and drop_partitions maintain its partitions.
+"""
+from datetime import date, timedelta
+
+import cs304dbi as dbi
+
+# Table names for the {events}, {participants}, {forum} and {comments}
+# placeholders of a query run by union_all
+HOT_TABLES = {'events': 'events', 'participants': 'participants',
+              'forum': 'forum', 'comments': 'comments'}
+ARCHIVE_TABLES = {name: f'{name}_archive' for name in HOT_TABLES}
+
+# What archive_batch copies for a batch of eids, parents first. The
+# comments go by forum, so copy them before the forum rows are deleted
+COPY_WHERE = [
+    ('events', 'eid IN ({ids})'),
+    ('participants', 'eid IN ({ids})'),
+    ('forum', 'eid IN ({ids})'),
+    ('comments', 'fid IN (SELECT fid FROM forum WHERE eid IN ({ids}))'),
+]
+
+# events_archive's partitions, oldest first. PARTITION_DESCRIPTION is
+# the quoted date the partition's rows are before, or MAXVALUE
+PARTITIONS_SQL = '''
+    SELECT PARTITION_NAME AS name, PARTITION_DESCRIPTION AS bound
+    FROM information_schema.PARTITIONS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'events_archive'
+    ORDER BY PARTITION_ORDINAL_POSITION
+'''
+
+# the partition after the monthly ones, which should stay empty
+CATCH_ALL = 'p_future'
+
+# What drop_partitions deletes for the events of one partition, children
+# first since they are found through the events
+DROP_CHILDREN = [
+    '''DELETE co FROM comments_archive co
+       JOIN forum_archive f ON co.fid = f.fid
+       JOIN events_archive PARTITION ({name}) e ON f.eid = e.eid''',
+    '''DELETE pa FROM participants_archive pa
+       JOIN events_archive PARTITION ({name}) e ON pa.eid = e.eid''',
+    '''DELETE f FROM forum_archive f
+       JOIN events_archive PARTITION ({name}) e ON f.eid = e.eid''',
+]
+
+
+def union_all(sql, **params):
+    """
+    sql run over the hot tables and again over the archive tables, as one
+    UNION ALL. sql names its tables with the placeholders above and may
+    use {archived}, which is FALSE in the first half and TRUE in the
+    second; params fill in any other placeholders. Callers pass their
+    query arguments twice and sort the union themselves
+    """
+    hot = sql.format(archived='FALSE', **HOT_TABLES, **params)
+    archived = sql.format(archived='TRUE', **ARCHIVE_TABLES, **params)
+    return f'({hot})\nUNION ALL\n({archived})'
+
+
+def archive_batch(conn, before, batch_size, affected_uids=None):
+    """
+    Move up to batch_size of the oldest events dated before `before`
+    (a date) into the archive tables, in one transaction, and return how
+    many were moved. The events' rows are locked, so nobody can join one
+    or comment on it while it is being moved. The moved events'
+    participants are added to the set affected_uids, if given
+    """
+    curs = dbi.cursor(conn)
+    conn.begin()
+    try:
+        curs.execute('''
+            SELECT eid FROM events
+            WHERE date < %s
+            ORDER BY date
+            LIMIT %s
+            FOR UPDATE
+        ''', [before, batch_size])
+        eids = [row[0] for row in curs.fetchall()]
+        if eids:
+            ids = ', '.join(['%s'] * len(eids))
+            if affected_uids is not None:
+                curs.execute(f'''
+                    SELECT DISTINCT uid FROM participants
+                    WHERE eid IN ({ids})
+                ''', eids)
+                participants = [row[0] for row in curs.fetchall()]
+            for table, where in COPY_WHERE:
+                curs.execute(f'''
+                    INSERT INTO {table}_archive
+                    SELECT * FROM {table} WHERE {where.format(ids=ids)}
+                ''', eids)
+            # ON DELETE CASCADE removes their participants, forum and
+            # comments from the hot tables
+            curs.execute(f'DELETE FROM events WHERE eid IN ({ids})', eids)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    if eids and affected_uids is not None:
+        affected_uids.update(participants)
+    return len(eids)
+
+
+def archive_events(conn, before, batch_size=500, affected_uids=None):
+    """
+    Move every event dated before `before` into the archive tables, one
+    batch_size transaction at a time so no lock is held for long, and
+    return how many were moved. Collects the participants of the moved
+    events in affected_uids as archive_batch does
+    """
+    moved = 0
+    while True:
+        count = archive_batch(conn, before, batch_size, affected_uids)
+        moved += count
+        if count < batch_size:
+            return moved
+
+
+def forget_user(curs, uid):
+    """
+    Delete a user's archived events (with their participants, forum and
+    comments), comments and participation, as ON DELETE CASCADE does in
+    the hot tables. Runs on the caller's cursor, in its transaction
+    """
+    curs.execute('''
+        DELETE FROM comments_archive
+        WHERE addedBy = %s
+           OR fid IN (SELECT f.fid FROM forum_archive f
+                      JOIN events_archive e ON f.eid = e.eid
+                      WHERE e.addedBy = %s)
+    ''', [uid, uid])
+    curs.execute('''
+        DELETE FROM participants_archive
+        WHERE uid = %s
+           OR eid IN (SELECT eid FROM events_archive WHERE addedBy = %s)
+    ''', [uid, uid])
+    curs.execute('''
+        DELETE FROM forum_archive
+        WHERE eid IN (SELECT eid FROM events_archive WHERE addedBy = %s)
+    ''', [uid])
+    curs.execute('DELETE FROM events_archive WHERE addedBy = %s', [uid])
+
+
+def month_after(day):
+    """The first day of the month after day's"""
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def get_partitions(conn):
+    """
+    events_archive's partitions, oldest first, as (name, bound) pairs:
+    the partition holds the events dated before bound (a date), or after
+    every other partition's if bound is None
+    """
+    curs = dbi.dict_cursor(conn)
+    curs.execute(PARTITIONS_SQL)
+    return [(row['name'],
+             None if row['bound'] == 'MAXVALUE'
+             else date.fromisoformat(row['bound'].strip("'")))
+            for row in curs.fetchall()]
+
+
+def add_partitions(conn, through):
+    """
+    Split the catch-all partition so that every month up to and including
+    through's has its own, and return the new partitions' names. Only the
+    catch-all's rows are rewritten, so this is cheap as long as it runs
+    ahead of archive_events and the catch-all is empty
+    """
+    bounds = [bound for name, bound in get_partitions(conn) if bound]
+    curs = dbi.cursor(conn)
+    if bounds:
+        month = bounds[-1]
+    else:
+        # first run: start from the oldest archived month
+        curs.execute('SELECT MIN(date) FROM events_archive')
+        month = (curs.fetchone()[0] or through).replace(day=1)
+
+    new = []
+    while month <= through:
+        new.append((f'p{month:%Y%m}', month_after(month)))
+        month = month_after(month)
+    if new:
+        monthly = ', '.join(
+            f"PARTITION {name} VALUES LESS THAN ('{bound.isoformat()}')"
+            for name, bound in new)
+        curs.execute(f'''
+            ALTER TABLE events_archive REORGANIZE PARTITION {CATCH_ALL} INTO
+            ({monthly}, PARTITION {CATCH_ALL} VALUES LESS THAN (MAXVALUE))
+        ''')
+    return [name for name, bound in new]
+
+
+def drop_partitions(conn, before):
+    """
+    Delete archived events by whole months: every partition holding only
+    events dated before `before`, with the events' participants, forum
+    and comments. Returns the dropped partitions' names
+    """
+    dropped = []
+    curs = dbi.cursor(conn)
+    for name, bound in get_partitions(conn):
+        if bound is None or bound > before:
+            break
+        conn.begin()
+        try:
+            for sql in DROP_CHILDREN:
+                curs.execute(sql.format(name=name))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        # DDL, so not part of the transaction; if it fails, running this
+        # again finishes the job
+        curs.execute(f'ALTER TABLE events_archive DROP PARTITION {name}')
+        dropped.append(name)
+    return dropped
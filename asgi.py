@@ -0,0 +1,31 @@
+"""
+asgi.py - ASGI entry point: async API tier in front of the Flask app
+authors: Beatrix Kim, Bessie Li, Samiksha Singh
+
+Run with any ASGI server, e.g.
+    uvicorn asgi:application --workers 4 --port 8001
+GET requests for the read-only JSON endpoints go to async_api; every
+other request is handed to the regular Flask app through WsgiToAsgi.
+"""
+import re
+
+from asgiref.wsgi import WsgiToAsgi
+
+from app import app as flask_app
+from async_api import async_app
+
+ASYNC_ROUTES = re.compile(r'^/api/event/\d+(/forum)?$')
+
+wsgi_app = WsgiToAsgi(flask_app)
+
+
+async def application(scope, receive, send):
+    """Route async-capable API reads to Quart, everything else to Flask"""
+    if scope['type'] == 'lifespan':
+        # Quart opens/closes the DB pool on startup/shutdown
+        await async_app(scope, receive, send)
+    elif (scope['type'] == 'http' and scope['method'] == 'GET'
+            and ASYNC_ROUTES.match(scope['path'])):
+        await async_app(scope, receive, send)
+    else:
+        await wsgi_app(scope, receive, send)
@@ -0,0 +1,96 @@
+"""
+async_api.py - Async (Quart) tier for the public read-only JSON endpoints
+authors: Beatrix Kim, Bessie Li, Samiksha Singh
+
+GET /api/event/<eid> and GET /api/event/<eid>/forum are served here
+without tying up a worker thread while MySQL answers. Quart reads the
+same signed session cookie as Flask, so logged in users see the same
+is_creator / is_participant flags. Everything else (all writes, pages)
+stays on the sync Flask app; see asgi.py for how requests are split.
+"""
+from quart import Quart, Response, jsonify, request, session
+
+import async_db
+from app import (app as flask_app, build_event_response, build_forum_response,
+                 event_etag, forum_etag, photo_url, revalidate_headers)
+
+async_app = Quart(__name__)
+async_app.secret_key = flask_app.secret_key
+async_app.config['SESSION_COOKIE_NAME'] = \
+    flask_app.config['SESSION_COOKIE_NAME']
+async_app.config['DB_POOL_SIZE'] = 10
+
+pool = None
+
+
+@async_app.before_serving
+async def open_pool():
+    """Open the aiomysql pool once per worker"""
+    global pool
+    pool = await async_db.create_pool(
+        maxsize=async_app.config['DB_POOL_SIZE'])
+
+
+@async_app.after_serving
+async def close_pool():
+    """Close the aiomysql pool on worker shutdown"""
+    pool.close()
+    await pool.wait_closed()
+
+
+@async_app.route('/api/event/<int:eid>')
+async def get_event_details(eid):
+    """Async version of app.get_event_details"""
+    uid = session.get('uid')
+    async with pool.acquire() as conn:
+        stamp = await async_db.get_event_stamp(conn, eid)
+        if not stamp: # If event DNE
+            return jsonify({'error': 'Event not found'}), 404
+        etag = event_etag(eid, stamp, uid)
+        if request.if_none_match.contains_weak(etag):
+            return revalidate_headers(Response(status=304), etag)
+
+        event_data = await async_db.get_event_by_id(conn, eid)
+
+        if not event_data: # Deleted since the stamp was read
+            return jsonify({'error': 'Event not found'}), 404
+
+        participants = await async_db.get_event_participants(conn, eid)
+        current_count = await async_db.get_participant_count(conn, eid)
+
+    response = build_event_response(event_data, participants, current_count,
+                                    uid)
+
+    response['photo_url'] = None
+    if event_data.get('filename'):
+        response['photo_url'] = photo_url('event_photo', eid=eid)
+
+    return revalidate_headers(jsonify(response), etag)
+
+
+@async_app.route('/api/event/<int:eid>/forum')
+async def get_event_forum(eid):
+    """Async version of app.get_event_forum"""
+    try:
+        uid = session.get('uid')
+        compact = request.args.get('format') == 'compact'
+        async with pool.acquire() as conn:
+            stamp = await async_db.get_forum_stamp(conn, eid)
+
+            if not stamp:
+                return jsonify({'error': 'Forum not found'}), 404
+
+            etag = forum_etag(stamp, uid, compact)
+            if request.if_none_match.contains_weak(etag):
+                return revalidate_headers(Response(status=304), etag)
+
+            fid = stamp['fid']
+            comments = await async_db.get_forum_comments(
+                conn, fid, stamp['archived'])
+
+        return revalidate_headers(
+            jsonify(build_forum_response(fid, comments, uid, compact)),
+            etag)
+
+    except Exception as ex:
+        return jsonify({'error': str(ex)}), 500
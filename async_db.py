@@ -0,0 +1,77 @@
+"""
+async_db.py - Async (aiomysql) versions of the read-only API queries
+authors: Beatrix Kim, Bessie Li, Samiksha Singh
+
+Each function mirrors the sync function of the same name in event.py or
+forum.py and runs the exact same SQL, so the two API tiers can't drift.
+"""
+import aiomysql
+import cs304dbi as dbi
+import event as e
+import forum as forum_db
+
+
+async def create_pool(db='clump_db', minsize=1, maxsize=10):
+    """Create an aiomysql connection pool using the same ~/.my.cnf
+    credentials that cs304dbi uses for the sync app"""
+    dsn = dbi.conf(db)
+    return await aiomysql.create_pool(host=dsn['host'],
+                                      user=dsn['user'],
+                                      password=dsn['password'],
+                                      db=dsn['database'],
+                                      charset='utf8',
+                                      autocommit=True,
+                                      minsize=minsize,
+                                      maxsize=maxsize)
+
+
+async def get_event_by_id(conn, eid):
+    """Async version of event.get_event_by_id"""
+    async with conn.cursor(aiomysql.DictCursor) as curs:
+        await curs.execute(e.EVENT_BY_ID_SQL, (eid, eid))
+        return await curs.fetchone()
+
+
+async def get_event_participants(conn, eid):
+    """Async version of event.get_event_participants"""
+    async with conn.cursor(aiomysql.DictCursor) as curs:
+        await curs.execute(e.EVENT_PARTICIPANTS_SQL, (eid, eid))
+        return await curs.fetchall()
+
+
+async def get_participant_count(conn, eid):
+    """Async version of event.get_participant_count"""
+    async with conn.cursor() as curs:
+        await curs.execute(e.PARTICIPANT_COUNT_SQL, (eid, eid))
+        return (await curs.fetchone())[0]
+
+
+async def get_event_stamp(conn, eid):
+    """Async version of event.get_event_stamp"""
+    async with conn.cursor(aiomysql.DictCursor) as curs:
+        await curs.execute(e.EVENT_STAMP_SQL, (eid, eid))
+        return await curs.fetchone()
+
+
+async def get_forum_stamp(conn, eid):
+    """Async version of forum.get_forum_stamp"""
+    async with conn.cursor(aiomysql.DictCursor) as curs:
+        await curs.execute(forum_db.FORUM_STAMP_SQL, [eid, eid])
+        return await curs.fetchone()
+
+
+async def get_forum_id_by_event(conn, eid):
+    """Async version of forum.get_forum_id_by_event"""
+    async with conn.cursor(aiomysql.DictCursor) as curs:
+        await curs.execute(forum_db.FORUM_ID_BY_EVENT_SQL, [eid])
+        result = await curs.fetchone()
+        return result['fid'] if result else None
+
+
+async def get_forum_comments(conn, fid, archived=False):
+    """Async version of forum.get_forum_comments"""
+    sql = (forum_db.ARCHIVED_COMMENTS_SQL if archived
+           else forum_db.FORUM_COMMENTS_SQL)
+    async with conn.cursor(aiomysql.DictCursor) as curs:
+        await curs.execute(sql, [fid])
+        return await curs.fetchall()
@@ -0,0 +1,48 @@
+"""
+api_load.py - Compare the sync (Flask) and async (Quart) JSON API tiers
+authors: Beatrix Kim, Bessie Li, Samiksha Singh
+
+Start both servers with the SAME number of workers, e.g.
+    gunicorn -w 4 -b :8000 app:app
+    uvicorn asgi:application --workers 4 --port 8001
+then run
+    python bench/api_load.py --sync http://localhost:8000 \
+        --async http://localhost:8001 --eids 1-50
+"""
+import argparse
+
+from loadgen import fetch, print_stats, run_load
+
+
+def parse_eids(spec):
+    """'1-50' or '3,7,9' -> list of ints"""
+    if '-' in spec:
+        lo, hi = spec.split('-')
+        return list(range(int(lo), int(hi) + 1))
+    return [int(x) for x in spec.split(',')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--sync', required=True, help='base URL of gunicorn')
+    parser.add_argument('--async', dest='async_', required=True,
+                        help='base URL of the ASGI server')
+    parser.add_argument('--eids', default='1-20')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    args = parser.parse_args()
+
+    eids = parse_eids(args.eids)
+    paths = ['/api/event/{}', '/api/event/{}/forum']
+
+    for path in paths:
+        for label, base in (('sync', args.sync), ('async', args.async_)):
+            def make_request(i, ctx, base=base, path=path):
+                url = base + path.format(eids[i % len(eids)])
+                return path, fetch(url)[0]
+            stats = run_load(make_request, args.requests, args.concurrency)
+            print_stats(f'{label} {path}', stats['ALL'])
+
+
+if __name__ == '__main__':
+    main()
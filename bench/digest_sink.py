@@ -0,0 +1,114 @@
+"""
+digest_sink.py - Send activity digests to a local SMTP sink and count them
+authors: Beatrix Kim, Bessie Li, Samiksha Singh
+
+Needs aiosmtpd (pip install aiosmtpd) and a bench/seed.py database with
+migrations/009_notifications.sql applied:
+    python bench/digest_sink.py --db clump_bench --comments 20000
+Posts --comments comments and --replies replies as random users on
+random forums (recording their notifications the way the app does),
+then runs one digest round (notify.dispatch) against an in-process
+aiosmtpd sink and prints how many notifications went out in how many
+emails over how many SMTP connections, and how long it took.
+"""
+import argparse
+import random
+import sys
+import os
+import time
+
+import cs304dbi as dbi
+from aiosmtpd.controller import Controller
+
+# the app's modules, from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+import forum  # noqa: E402
+import notify  # noqa: E402
+
+
+class CountingHandler:
+    """aiosmtpd handler that counts messages and SMTP sessions"""
+
+    def __init__(self):
+        self.messages = 0
+        self.sessions = set()
+        self.recipients = set()
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages += 1
+        self.sessions.add(id(session))
+        self.recipients.update(envelope.rcpt_tos)
+        return '250 OK'
+
+
+def post_activity(conn, rng, comments, replies):
+    """Post comments and replies as random users on random forums"""
+    curs = dbi.cursor(conn)
+    curs.execute('SELECT MAX(uid) FROM person')
+    users = curs.fetchone()[0]
+    curs.execute('SELECT fid FROM forum WHERE eid IS NOT NULL')
+    fids = [row[0] for row in curs.fetchall()]
+    posted = []
+    for _ in range(comments):
+        fid = rng.choice(fids)
+        posted.append((fid, forum.insert_comment(
+            conn, 'digest bench comment', rng.randint(1, users), fid)))
+    for _ in range(replies):
+        fid, parent = rng.choice(posted)
+        forum.insert_reply(conn, 'digest bench reply',
+                           rng.randint(1, users), fid, parent)
+
+
+def pending_count(conn):
+    curs = dbi.cursor(conn)
+    curs.execute('SELECT COUNT(*) FROM notifications WHERE sent_at IS NULL')
+    return curs.fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--db', default='clump_bench')
+    parser.add_argument('--comments', type=int, default=20000)
+    parser.add_argument('--replies', type=int, default=5000)
+    parser.add_argument('--batch', type=int, default=100,
+                        help='digests per SMTP connection')
+    parser.add_argument('--port', type=int, default=8025)
+    parser.add_argument('--seed', type=int, default=304)
+    args = parser.parse_args()
+
+    dbi.conf(args.db)
+    conn = dbi.connect()
+    start = time.perf_counter()
+    post_activity(conn, random.Random(args.seed), args.comments,
+                  args.replies)
+    print(f'posted {args.comments} comments and {args.replies} replies '
+          f'in {time.perf_counter() - start:.1f} s')
+    pending = pending_count(conn)
+
+    handler = CountingHandler()
+    sink = Controller(handler, hostname='localhost', port=args.port)
+    sink.start()
+    try:
+        start = time.perf_counter()
+        rounds = sent = 0
+        while pending_count(conn):
+            sent += notify.dispatch(
+                conn, notify.smtp_connector('localhost', args.port),
+                'Clump <clump@localhost>', 'http://localhost:8000',
+                args.batch)
+            rounds += 1
+        elapsed = time.perf_counter() - start
+    finally:
+        sink.stop()
+
+    print(f'{pending} notifications -> {sent} digests '
+          f'({handler.messages} received, {len(handler.recipients)} '
+          f'recipients) over {len(handler.sessions)} SMTP connections '
+          f'in {rounds} rounds, {elapsed:.1f} s')
+    if handler.messages != sent:
+        sys.exit('the sink did not receive every digest')
+
+
+if __name__ == '__main__':
+    main()
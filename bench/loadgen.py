@@ -0,0 +1,136 @@
+"""
+loadgen.py - Small threaded HTTP load generator used by the bench scripts
+authors: Beatrix Kim, Bessie Li, Samiksha Singh
+"""
+import collections
+import http.cookiejar
+import threading
+import time
+import urllib.parse
+import urllib.request
+from urllib.error import HTTPError
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Report redirects (e.g. after a form POST) instead of following them"""
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def percentile(samples, pct):
+    """Return the pct-th percentile (0-100) of a list of numbers"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    k = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[k]
+
+
+def summarize(latencies, errors, elapsed):
+    """Turn raw latencies (seconds) into a stats dictionary"""
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+    }
+
+
+def new_session():
+    """An opener with its own cookie jar, i.e. one browser session"""
+    return urllib.request.build_opener(
+        urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()),
+        _NoRedirect)
+
+
+def fetch(url, opener=None, data=None, headers=None, method=None):
+    """Issue one request and return (status, body bytes).
+    data may be a dict (sent as a form) or bytes"""
+    if isinstance(data, dict):
+        data = urllib.parse.urlencode(data).encode()
+    req = urllib.request.Request(url, data=data, headers=headers or {},
+                                 method=method)
+    opener = opener or urllib.request.build_opener(_NoRedirect)
+    try:
+        with opener.open(req, timeout=30) as resp:
+            return resp.status, resp.read()
+    except HTTPError as err:
+        return err.code, err.read()
+
+
+def login(base, email, password):
+    """Log in through the /login form and return the session's opener"""
+    opener = new_session()
+    fetch(base + '/login', opener,
+          data={'email': email, 'password': password})
+    return opener
+
+
+def run_load(make_request, total, concurrency, setup=None):
+    """
+    Call make_request(i, ctx) total times from concurrency threads, where
+    ctx is whatever setup() returned for that thread (None without setup).
+    make_request returns (label, status); statuses >= 400 count as errors.
+    Returns {label: stats} plus an 'ALL' entry, see summarize().
+    """
+    latencies = collections.defaultdict(list)
+    errors = collections.Counter()
+    lock = threading.Lock()
+    counter = iter(range(total))
+
+    def worker():
+        ctx = setup() if setup else None
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            start = time.perf_counter()
+            try:
+                label, status = make_request(i, ctx)
+            except Exception:
+                label, status = 'exception', 599
+            took = time.perf_counter() - start
+            with lock:
+                latencies[label].append(took)
+                if status >= 400:
+                    errors[label] += 1
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    results = {label: summarize(samples, errors[label], elapsed)
+               for label, samples in latencies.items()}
+    results['ALL'] = summarize([x for s in latencies.values() for x in s],
+                               sum(errors.values()), elapsed)
+    return results
+
+
+def print_stats(label, stats):
+    """Print one line of stats"""
+    print(f"{label:<36} {stats['requests']:>7} req "
+          f"{stats['errors']:>5} err "
+          f"{stats['rps']:>9.1f} rps "
+          f"p50 {stats['p50_ms']:>8.1f} ms "
+          f"p95 {stats['p95_ms']:>8.1f} ms "
+          f"p99 {stats['p99_ms']:>8.1f} ms")
+
+
+def print_comparison(label, stats, baseline):
+    """Print stats with the % change from a baseline stats dictionary"""
+    def delta(key):
+        old = baseline.get(key) or 0
+        if not old:
+            return '   n/a'
+        return f'{(stats[key] - old) / old * 100:+6.1f}%'
+    print(f"{label:<36} rps {stats['rps']:>9.1f} ({delta('rps')}) "
+          f"p50 {stats['p50_ms']:>8.1f} ({delta('p50_ms')}) "
+          f"p95 {stats['p95_ms']:>8.1f} ({delta('p95_ms')}) "
+          f"p99 {stats['p99_ms']:>8.1f} ({delta('p99_ms')})")
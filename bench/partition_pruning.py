@@ -0,0 +1,138 @@
+"""
+partition_pruning.py - Check that past-date queries only read the months
+they cover of the partitioned events_archive
+authors: Beatrix Kim, Bessie Li, Samiksha Singh
+
+Against a bench/seed.py database that has been archived and partitioned:
+    flask --app app archive-events
+    flask --app app partition-archive
+    python bench/partition_pruning.py --db clump_bench
+EXPLAINs the calendar and forum queries the app runs (built by event.py
+and forum.py themselves), prints which of events_archive's partitions
+each one reads and its median run time, and exits non-zero if a query
+over a date range reads partitions outside that range.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import timedelta
+
+import cs304dbi as dbi
+
+# the app's modules, from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+import archive  # noqa: E402
+import event  # noqa: E402
+import forum  # noqa: E402
+
+
+def explain(conn, sql, args):
+    """EXPLAIN rows for a query, with the partitions column"""
+    curs = dbi.dict_cursor(conn)
+    curs.execute('EXPLAIN ' + sql, args)
+    rows = curs.fetchall()
+    if rows and 'partitions' not in rows[0]:
+        # MariaDB only shows partitions when asked
+        curs.execute('EXPLAIN PARTITIONS ' + sql, args)
+        rows = curs.fetchall()
+    return rows
+
+
+def median_ms(conn, sql, args, runs):
+    """Median wall time of running the query and fetching its rows"""
+    curs = dbi.cursor(conn)
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        curs.execute(sql, args)
+        curs.fetchall()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def expected_partitions(partitions, start, end):
+    """Names of the partitions that can hold dates from start to end"""
+    names = []
+    lower = None
+    for name, bound in partitions:
+        if ((lower is None or lower <= end)
+                and (bound is None or start < bound)):
+            names.append(name)
+        lower = bound
+    return names
+
+
+def week_of(day):
+    """(Sunday, Saturday) of day's calendar week"""
+    sunday = day - timedelta(days=(day.weekday() + 1) % 7)
+    return sunday, sunday + timedelta(days=6)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--db', default='clump_bench')
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    dbi.conf(args.db)
+    conn = dbi.connect()
+    partitions = archive.get_partitions(conn)
+    if len(partitions) < 2:
+        sys.exit('events_archive has no monthly partitions; run '
+                 'flask --app app partition-archive first')
+    curs = dbi.cursor(conn)
+    curs.execute('SELECT MIN(date), MAX(date), MIN(eid) FROM events_archive')
+    oldest, newest, archived_eid = curs.fetchone()
+    if oldest is None:
+        sys.exit('events_archive is empty; run '
+                 'flask --app app archive-events first')
+
+    # (label, sql, args, date range it should be pruned to, or None)
+    checks = []
+    for label, day in [('calendar, newest archived week', newest),
+                       ('calendar, oldest archived week', oldest)]:
+        start, end = week_of(day)
+        checks.append((label, *event.range_events_query(start, end),
+                       (start, end)))
+    start = newest - timedelta(days=61)
+    checks.append(('/api/events, 62 archived days',
+                   *event.range_events_query(start, newest), (start, newest)))
+    start, end = week_of(newest)
+    checks.append(('calendar ETag stamp',
+                   *event.range_events_query(start, end,
+                                             sql=event.RANGE_STAMP_SQL),
+                   (start, end)))
+    # looked up by eid, so every partition is probed (by primary key)
+    checks.append(('event panel, archived event', event.EVENT_BY_ID_SQL,
+                   [archived_eid, archived_eid], None))
+    # no date filter: reads the whole archive, as it should
+    checks.append(('forum, show past',
+                   archive.union_all(forum.EVENTS_WITH_FORUMS_SQL, where=''),
+                   [], None))
+
+    failed = []
+    print(f'events_archive: {len(partitions)} partitions, '
+          f'{oldest} to {newest}\n')
+    for label, sql, query_args, dates in checks:
+        read = set()
+        for row in explain(conn, sql, query_args):
+            if row['table'] in ('e', 'events_archive') and row['partitions']:
+                read.update(row['partitions'].split(','))
+        line = f'{label:<32} {len(read):>4}/{len(partitions)} partitions'
+        if dates:
+            extra = read - set(expected_partitions(partitions, *dates))
+            if extra:
+                failed.append(label)
+                line += f' NOT PRUNED ({len(extra)} extra)'
+        ms = median_ms(conn, sql, query_args, args.runs)
+        print(f'{line:<64} {ms:8.2f} ms')
+
+    if failed:
+        sys.exit(f'\nno partition pruning for: {", ".join(failed)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+payload_sizes.py - Bytes on the wire for the main pages and API payloads
+authors: Beatrix Kim, Bessie Li, Samiksha Singh
+
+Against a running (seeded) server:
+    python bench/payload_sizes.py --base http://localhost:8000 --eid 1
+Fetches each URL once per Accept-Encoding (identity, gzip, br) and
+prints the body size, so the effect of compression and of the compact
+JSON formats (?format=compact) can be compared side by side. Pick a busy
+forum's --eid for the forum rows to mean much.
+"""
+import argparse
+from datetime import date, timedelta
+
+from loadgen import fetch
+
+ENCODINGS = ['identity', 'gzip', 'br']
+
+
+def targets(args):
+    """(label, path) pairs to measure"""
+    week = date.today() - timedelta(days=(date.today().weekday() + 1) % 7)
+    week_end = week + timedelta(days=6)
+    return [
+        ('calendar page', f'/calendar/{week.isoformat()}'),
+        ('/api/events (week)',
+         f'/api/events?from={week.isoformat()}&to={week_end.isoformat()}'),
+        ('/api/event/<eid>', f'/api/event/{args.eid}'),
+        ('/api/event/<eid>/forum', f'/api/event/{args.eid}/forum'),
+        ('/api/event/<eid>/forum compact',
+         f'/api/event/{args.eid}/forum?format=compact'),
+        ('forum list', '/forum'),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--base', default='http://localhost:8000')
+    parser.add_argument('--eid', type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'':<34}" + ''.join(f'{enc:>12}' for enc in ENCODINGS))
+    for label, path in targets(args):
+        sizes = []
+        for encoding in ENCODINGS:
+            # urllib does not decode, so len(body) is the transfer size
+            status, body = fetch(args.base + path,
+                                 headers={'Accept-Encoding': encoding})
+            sizes.append(f'{len(body):>12,}' if status == 200
+                         else f'{"HTTP " + str(status):>12}')
+        print(f'{label:<34}' + ''.join(sizes))
+
+
+if __name__ == '__main__':
+    main()
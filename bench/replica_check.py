@@ -0,0 +1,69 @@
+"""
+replica_check.py - Check replica routing and read-your-writes end to end
+authors: Beatrix Kim, Bessie Li, Samiksha Singh
+
+Needs the Flask app (not the async tier) running against two MySQL
+instances, the second replicating the first and listed in
+DB_REPLICA_CNFS, and a bench/seed.py user. Stop replication first
+(STOP REPLICA on the second instance) so the replica is behind, then:
+    python bench/replica_check.py --base http://localhost:8000 --eid 1
+Posts a comment as the user and checks that the user sees it at once
+(their reads are pinned to the primary), that an anonymous reader
+doesn't (anonymous reads went to the stale replica), and that once
+--pin-seconds pass the user reads from the replica again. Exits
+non-zero if the user ever fails to see their own comment while pinned.
+"""
+import argparse
+import json
+import sys
+import time
+import uuid
+
+from loadgen import fetch, login
+
+
+def forum_texts(base, eid, opener=None):
+    """The comment texts /api/event/<eid>/forum returns"""
+    status, body = fetch(f'{base}/api/event/{eid}/forum', opener)
+    if status != 200:
+        sys.exit(f'GET /api/event/{eid}/forum: {status} {body[:200]!r}')
+    return {comment['text'] for comment in json.loads(body)['comments']}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--base', default='http://localhost:8000')
+    parser.add_argument('--eid', type=int, default=1)
+    parser.add_argument('--email', default='user1@wellesley.edu')
+    parser.add_argument('--password', default='benchmark-pass')
+    parser.add_argument('--pin-seconds', type=float, default=5,
+                        help="the server's REPLICA_PIN_SECONDS")
+    args = parser.parse_args()
+
+    user = login(args.base, args.email, args.password)
+    text = f'replica check {uuid.uuid4().hex[:8]}'
+    status, body = fetch(f'{args.base}/api/event/{args.eid}/forum/comment',
+                         user, data=json.dumps({'text': text}).encode(),
+                         headers={'Content-Type': 'application/json'})
+    if status != 200:
+        sys.exit(f'posting the comment failed: {status} {body[:200]!r}')
+    posted = time.monotonic()
+
+    seen_by_user = text in forum_texts(args.base, args.eid, user)
+    print(f'author sees the comment right away:  {seen_by_user}')
+
+    seen_by_anonymous = text in forum_texts(args.base, args.eid)
+    print(f'anonymous reader sees it:            {seen_by_anonymous}'
+          f'{"  (replica not stopped?)" if seen_by_anonymous else ""}')
+
+    time.sleep(max(0, args.pin_seconds + 1 - (time.monotonic() - posted)))
+    seen_after_pin = text in forum_texts(args.base, args.eid, user)
+    print(f'author sees it after the pin window: {seen_after_pin}'
+          f'{"" if seen_after_pin else "  (reading the replica again)"}')
+
+    if not seen_by_user:
+        sys.exit('read-your-writes failed')
+
+
+if __name__ == '__main__':
+    main()
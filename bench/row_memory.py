@@ -0,0 +1,114 @@
+"""
+row_memory.py - Compare the memory of dict rows and rows.py's slotted rows
+authors: Beatrix Kim, Bessie Li, Samiksha Singh
+
+Against a bench/seed.py database (with enough comments that one forum
+has --comments of them, e.g. --comments 1000000):
+    python bench/row_memory.py --db clump_bench
+Fetches the biggest forum's comments (up to --comments) and an event
+listing of --events rows twice, once with dbi.dict_cursor (the events
+getting start_formatted / end_formatted, as app.py used to add) and once
+with the rows.py cursor the app now uses, and prints the memory each
+result holds (tracemalloc), its peak while fetching and the fetch time.
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+import cs304dbi as dbi
+import pymysql
+
+# the app's modules, from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+import event  # noqa: E402
+import forum  # noqa: E402
+import rows  # noqa: E402
+
+
+def fetch(conn, cursor_class, sql, args):
+    """All of a query's rows, with nothing else (cursor, result
+    buffers) left holding memory"""
+    curs = conn.cursor(cursor_class)
+    curs.execute(sql, args)
+    result = curs.fetchall()
+    curs.close()
+    # the connection keeps its last result's raw rows
+    conn.cursor().execute('SELECT 1')
+    return result
+
+
+def measure(load):
+    """(rows, bytes held, peak bytes, seconds) of calling load()"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = load()
+    elapsed = time.perf_counter() - start
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, held, peak, elapsed
+
+
+def with_formatted_times(events):
+    for evt in events:
+        evt['start_formatted'] = event.format_time(evt['start'])
+        evt['end_formatted'] = event.format_time(evt['end'])
+    return events
+
+
+def compare(label, load_dicts, load_rows):
+    print(label)
+    for name, load in (('dict rows', load_dicts), ('slotted rows', load_rows)):
+        result, held, peak, elapsed = measure(load)
+        print(f'  {name:<13} {len(result):>6} rows  '
+              f'{held / 2**20:7.2f} MiB held  '
+              f'({held / max(1, len(result)):6.0f} B/row)  '
+              f'{peak / 2**20:7.2f} MiB peak  {elapsed * 1000:7.1f} ms')
+        del result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--db', default='clump_bench')
+    parser.add_argument('--comments', type=int, default=10000)
+    parser.add_argument('--events', type=int, default=5000)
+    args = parser.parse_args()
+
+    dbi.conf(args.db)
+    conn = dbi.connect()
+    curs = dbi.cursor(conn)
+    curs.execute('''SELECT fid, COUNT(*) FROM comments
+                    GROUP BY fid ORDER BY COUNT(*) DESC LIMIT 1''')
+    fid, count = curs.fetchone()
+    if count < args.comments:
+        print(f'(the biggest forum only has {count} comments)')
+
+    comments_sql = forum.FORUM_COMMENTS_SQL + ' LIMIT %s'
+    comments_args = [fid, args.comments]
+    compare(f'forum {fid}, {min(count, args.comments)} comments',
+            lambda: fetch(conn, pymysql.cursors.DictCursor,
+                          comments_sql, comments_args),
+            lambda: fetch(conn, rows.row_cursor(rows.CommentRow),
+                          comments_sql, comments_args))
+
+    # a range wide enough to hold --events events, hot and archived
+    today = date.today()
+    events_sql, events_args = event.range_events_query(
+        today - timedelta(days=3650), today + timedelta(days=365))
+    events_sql += ' LIMIT %s'
+    events_args.append(args.events)
+    compare(f'event listing, {args.events} events',
+            lambda: with_formatted_times(fetch(
+                conn, pymysql.cursors.DictCursor,
+                events_sql, events_args)),
+            lambda: fetch(conn, rows.row_cursor(rows.RangeEventRow),
+                          events_sql, events_args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+"""
+run.py - Scripted load scenarios against a running clump server
+authors: Beatrix Kim, Bessie Li, Samiksha Singh
+
+Seed a database with bench/seed.py, point the app at it and start it
+(use gunicorn --preload so every worker shares the session secret), then
+    python bench/run.py --base http://localhost:8000 --save after.json \
+        --baseline before.json
+Scenarios:
+    calendar    browse random weeks and open event panels (anonymous)
+    forum       read the forum list and event forum pages (anonymous)
+    join        many logged-in users join/leave a few hot events
+    comment     logged-in users post comment bursts to hot forums
+    create      logged-in users submit the create event form (commit-heavy)
+Prints throughput and p50/p95/p99 per route, with % change against
+--baseline when given.
+"""
+import argparse
+import json
+import random
+from datetime import date, timedelta
+
+from loadgen import (fetch, login, print_comparison, print_stats,
+                     run_load)
+
+
+def calendar_scenario(args):
+    today = date.today()
+
+    def make_request(i, ctx):
+        rng = ctx['rng']
+        if rng.random() < 0.4:
+            eid = rng.randint(1, args.events)
+            return '/api/event/<eid>', fetch(
+                f'{args.base}/api/event/{eid}')[0]
+        week = today + timedelta(weeks=rng.randint(-8, 8))
+        url = f'{args.base}/calendar/{week.isoformat()}'
+        if rng.random() < 0.3:
+            url += '?category=Study+Groups'
+        return '/calendar/<date>', fetch(url)[0]
+    return make_request, None
+
+
+def forum_scenario(args):
+    def make_request(i, ctx):
+        rng = ctx['rng']
+        roll = rng.random()
+        eid = hot_eid(rng, args)
+        if roll < 0.2:
+            return '/forum', fetch(f'{args.base}/forum')[0]
+        if roll < 0.25:
+            return '/forum?show_past=true', fetch(
+                f'{args.base}/forum?show_past=true')[0]
+        if roll < 0.6:
+            return '/forum/event/<eid>', fetch(
+                f'{args.base}/forum/event/{eid}')[0]
+        return '/api/event/<eid>/forum', fetch(
+            f'{args.base}/api/event/{eid}/forum')[0]
+    return make_request, None
+
+
+def join_scenario(args):
+    def make_request(i, ctx):
+        rng = ctx['rng']
+        eid = rng.randint(1, args.hot_events)
+        action = 'leave' if rng.random() < 0.4 else 'join'
+        status = fetch(f'{args.base}/api/event/{eid}/{action}',
+                       ctx['session'], data=b'', method='POST')[0]
+        # "already joined" and "event is full" are expected answers here
+        return f'/api/event/<eid>/{action}', 200 if status == 400 else status
+    return make_request, logged_in(args)
+
+
+def comment_scenario(args):
+    def make_request(i, ctx):
+        rng = ctx['rng']
+        eid = rng.randint(1, args.hot_events)
+        body = json.dumps({'text': f'bench comment {i}'}).encode()
+        return '/api/event/<eid>/forum/comment', fetch(
+            f'{args.base}/api/event/{eid}/forum/comment', ctx['session'],
+            data=body, headers={'Content-Type': 'application/json'})[0]
+    return make_request, logged_in(args)
+
+
+def create_scenario(args):
+    today = date.today()
+
+    def make_request(i, ctx):
+        rng = ctx['rng']
+        day = today + timedelta(days=rng.randint(1, 120))
+        hour = rng.randint(8, 20)
+        status = fetch(f'{args.base}/create_event/', ctx['session'], data={
+            'event-title': f'bench event {i}',
+            'event-date': day.isoformat(),
+            'event-start': f'{hour:02d}:00',
+            'event-end': f'{hour + 1:02d}:00',
+            'event-city': 'Wellesley',
+            'event-state': 'MA',
+            'event-desc': 'created by bench/run.py',
+            'event-cap': str(rng.randint(2, 30)),
+            'event-cid': str(rng.randint(1, 5)),
+        })[0]
+        # success redirects to the calendar; a re-rendered form is a failure
+        return 'POST /create_event/', 200 if status == 302 else 500
+    return make_request, logged_in(args)
+
+
+SCENARIOS = {
+    'calendar': calendar_scenario,
+    'forum': forum_scenario,
+    'join': join_scenario,
+    'comment': comment_scenario,
+    'create': create_scenario,
+}
+
+
+def hot_eid(rng, args):
+    """Mostly the hot events, sometimes any event"""
+    if rng.random() < 0.8:
+        return rng.randint(1, args.hot_events)
+    return rng.randint(1, args.events)
+
+
+def logged_in(args):
+    """Per-thread setup that logs in as a random seeded user"""
+    def setup():
+        rng = random.Random()
+        uid = rng.randint(1, args.users)
+        return {'rng': rng,
+                'session': login(args.base, f'user{uid}@wellesley.edu',
+                                 args.password)}
+    return setup
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--base', default='http://localhost:8000')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--requests', type=int, default=2000,
+                        help='requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--users', type=int, default=10000,
+                        help='as passed to seed.py')
+    parser.add_argument('--events', type=int, default=100000,
+                        help='as passed to seed.py')
+    parser.add_argument('--hot-events', type=int, default=20)
+    parser.add_argument('--password', default='benchmark-pass')
+    parser.add_argument('--save', help='write results to this JSON file')
+    parser.add_argument('--baseline', help='JSON file from an earlier --save')
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    results = {}
+    for name in args.scenarios.split(','):
+        make_request, setup = SCENARIOS[name](args)
+        if setup is None:
+            setup = lambda: {'rng': random.Random()}
+        print(f'== {name}')
+        stats = run_load(make_request, args.requests, args.concurrency,
+                         setup=setup)
+        results[name] = stats
+        for label in sorted(stats):
+            old = baseline.get(name, {}).get(label)
+            if old:
+                print_comparison(label, stats[label], old)
+            else:
+                print_stats(label, stats[label])
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
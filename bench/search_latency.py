@@ -0,0 +1,67 @@
+"""
+search_latency.py - Check /api/search latency against a target
+authors: Beatrix Kim, Bessie Li, Samiksha Singh
+
+Runs a mix of one-word, multi-word, prefix, filtered and deep-page
+searches against a server backed by a bench/seed.py database, prints
+p50/p95/p99 per query shape, and exits non-zero if any p95 misses
+--target-p95-ms:
+    python bench/search_latency.py --base http://localhost:8000
+"""
+import argparse
+import random
+import sys
+import urllib.parse
+from datetime import date, timedelta
+
+from loadgen import fetch, print_stats, run_load
+
+# seed.py builds titles/descriptions out of these words
+WORDS = ('study chem physics run yoga ride airport logan trivia movie '
+         'dinner coffee hike brunch knit code review exam essay lab').split()
+
+
+def query_shapes(rng):
+    """(label, query params) for one search of each shape"""
+    today = date.today()
+    return [
+        ('one word', {'q': rng.choice(WORDS)}),
+        ('three words', {'q': ' '.join(rng.sample(WORDS, 3))}),
+        ('prefix', {'q': rng.choice(WORDS)[:3]}),
+        ('city', {'q': 'Cambridge ' + rng.choice(WORDS)}),
+        ('date range', {'q': rng.choice(WORDS),
+                        'from': today.isoformat(),
+                        'to': (today + timedelta(days=30)).isoformat()}),
+        ('category', {'q': rng.choice(WORDS), 'category': 'Study Groups'}),
+        ('page 10', {'q': rng.choice(WORDS), 'page': 10}),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--base', default='http://localhost:8000')
+    parser.add_argument('--requests', type=int, default=700)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--target-p95-ms', type=float, default=50)
+    args = parser.parse_args()
+
+    def make_request(i, ctx):
+        label, params = query_shapes(ctx)[i % 7]
+        url = f'{args.base}/api/search?{urllib.parse.urlencode(params)}'
+        return label, fetch(url)[0]
+
+    stats = run_load(make_request, args.requests, args.concurrency,
+                     setup=random.Random)
+    missed = []
+    for label in sorted(stats):
+        print_stats(label, stats[label])
+        if label != 'ALL' and stats[label]['p95_ms'] > args.target_p95_ms:
+            missed.append(label)
+
+    if missed:
+        print(f'p95 over {args.target_p95_ms} ms: {", ".join(missed)}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
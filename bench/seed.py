@@ -0,0 +1,200 @@
+"""
+seed.py - Fill a local MySQL/MariaDB database with synthetic clump data
+authors: Beatrix Kim, Bessie Li, Samiksha Singh
+
+Generates person, calendar, events, participants, forum and comments at
+any scale, reproducibly (same --seed, same data). Point it at a SCRATCH
+database that already has the clump schema - --reset empties it first:
+    python bench/seed.py --db clump_bench --reset \
+        --users 10000 --events 100000 --comments 1000000
+Every user's password is --password, so bench/run.py can log in as
+user<N>@wellesley.edu.
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import bcrypt
+import cs304dbi as dbi
+
+CATEGORIES = ['Carpooling', 'Hobby & Fitness', 'Help & Support',
+              'Study Groups', 'Social Events']
+CITIES = [('Wellesley', 'MA'), ('Boston', 'MA'), ('Cambridge', 'MA'),
+          ('Natick', 'MA'), ('Newton', 'MA'), ('Providence', 'RI')]
+WORDS = ('study chem physics run yoga ride airport logan trivia movie '
+         'dinner coffee hike brunch knit code review exam essay lab '
+         'soccer tennis swim paint sing board games climb pset').split()
+# comments.path holds 100 levels; a parent this long takes no replies
+MAX_PATH = 100 * 11
+
+
+def sentence(rng, lo, hi):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(lo, hi)))
+
+
+def insert_chunks(conn, sql, rows, chunk):
+    """executemany rows (any iterable) in chunk-sized transactions"""
+    curs = dbi.cursor(conn)
+    batch = []
+    total = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= chunk:
+            curs.execute('START TRANSACTION')
+            curs.executemany(sql, batch)
+            conn.commit()
+            total += len(batch)
+            batch = []
+    if batch:
+        curs.execute('START TRANSACTION')
+        curs.executemany(sql, batch)
+        conn.commit()
+        total += len(batch)
+    return total
+
+
+def reset(conn):
+    """Empty every clump table (children first)"""
+    curs = dbi.cursor(conn)
+    for table in ('comments', 'forum', 'participants', 'events',
+                  'person', 'calendar'):
+        curs.execute(f'DELETE FROM {table}')
+    conn.commit()
+
+
+def gen_people(rng, n, hashed):
+    pronouns = ['she/her', 'they/them', 'she/they', 'he/him', None]
+    for uid in range(1, n + 1):
+        yield (uid, f'User {uid}', f'user{uid}@wellesley.edu', hashed,
+               sentence(rng, 3, 10), rng.randint(2026, 2030),
+               rng.choice(pronouns))
+
+
+def gen_events(rng, n, users, first_day, days):
+    for eid in range(1, n + 1):
+        day = first_day + timedelta(days=rng.randrange(days))
+        start = timedelta(hours=rng.randint(7, 21),
+                          minutes=rng.choice((0, 15, 30, 45)))
+        end = start + timedelta(minutes=rng.choice((30, 60, 90, 120)))
+        city, state = rng.choice(CITIES)
+        yield (eid, sentence(rng, 1, 4)[:30], str(start), str(end), day,
+               sentence(rng, 5, 40)[:300], rng.randint(1, users),
+               city, state, rng.randint(2, 50), rng.random() < 0.3,
+               rng.randint(1, len(CATEGORIES)))
+
+
+def gen_participants(rng, events, users, avg):
+    """Creator plus ~avg other distinct users per event (under cap)"""
+    for eid, creator, cap in events:
+        yield (eid, creator)
+        want = min(cap - 1, int(rng.expovariate(1 / avg)) if avg else 0)
+        joined = {creator}
+        while len(joined) <= want:
+            uid = rng.randint(1, users)
+            if uid not in joined:
+                joined.add(uid)
+                yield (eid, uid)
+
+
+def gen_comments(rng, n, users, n_events, first_day, days, reply_rate):
+    """
+    Comments skewed towards hot forums (fid == eid); some are replies,
+    with their materialized path (migrations/010_comment_paths.sql)
+    """
+    # forum -> (commId, path) of its latest comment
+    last_in_forum = {}
+    for comm_id in range(1, n + 1):
+        # paretovariate gives a long tail: a few forums get most comments
+        fid = min(n_events, int(rng.paretovariate(1.2)) * 7919 % n_events + 1)
+        parent, path = None, ''
+        if fid in last_in_forum and rng.random() < reply_rate:
+            parent, path = last_in_forum[fid]
+            if len(path) >= MAX_PATH:
+                # too deep: start a new thread
+                parent, path = None, ''
+        path += f'{comm_id:010d}/'
+        posted = datetime.combine(
+            first_day + timedelta(days=rng.randrange(days)),
+            datetime.min.time()) + timedelta(seconds=rng.randrange(86400))
+        last_in_forum[fid] = (comm_id, path)
+        yield (comm_id, sentence(rng, 2, 30)[:300], rng.randint(1, users),
+               fid, parent, posted, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--db', default='clump_bench')
+    parser.add_argument('--reset', action='store_true',
+                        help='delete all existing rows first')
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--events', type=int, default=100000)
+    parser.add_argument('--comments', type=int, default=1000000)
+    parser.add_argument('--participants', type=float, default=6,
+                        help='average participants per event')
+    parser.add_argument('--past-days', type=int, default=730)
+    parser.add_argument('--future-days', type=int, default=180)
+    parser.add_argument('--reply-rate', type=float, default=0.3)
+    parser.add_argument('--password', default='benchmark-pass')
+    parser.add_argument('--seed', type=int, default=304)
+    parser.add_argument('--chunk', type=int, default=5000)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    dbi.conf(args.db)
+    conn = dbi.connect()
+    curs = dbi.cursor(conn)
+
+    if args.reset:
+        reset(conn)
+    curs.execute('SELECT COUNT(*) FROM events')
+    if curs.fetchone()[0]:
+        sys.exit(f'{args.db} already has events; use --reset')
+
+    first_day = date.today() - timedelta(days=args.past_days)
+    days = args.past_days + args.future_days
+    hashed = bcrypt.hashpw(args.password.encode('utf-8'),
+                           bcrypt.gensalt()).decode('utf-8')
+
+    def step(label, sql, rows):
+        start = time.perf_counter()
+        count = insert_chunks(conn, sql, rows, args.chunk)
+        print(f'{label:<14} {count:>9} rows '
+              f'{time.perf_counter() - start:8.1f} s')
+
+    step('calendar', 'INSERT INTO calendar (cid, category) VALUES (%s, %s)',
+         enumerate(CATEGORIES, start=1))
+    step('person', '''INSERT INTO person
+                      (uid, name, email, pass, bio, year, pronouns)
+                      VALUES (%s, %s, %s, %s, %s, %s, %s)''',
+         gen_people(rng, args.users, hashed))
+
+    # keep (eid, creator, cap) to build participants without re-reading
+    event_keys = []
+
+    def events_and_keys():
+        for row in gen_events(rng, args.events, args.users, first_day, days):
+            event_keys.append((row[0], row[6], row[9]))
+            yield row
+
+    step('events', '''INSERT INTO events
+                      (eid, title, `start`, `end`, `date`, `desc`, addedBy,
+                       city, state, cap, flexible, cid)
+                      VALUES (%s, %s, %s, %s, %s, %s, %s,
+                              %s, %s, %s, %s, %s)''',
+         events_and_keys())
+    step('forum', 'INSERT INTO forum (fid, eid) VALUES (%s, %s)',
+         ((eid, eid) for eid, _, _ in event_keys))
+    step('participants', 'INSERT INTO participants (eid, uid) VALUES (%s, %s)',
+         gen_participants(rng, event_keys, args.users, args.participants))
+    step('comments', '''INSERT INTO comments
+                        (commId, text, addedBy, fid, parent_commId, postedAt,
+                         path)
+                        VALUES (%s, %s, %s, %s, %s, %s, %s)''',
+         gen_comments(rng, args.comments, args.users, args.events,
+                      first_day, days, args.reply_rate))
+
+
+if __name__ == '__main__':
+    main()
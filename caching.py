@@ -0,0 +1,59 @@
+"""
+caching.py - The app's shared cache, plus key and invalidation helpers
+authors: Beatrix Kim, Bessie Li, Samiksha Singh
+
+Uses Flask-Caching. CACHE_TYPE defaults to FileSystemCache in CACHE_DIR,
+which all gunicorn workers on a machine share, so an invalidation in one
+worker (e.g. invalidate_profiles after a join) holds in all of them.
+Use RedisCache or MemcachedCache to share it between machines; never a
+per-process cache like SimpleCache with more than one worker.
+
+Anonymous full-page cache: page_key() includes a generation (a timestamp)
+that purge_pages() advances after every write, so a purge drops all pages
+cached by any worker without having to know which ones the write affected.
+"""
+import time
+
+from flask_caching import Cache
+
+cache = Cache()
+
+
+def profile_key(uid):
+    """Cache key for a user's profile dashboard"""
+    return f'profile:{uid}'
+
+
+def invalidate_profiles(uids):
+    """Forget the cached profile dashboards of the given users"""
+    keys = [profile_key(uid) for uid in set(uids) if uid is not None]
+    if keys:
+        cache.delete_many(*keys)
+
+
+PAGE_GENERATION_KEY = 'page:generation'
+
+
+def page_generation():
+    """
+    The current page generation, kept in the shared cache so a purge in
+    one worker holds in all of them. Generations are nanosecond times,
+    so if the key is ever lost (pruned, cache cleared) the new one is
+    later than any before it and no purged page comes back
+    """
+    generation = cache.get(PAGE_GENERATION_KEY)
+    if generation is None:
+        # add, so workers racing here agree on one generation
+        cache.add(PAGE_GENERATION_KEY, time.time_ns(), timeout=0)
+        generation = cache.get(PAGE_GENERATION_KEY) or time.time_ns()
+    return generation
+
+
+def page_key(full_path, day):
+    """Cache key for an anonymous page view of full_path (with query) on day"""
+    return f'page:{page_generation()}:{day.isoformat()}:{full_path}'
+
+
+def purge_pages():
+    """Forget every cached anonymous page, in every worker"""
+    cache.set(PAGE_GENERATION_KEY, time.time_ns(), timeout=0)
@@ -2,66 +2,237 @@
 event.py - Database functions for event operations
 authors: Beatrix Kim, Bessie Li, Samiksha Singh
 """
+from datetime import date
+
 import cs304dbi as dbi
+import pymysql
+
+import archive
+import rows
+import series
+# event rows format their own times; app.py still calls e.format_time
+from rows import format_time
+
+# The table names are archive.union_all placeholders: ranges reaching
+# into the past also read the archive (partitioned by date, so only the
+# months in range are scanned)
+RANGE_EVENTS_SQL = '''
+    SELECT e.eid, e.title, e.start, e.end, e.date, e.desc,
+           e.city, e.state, e.cap, e.filename, e.updated_at, c.category
+    FROM {events} e
+    JOIN calendar c ON e.cid = c.cid
+    WHERE e.date BETWEEN %s AND %s {category_filter}
+'''
+
+# Fingerprint of the same rows RANGE_EVENTS_SQL returns, for ETags:
+# changes whenever an event in the range is added, removed or edited
+RANGE_STAMP_SQL = '''
+    SELECT COUNT(*) AS events,
+           COALESCE(BIT_XOR(CRC32(CONCAT_WS('|', e.eid, e.title, e.start,
+               e.end, e.date, e.city, e.state, e.cap, e.filename,
+               c.category))), 0) AS checksum
+    FROM {events} e
+    JOIN calendar c ON e.cid = c.cid
+    WHERE e.date BETWEEN %s AND %s {category_filter}
+'''
+
+def range_events_query(start_date, end_date, category=None,
+                       sql=RANGE_EVENTS_SQL):
+    """
+    Build (sql, args) for all events between two dates (inclusive),
+    optionally in one category. A single range scan on the
+    events(date, start) index, already in display order; a range
+    starting before today adds the archived events in it
+    """
+    args = [start_date, end_date]
+    category_filter = ''
+    if category:
+        category_filter = 'AND c.category = %s'
+        args.append(category)
+    if start_date >= date.today():
+        # nothing this recent has been archived
+        query = sql.format(category_filter=category_filter,
+                           **archive.HOT_TABLES)
+        if sql is RANGE_EVENTS_SQL:
+            query += ' ORDER BY e.date, e.start'
+        return query, args
 
-def format_time(time_delta):
-    """Convert timedelta (from MySQL TIME) to time string"""
-    if time_delta is None:
-        return 'TBD'
-    total_seconds = int(time_delta.total_seconds())
-    hours = total_seconds // 3600
-    minutes = (total_seconds % 3600) // 60
-    period = 'AM' if hours < 12 else 'PM'
-    display_hours = hours % 12
-    if display_hours == 0:
-        display_hours = 12
-    return f'{display_hours:02d}:{minutes:02d} {period}'
+    query = archive.union_all(sql, category_filter=category_filter)
+    if sql is RANGE_STAMP_SQL:
+        # combine the two halves' fingerprints
+        query = f'''
+            SELECT SUM(events) AS events, BIT_XOR(checksum) AS checksum
+            FROM ({query}) AS halves
+        '''
+    else:
+        query += ' ORDER BY date, start'
+    return query, args + args
 
-def get_week_events(conn, start_date, end_date):
+def get_range_stamp(conn, start_date, end_date, category=None):
     """
-    Fetch all events for a given week
-    Returns list of event dictionaries with formatted times
+    Return a short version string for the events in a date range,
+    cheap enough to compute on every request to answer If-None-Match
     """
     curs = dbi.dict_cursor(conn)
-    
-    query = '''
-        SELECT e.eid, e.title, e.start, e.end, e.date, e.desc,
-               e.city, e.state, e.cap, e.filename, c.category
-        FROM events e
-        JOIN calendar c ON e.cid = c.cid
-        WHERE e.date BETWEEN %s AND %s
-        ORDER BY e.date, e.start
-    '''
-
-    curs.execute(query, (start_date, end_date))
+    curs.execute(*range_events_query(start_date, end_date, category,
+                                     sql=RANGE_STAMP_SQL))
+    row = curs.fetchone()
+    return f"{row['events']}-{row['checksum']:x}"
+
+def get_week_events(conn, start_date, end_date, category=None):
+    """
+    Fetch all events for a given week (optionally in one category),
+    including the occurrences of recurring series (see series.py)
+    Returns list of rows.RangeEventRow and occurrence dictionaries,
+    all with start_formatted and end_formatted
+    """
+    curs = conn.cursor(rows.row_cursor(rows.RangeEventRow))
+    curs.execute(*range_events_query(start_date, end_date, category))
     events = curs.fetchall()
-    
-    # Format times for display
-    for event in events:
-        event['start_formatted'] = format_time(event['start'])
-        event['end_formatted'] = format_time(event['end'])
-    
-    return events
+    occurrences = series.get_range_occurrences(conn, start_date, end_date,
+                                               category)
+
+    # Format the occurrences' times for display (event rows format
+    # their own)
+    for occurrence in occurrences:
+        occurrence['start_formatted'] = format_time(occurrence['start'])
+        occurrence['end_formatted'] = format_time(occurrence['end'])
+
+    return list(series.merge_by_time(events, occurrences))
+
+def iter_range_events(conn, start_date, end_date, category=None):
+    """
+    Run the range query on an unbuffered cursor and return an iterator
+    over its rows, so long ranges stream from MySQL instead of sitting
+    in memory all at once. Consume every row before using conn again
+    """
+    curs = conn.cursor(rows.row_cursor(rows.RangeEventRow, unbuffered=True))
+    curs.execute(*range_events_query(start_date, end_date, category))
+    return _drain(curs)
+
+def _drain(curs):
+    """Yield a cursor's rows, closing it when done (or abandoned)"""
+    try:
+        for row in curs:
+            yield row
+    finally:
+        curs.close()
+
+# Subscription feeds (/feeds/...): upcoming events (and the last few
+# weeks') that a user joined or created, or in one category
+FEED_EVENTS_SQL = '''
+    SELECT e.eid, e.title, e.start, e.end, e.date, e.desc,
+           e.city, e.state, e.cap, e.updated_at, c.category
+    {feed_from}
+    ORDER BY e.date, e.start
+'''
+
+# Fingerprint of a feed's rows for its ETag: the last change to any of
+# them, plus a count and checksum so removals show up too
+FEED_STAMP_SQL = '''
+    SELECT COUNT(*) AS events,
+           COALESCE(BIT_XOR(CRC32(CONCAT_WS('|', e.eid, e.updated_at))),
+                    0) AS checksum,
+           MAX(e.updated_at) AS last_change
+    {feed_from}
+'''
+
+# creators are always participants, so this covers created events too
+USER_FEED_FROM = '''
+    FROM participants pa
+    JOIN events e ON pa.eid = e.eid
+    JOIN calendar c ON e.cid = c.cid
+    WHERE pa.uid = %s AND e.date >= %s
+'''
+
+CATEGORY_FEED_FROM = '''
+    FROM events e
+    JOIN calendar c ON e.cid = c.cid
+    WHERE e.date >= %s {category_filter}
+'''
+
+def feed_query(since, uid=None, category=None, sql=FEED_EVENTS_SQL):
+    """
+    Build (sql, args) for a feed's events on or after since: those user
+    uid takes part in if uid is given, otherwise those in category (or
+    every category if it is None)
+    """
+    if uid is not None:
+        return sql.format(feed_from=USER_FEED_FROM), [uid, since]
+    args = [since]
+    category_filter = ''
+    if category:
+        category_filter = 'AND c.category = %s'
+        args.append(category)
+    feed_from = CATEGORY_FEED_FROM.format(category_filter=category_filter)
+    return sql.format(feed_from=feed_from), args
+
+def get_feed_stamp(conn, since, uid=None, category=None):
+    """Return a short version string for a feed's events"""
+    curs = dbi.dict_cursor(conn)
+    curs.execute(*feed_query(since, uid, category, sql=FEED_STAMP_SQL))
+    row = curs.fetchone()
+    return f"{row['events']}-{row['checksum']:x}-{row['last_change']}"
+
+def iter_feed_events(conn, since, uid=None, category=None):
+    """
+    Stream a feed's events from an unbuffered cursor, as
+    iter_range_events does. Consume every row before using conn again
+    """
+    curs = conn.cursor(pymysql.cursors.SSDictCursor)
+    curs.execute(*feed_query(since, uid, category))
+    return _drain(curs)
+
+# Queries shared with async_db.py, so the sync and async API tiers
+# always return the same rows. Past weeks on the calendar show archived
+# events, so these look in the archive tables too (archive.union_all)
+# and take the eid twice
+EVENT_BY_ID_SQL = archive.union_all('''
+    SELECT e.eid, e.title, e.start, e.end, e.date, e.desc,
+           e.city, e.state, e.cap, e.flexible, 
+           e.addedBy, e.cid, e.filename,
+           p.name as creator_name, c.category, {archived} AS archived
+    FROM {events} e
+    JOIN person p ON e.addedBy = p.uid
+    JOIN calendar c ON e.cid = c.cid
+    WHERE e.eid = %s
+''')
+
+EVENT_PARTICIPANTS_SQL = archive.union_all('''
+    SELECT p.uid, p.name, p.year, p.pronouns
+    FROM {participants} pa
+    JOIN person p ON pa.uid = p.uid
+    WHERE pa.eid = %s
+''') + ' ORDER BY name'
+
+PARTICIPANT_COUNT_SQL = '''
+    SELECT (SELECT COUNT(*) FROM participants WHERE eid = %s)
+         + (SELECT COUNT(*) FROM participants_archive WHERE eid = %s)
+'''
+
+# Version stamp for the ETag of /api/event/<eid>; the columns are kept
+# current by migrations/004_version_stamps.sql
+EVENT_STAMP_SQL = archive.union_all('''
+    SELECT updated_at, participant_rev FROM {events} WHERE eid = %s
+''')
+
+def get_event_stamp(conn, eid):
+    """
+    Get the version stamp of an event (its row and its participants)
+    Returns dictionary, or None if the event does not exist
+    """
+    curs = dbi.dict_cursor(conn)
+    curs.execute(EVENT_STAMP_SQL, (eid, eid))
+    return curs.fetchone()
 
 def get_event_by_id(conn, eid):
     """
-    Get full details of a specific event including creator info
+    Get full details of a specific event including creator info,
+    archived or not (see its 'archived' column)
     Returns event dictionary or None if not found
     """
     curs = dbi.dict_cursor(conn)
-    
-    query = '''
-        SELECT e.eid, e.title, e.start, e.end, e.date, e.desc,
-               e.city, e.state, e.cap, e.flexible, 
-               e.addedBy, e.cid, e.filename,
-               p.name as creator_name, c.category
-        FROM events e
-        JOIN person p ON e.addedBy = p.uid
-        JOIN calendar c ON e.cid = c.cid
-        WHERE e.eid = %s
-    '''
-    
-    curs.execute(query, (eid,))
+    curs.execute(EVENT_BY_ID_SQL, (eid, eid))
     return curs.fetchone()
 
 def get_event_participants(conn, eid):
@@ -70,16 +241,7 @@ def get_event_participants(conn, eid):
     Returns list of participant dictionaries
     """
     curs = dbi.dict_cursor(conn)
-    
-    query = '''
-        SELECT p.uid, p.name, p.year, p.pronouns
-        FROM participants pa
-        JOIN person p ON pa.uid = p.uid
-        WHERE pa.eid = %s
-        ORDER BY p.name
-    '''
-    
-    curs.execute(query, (eid,))
+    curs.execute(EVENT_PARTICIPANTS_SQL, (eid, eid))
     return curs.fetchall()
 
 def delete_event_by_id(conn, eid):
@@ -118,9 +280,7 @@ def get_participant_count(conn, eid):
     Returns integer count
     """
     curs = dbi.cursor(conn)
-    
-    query = 'SELECT COUNT(*) FROM participants WHERE eid = %s'
-    curs.execute(query, (eid,))
+    curs.execute(PARTICIPANT_COUNT_SQL, (eid, eid))
     return curs.fetchone()[0]
 
 def update_event_filename(conn, eid, filename):
@@ -134,9 +294,9 @@ def update_event_filename(conn, eid, filename):
 def get_event_photo_filename(conn, eid):
     """Return the filename of an event's photo, or None."""
     curs = dbi.dict_cursor(conn)
-    n = curs.execute(
-        'select filename from events where eid = %s',
-        [eid]
+    n = curs.execute(archive.union_all(
+        'select filename from {events} where eid = %s'),
+        [eid, eid]
     )
     if n == 0:
         return None  # event not found
@@ -14,11 +14,23 @@ def get_categories(conn):
     ''')
     return curs.fetchall()
 
+# Shared with importer.py, which inserts many rows at once
+INSERT_EVENT_SQL = '''
+    INSERT INTO events
+        (title, `start`, `end`, `date`, `desc`,
+         addedBy, city, state, cap, flexible, cid, filename)
+    VALUES
+        (%s, %s, %s, %s, %s,
+         %s, %s, %s, %s, %s, %s, %s)
+'''
+
 def insert_event(conn, title, date_str, start_str, end_str,
                  desc, uid, city, state, cap,
                  flexible, cid, filename):
     """
-    Insert a new event into the events table and return its eid.
+    Insert a new event, its forum and the creator's participation in one
+    transaction (a single commit) and return the new eid. On any error
+    nothing is written and the error is re-raised.
 
     - date_str: 'YYYY-MM-DD'
     - start_str / end_str: 'HH:MM' or '' (we'll pass None if blank)
@@ -27,51 +39,43 @@ def insert_event(conn, title, date_str, start_str, end_str,
     """
     curs = dbi.cursor(conn)
 
-    sql = '''
-        INSERT INTO events
-            (title, `start`, `end`, `date`, `desc`,
-             addedBy, city, state, cap, flexible, cid, filename)
-        VALUES
-            (%s, %s, %s, %s, %s,
-             %s, %s, %s, %s, %s, %s, %s)
-    '''
-
     # If start_str / end_str are empty strings, convert to None so MySQL
     # will store NULL instead of '0000-00-00' or erroring.
     start_val = start_str or None
     end_val = end_str or None
 
-    curs.execute(sql, [
-        title,
-        start_val,
-        end_val,
-        date_str,
-        desc,
-        uid,
-        city,
-        state,
-        cap,
-        flexible,
-        cid,
-        filename
-    ])
-    conn.commit()
-    eid = curs.lastrowid
-    
-    # Create forum for the new event
-    curs.execute('INSERT INTO forum (eid) VALUES (%s)', [eid])
-    conn.commit()
-    
-    return eid
+    # connections autocommit, so open the transaction explicitly
+    conn.begin()
+    try:
+        curs.execute(INSERT_EVENT_SQL, [
+            title,
+            start_val,
+            end_val,
+            date_str,
+            desc,
+            uid,
+            city,
+            state,
+            cap,
+            flexible,
+            cid,
+            filename
+        ])
+        eid = curs.lastrowid
 
-def add_participant(conn, eid, uid):
-    """Insert a row into participants for (eid, uid)."""
-    curs = dbi.cursor(conn)
-    curs.execute(
-        '''
-        INSERT INTO participants (eid, uid)
-        VALUES (%s, %s)
-        ''',
-        [eid, uid]
-    )
-    conn.commit()
\ No newline at end of file
+        # Create forum for the new event and add the creator to it, so an
+        # event never exists without its forum
+        curs.execute('INSERT INTO forum (eid) VALUES (%s)', [eid])
+        curs.execute(
+            '''
+            INSERT INTO participants (eid, uid)
+            VALUES (%s, %s)
+            ''',
+            [eid, uid]
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    return eid
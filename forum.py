@@ -2,44 +2,105 @@
 forum.py - Database query functions for forum functionality
 authors: Samiksha Singh
 """
+from datetime import date
+
 import cs304dbi as dbi
+import archive
+import notify
+import rows
+import series
+
+
+# Events with their forum and counts. {where} is the date filter (if
+# any) and the table names are archive.union_all placeholders
+EVENTS_WITH_FORUMS_SQL = '''
+    SELECT e.eid, e.title, e.desc, e.date, e.start, e.end,
+           e.city, e.state, e.cap, e.filename, 
+           e.updated_at, e.participant_rev,
+           p.name as creator_name, p.uid as creator_uid,
+           c.category,
+           f.fid, f.comment_rev,
+           COUNT(DISTINCT part.uid) as participant_count,
+           COUNT(DISTINCT co.commId) as comment_count
+    FROM {events} e
+    JOIN person p ON e.addedBy = p.uid
+    JOIN calendar c ON e.cid = c.cid
+    JOIN {forum} f ON e.eid = f.eid
+    LEFT JOIN {participants} part ON e.eid = part.eid
+    LEFT JOIN {comments} co ON f.fid = co.fid
+    {where}
+    GROUP BY e.eid, e.title, e.desc, e.date, e.start, e.end,
+            e.city, e.state, e.cap, e.filename, 
+            e.updated_at, e.participant_rev, p.name, p.uid, 
+            c.category, f.fid, f.comment_rev
+'''
+
+
+# Series with their (shared) forum, one row per series; the date and
+# participant count of the occurrence shown are added by
+# series.add_next_occurrences. Series forums are never archived
+SERIES_WITH_FORUMS_SQL = '''
+    SELECT s.sid, s.title, s.desc, s.first_date, s.last_date,
+           s.interval_weeks, s.start, s.end, s.city, s.state, s.cap,
+           s.filename, s.updated_at,
+           p.name as creator_name, p.uid as creator_uid,
+           c.category,
+           f.fid, f.comment_rev,
+           (SELECT COUNT(*) FROM comments co
+            WHERE co.fid = f.fid) as comment_count
+    FROM event_series s
+    JOIN person p ON s.addedBy = p.uid
+    JOIN calendar c ON s.cid = c.cid
+    JOIN forum f ON s.sid = f.sid
+    {where}
+'''
 
 
 def get_all_events_with_forums(conn, show_past=False):
     """Get all events with their creator info, 
-    forum info, and participant counts
-    Args: show_past (bool): If True, include past events. 
-    If False, only show upcoming/current events
+    forum info, and participant counts, and one card per series
+    (see get_series_with_forums), in date order
+    Args: show_past (bool): If True, include past events, 
+    archived ones too. If False, only show upcoming/current events
+    Returns a list of rows.ForumEventRow objects and series dicts
+    (with formatted times); series have a 'sid'
     """
-    curs = dbi.dict_cursor(conn)
+    cards = get_series_with_forums(conn, show_past)
+    return list(series.merge_by_time(get_forum_events(conn, show_past),
+                                     cards))
 
-    # Build query with optional date filter
-    query = '''
-        SELECT e.eid, e.title, e.desc, e.date, e.start, e.end,
-               e.city, e.state, e.cap, e.filename, 
-               p.name as creator_name, p.uid as creator_uid,
-               c.category,
-               f.fid,
-               COUNT(DISTINCT part.uid) as participant_count,
-               COUNT(DISTINCT co.commId) as comment_count
-        FROM events e
-        JOIN person p ON e.addedBy = p.uid
-        JOIN calendar c ON e.cid = c.cid
-        JOIN forum f ON e.eid = f.eid
-        LEFT JOIN participants part ON e.eid = part.eid
-        LEFT JOIN comments co ON f.fid = co.fid
-    '''
 
-    if not show_past:
-        query += ' WHERE e.date >= CURDATE()'
-    
-    query += '''
-        GROUP BY e.eid, e.title, e.desc, e.date, e.start, e.end,
-                e.city, e.state, e.cap, e.filename, p.name, p.uid, 
-                c.category, f.fid
-        ORDER BY e.date ASC, e.start ASC
-    '''
-    
+def get_series_with_forums(conn, show_past=False):
+    """Get the series (all of them, or only those still running) with
+    their creator and forum info, each shown as its next occurrence
+    (its last one if it has ended), with that occurrence's
+    participant count
+    """
+    curs = dbi.dict_cursor(conn)
+    where = '' if show_past else 'WHERE s.last_date >= CURDATE()'
+    curs.execute(SERIES_WITH_FORUMS_SQL.format(where=where))
+    cards = series.add_next_occurrences(conn, list(curs.fetchall()),
+                                        date.today())
+    for card in cards:
+        card['start_formatted'] = rows.format_time(card['start'])
+        card['end_formatted'] = rows.format_time(card['end'])
+    return cards
+
+
+def get_forum_events(conn, show_past=False):
+    """The events of get_all_events_with_forums, as
+    rows.ForumEventRow objects in date order"""
+    curs = conn.cursor(rows.row_cursor(rows.ForumEventRow))
+
+    if show_past:
+        query = archive.union_all(EVENTS_WITH_FORUMS_SQL, where='')
+        query += ' ORDER BY date ASC, start ASC'
+    else:
+        # archived events are all past, so the hot tables are enough
+        query = EVENTS_WITH_FORUMS_SQL.format(
+            where='WHERE e.date >= CURDATE()', **archive.HOT_TABLES)
+        query += ' ORDER BY e.date ASC, e.start ASC'
+
     curs.execute(query)
     return curs.fetchall()
 
@@ -59,102 +120,229 @@ def get_comment_count(conn, fid):
 def get_event_details(conn, eid):
     """Get information about a specific event to be
     displayed on an event's individual page (as opposed
-    to the calendar view's event side panel)"""
+    to the calendar view's event side panel). The event
+    may be archived: see its 'archived' column"""
     curs = dbi.dict_cursor(conn)
-    curs.execute('''
+    curs.execute(archive.union_all('''
         SELECT e.eid, e.title, e.desc, e.date, e.start, e.end,
                e.city, e.state, e.cap, e.flexible, e.filename,
+               e.updated_at, e.participant_rev,
                p.name as creator_name, p.uid as creator_uid,
                c.category,
-               f.fid
-        FROM events e
+               f.fid, {archived} AS archived
+        FROM {events} e
         JOIN person p ON e.addedBy = p.uid
         JOIN calendar c ON e.cid = c.cid
-        JOIN forum f ON e.eid = f.eid
+        JOIN {forum} f ON e.eid = f.eid
         WHERE e.eid = %s
-    ''', [eid])
+    '''), [eid, eid])
     return curs.fetchone()
 
 
-def get_event_participants(conn, eid):
-    """Get all participants for an event"""
+def get_event_participants(conn, eid, archived=False):
+    """Get all participants for an event (from the archive
+    if the event is archived)"""
+    tables = archive.ARCHIVE_TABLES if archived else archive.HOT_TABLES
     curs = dbi.dict_cursor(conn)
     curs.execute('''
         SELECT p.name, p.uid
-        FROM participants part
+        FROM {participants} part
         JOIN person p ON part.uid = p.uid
         WHERE part.eid = %s
-    ''', [eid])
+    '''.format(**tables), [eid])
     return curs.fetchall()
 
 
-def get_forum_comments(conn, fid):
-    """Get all comments for a forum, ordered by posting time"""
-    curs = dbi.dict_cursor(conn)
-    curs.execute('''
-        SELECT co.commId, co.text, co.postedAt,
-               co.parent_commId, 
-               p.name as author_name, p.uid as author_uid
-        FROM comments co
-        JOIN person p ON co.addedBy = p.uid
-        WHERE co.fid = %s
-        ORDER BY co.postedAt ASC
-    ''', [fid])
+# Each comment's path holds its ancestors' commIds and its own, padded
+# to PATH_DIGITS and each followed by '/' (migrations/010_comment_paths
+# .sql), so a forum's comments in path order come thread by thread with
+# every reply after its parent, and a subtree is the (fid, path) index
+# range [path, path + PATH_END)
+PATH_DIGITS = 10
+PATH_SEGMENT = PATH_DIGITS + 1
+PATH_END = ':'  # sorts after the digits and '/'
+# comments.path is VARCHAR(1100)
+MAX_COMMENT_DEPTH = 100
+# rows deleted per statement by delete_comment_by_id
+DELETE_CHUNK_SIZE = 500
+
+SET_PATH_SQL = f'''
+    UPDATE comments
+    SET path = CONCAT(%s, LPAD(commId, {PATH_DIGITS}, '0'), '/')
+    WHERE commId = %s
+'''
+
+# Queries shared with async_db.py, so the sync and async API tiers
+# always return the same rows
+FORUM_COMMENTS_TEMPLATE = '''
+    SELECT co.commId, co.text, co.postedAt,
+           co.parent_commId, 
+           p.name as author_name, p.uid as author_uid
+    FROM {comments} co
+    JOIN person p ON co.addedBy = p.uid
+    WHERE co.fid = %s
+    ORDER BY co.path
+'''
+FORUM_COMMENTS_SQL = FORUM_COMMENTS_TEMPLATE.format(**archive.HOT_TABLES)
+ARCHIVED_COMMENTS_SQL = FORUM_COMMENTS_TEMPLATE.format(
+    **archive.ARCHIVE_TABLES)
+
+FORUM_ID_BY_EVENT_SQL = 'SELECT fid FROM forum WHERE eid = %s'
+
+# Forum id plus the version stamp for the ETag of /api/event/<eid>/forum
+# (comment_rev is kept current by migrations/004_version_stamps.sql),
+# looked up in the hot and archive tables at once; takes the eid twice
+FORUM_STAMP_SQL = archive.union_all(
+    'SELECT fid, comment_rev, {archived} AS archived '
+    'FROM {forum} WHERE eid = %s')
+
+
+# A comment and its replies, in thread order, with each one's depth
+# below it (0 for the comment itself)
+COMMENT_THREAD_SQL = f'''
+    SELECT co.commId, co.text, co.postedAt, co.parent_commId,
+           p.name as author_name, p.uid as author_uid,
+           (LENGTH(co.path) - LENGTH(root.path)) DIV {PATH_SEGMENT}
+               AS depth
+    FROM comments root
+    JOIN comments co
+      ON co.fid = root.fid
+     AND co.path >= root.path AND co.path < CONCAT(root.path, '{PATH_END}')
+    JOIN person p ON co.addedBy = p.uid
+    WHERE root.commId = %s
+    ORDER BY co.path
+'''
+
+# Deepest (largest path) first, so no reply outlives its parent
+DELETE_SUBTREE_SQL = '''
+    DELETE FROM comments
+    WHERE fid = %s AND path >= %s AND path < %s
+    ORDER BY path DESC
+    LIMIT %s
+'''
+
+
+def get_forum_comments(conn, fid, archived=False):
+    """Get all comments for a forum, thread by thread, each reply
+    after its parent (from the archive if the forum's event is
+    archived), as rows.CommentRow objects"""
+    curs = conn.cursor(rows.row_cursor(rows.CommentRow))
+    curs.execute(ARCHIVED_COMMENTS_SQL if archived else FORUM_COMMENTS_SQL,
+                 [fid])
+    return curs.fetchall()
+
+
+def get_comment_thread(conn, comm_id):
+    """Get a comment and all its replies in thread order, each
+    with its depth below the comment, as rows.ThreadCommentRow
+    objects (empty if it doesn't exist)"""
+    curs = conn.cursor(rows.row_cursor(rows.ThreadCommentRow))
+    curs.execute(COMMENT_THREAD_SQL, [comm_id])
     return curs.fetchall()
 
 
 def get_forum_id_by_event(conn, eid):
     """Get the forum ID for a specific event"""
     curs = dbi.dict_cursor(conn)
-    curs.execute('SELECT fid FROM forum WHERE eid = %s', [eid])
+    curs.execute(FORUM_ID_BY_EVENT_SQL, [eid])
     result = curs.fetchone()
     return result['fid'] if result else None
 
 
+def get_forum_stamp(conn, eid):
+    """Get the forum ID, comment version and whether it is archived
+    for an event (or None)"""
+    curs = dbi.dict_cursor(conn)
+    curs.execute(FORUM_STAMP_SQL, [eid, eid])
+    return curs.fetchone()
+
+
 def insert_comment(conn, text, uid, fid):
-    """Insert a new comment into the database
-    and return the auto-generated commId"""
+    """Insert a new comment into the database, notify the
+    forum's organizer (notify.py), and return the
+    auto-generated commId"""
     curs = dbi.dict_cursor(conn)
-    curs.execute('''
-        INSERT INTO comments (text, addedBy, fid, postedAt)
-        VALUES (%s, %s, %s, NOW())
-    ''', [text, uid, fid])
-    conn.commit()
-    return curs.lastrowid
+    conn.begin()
+    try:
+        curs.execute('''
+            INSERT INTO comments (text, addedBy, fid, postedAt)
+            VALUES (%s, %s, %s, NOW())
+        ''', [text, uid, fid])
+        commId = curs.lastrowid
+        curs.execute(SET_PATH_SQL, ['', commId])
+        notify.record_comment(curs, uid, fid, commId)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return commId
 
 def insert_reply(conn, text, uid, fid, parent_commId):
-    """Insert a reply to an existing comment"""
+    """Insert a reply to an existing comment, notifying the
+    parent's author and the forum's organizer. Raises ValueError if
+    the parent is missing or already MAX_COMMENT_DEPTH deep"""
     curs = dbi.dict_cursor(conn)
-    curs.execute('''
-        INSERT INTO comments (text, addedBy, fid, parent_commId, postedAt)
-        VALUES (%s, %s, %s, %s, NOW())
-    ''', [text, uid, fid, parent_commId])
-    conn.commit()
-    return curs.lastrowid
+    conn.begin()
+    try:
+        curs.execute('SELECT path FROM comments WHERE commId = %s',
+                     [parent_commId])
+        parent = curs.fetchone()
+        if not parent:
+            raise ValueError('Comment not found')
+        if len(parent['path']) >= MAX_COMMENT_DEPTH * PATH_SEGMENT:
+            raise ValueError('This thread is too deep to reply to')
+        curs.execute('''
+            INSERT INTO comments (text, addedBy, fid, parent_commId,
+                                  postedAt)
+            VALUES (%s, %s, %s, %s, NOW())
+        ''', [text, uid, fid, parent_commId])
+        commId = curs.lastrowid
+        curs.execute(SET_PATH_SQL, [parent['path'], commId])
+        notify.record_reply(curs, uid, fid, commId, parent_commId)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return commId
 
 def get_comment_info(conn, comm_id):
     """Get comment information including the associated event ID"""
     curs = dbi.dict_cursor(conn)
     curs.execute('''
-        SELECT co.addedBy, f.eid
+        SELECT co.addedBy, co.fid, f.eid
         FROM comments co
         JOIN forum f ON co.fid = f.fid
         WHERE co.commId = %s
     ''', [comm_id])
     return curs.fetchone()
 
-def delete_comment_by_id(conn, comm_id):
-    """Delete a comment from the database"""
+def delete_comment_by_id(conn, comm_id, chunk_size=DELETE_CHUNK_SIZE):
+    """Delete a comment and all its replies, chunk_size rows per
+    statement so a long thread never holds its locks for long.
+    Returns the number of comments deleted"""
     curs = dbi.dict_cursor(conn)
-    curs.execute('DELETE FROM comments WHERE commId = %s', [comm_id])
-    conn.commit()
+    curs.execute('SELECT fid, path FROM comments WHERE commId = %s',
+                 [comm_id])
+    root = curs.fetchone()
+    if not root:
+        return 0
+    deleted = 0
+    while True:
+        curs.execute(DELETE_SUBTREE_SQL,
+                     [root['fid'], root['path'], root['path'] + PATH_END,
+                      chunk_size])
+        conn.commit()
+        deleted += curs.rowcount
+        if curs.rowcount < chunk_size:
+            return deleted
 
 
 def get_event_capacity_info(conn, eid):
     """Get event capacity and current participant count"""
     curs = dbi.dict_cursor(conn)
     curs.execute('''
-        SELECT e.eid, e.cap, e.date, COUNT(p.uid) as current_count
+        SELECT e.eid, e.cap, e.date, e.addedBy,
+               COUNT(p.uid) as current_count
         FROM events e
         LEFT JOIN participants p ON e.eid = p.eid
         WHERE e.eid = %s
@@ -163,6 +351,13 @@ def get_event_capacity_info(conn, eid):
     return curs.fetchone()
 
 
+def get_participant_uids(conn, eid):
+    """Get the uids of everyone participating in an event"""
+    curs = dbi.cursor(conn)
+    curs.execute('SELECT uid FROM participants WHERE eid = %s', [eid])
+    return [row[0] for row in curs.fetchall()]
+
+
 def is_user_participant(conn, eid, uid):
     """Check if a user is already a participant in an event"""
     curs = dbi.dict_cursor(conn)
@@ -225,6 +420,9 @@ def add_participant(conn, eid, uid):
             INSERT INTO participants (eid, uid)
             VALUES (%s, %s)
         ''', [eid, uid])
+
+        # Tell the creator, in their next digest
+        notify.record_participation(curs, 'join', uid, eid)
         
         conn.commit()
         return True
@@ -243,10 +441,18 @@ def get_event_creator(conn, eid):
 
 
 def remove_participant(conn, eid, uid):
-    """Remove a user as a participant from an event"""
+    """Remove a user as a participant from an event,
+    notifying its creator"""
     curs = dbi.cursor(conn)
-    curs.execute('''
-        DELETE FROM participants
-        WHERE eid = %s AND uid = %s
-    ''', [eid, uid])
-    conn.commit()
\ No newline at end of file
+    conn.begin()
+    try:
+        curs.execute('''
+            DELETE FROM participants
+            WHERE eid = %s AND uid = %s
+        ''', [eid, uid])
+        if curs.rowcount:
+            notify.record_participation(curs, 'leave', uid, eid)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
\ No newline at end of file
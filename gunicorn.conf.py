@@ -0,0 +1,30 @@
+"""
+gunicorn.conf.py - gunicorn settings for clump
+authors: Beatrix Kim, Bessie Li, Samiksha Singh
+
+Start with
+    flask --app app warm-templates
+    PROMETHEUS_MULTIPROC_DIR=/tmp/clump-metrics gunicorn app:app
+so the workers start with compiled templates (see TEMPLATE_CACHE_DIR)
+and every worker's metrics are merged on /metrics (see metrics.py).
+"""
+import os
+import shutil
+
+workers = 4
+bind = '0.0.0.0:8000'
+
+
+def on_starting(server):
+    """Start each run with an empty metrics directory"""
+    path = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+
+
+def child_exit(server, worker):
+    """Drop a dead worker's live gauges (in-flight, open connections)"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,210 @@
+"""
+ics.py - Reading and writing iCalendar (RFC 5545) files
+authors: Beatrix Kim, Bessie Li, Samiksha Singh
+
+Just enough of the format for the events we exchange with calendar
+apps: VEVENT blocks with text, date and date-time properties. Used by
+the importer (importer.py) and the subscription feeds (/feeds/...).
+"""
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+
+# Reading
+
+def unfold(lines):
+    """
+    Join folded content lines (a line starting with a space or tab
+    continues the one before it) and drop blank ones
+    """
+    current = None
+    for line in lines:
+        line = line.rstrip('\r\n')
+        if line[:1] in (' ', '\t') and current is not None:
+            current += line[1:]
+            continue
+        if current:
+            yield current
+        current = line
+    if current:
+        yield current
+
+
+def parse_line(line):
+    """
+    Split a content line into (NAME, params, value), e.g.
+    'DTSTART;TZID=America/New_York:20250102T090000' gives
+    ('DTSTART', {'TZID': 'America/New_York'}, '20250102T090000')
+    """
+    # the value starts at the first colon outside a quoted parameter
+    quoted = False
+    for i, char in enumerate(line):
+        if char == '"':
+            quoted = not quoted
+        elif char == ':' and not quoted:
+            head, value = line[:i], line[i + 1:]
+            break
+    else:
+        head, value = line, ''
+    name, *param_parts = head.split(';')
+    params = {}
+    for part in param_parts:
+        key, _, param_value = part.partition('=')
+        params[key.upper()] = param_value.strip('"')
+    return name.upper(), params, value
+
+
+def unescape(value):
+    """Undo TEXT escaping (\\n, \\, \\; \\\\)"""
+    out = []
+    chars = iter(value)
+    for char in chars:
+        if char == '\\':
+            char = next(chars, '')
+            out.append('\n' if char in ('n', 'N') else char)
+        else:
+            out.append(char)
+    return ''.join(out)
+
+
+def zone(tzid):
+    """The time zone named tzid (IANA), or None if unknown or not given"""
+    if not tzid:
+        return None
+    try:
+        return ZoneInfo(tzid)
+    except (ZoneInfoNotFoundError, ValueError):
+        return None
+
+
+def parse_datetime(value, params, tzid=None):
+    """
+    A DATE or DATE-TIME value as (date, time or None) in the time zone
+    tzid (this server's local time if None). UTC times (ending in Z)
+    and times with a known TZID are converted to it; floating times,
+    and times with a TZID we don't know, are taken as they are
+    """
+    if params.get('VALUE') == 'DATE' or len(value) == 8:
+        return datetime.strptime(value, '%Y%m%d').date(), None
+    if value.endswith('Z'):
+        moment = datetime.strptime(value, '%Y%m%dT%H%M%SZ')
+        moment = moment.replace(tzinfo=timezone.utc)
+    else:
+        moment = datetime.strptime(value, '%Y%m%dT%H%M%S')
+        source = zone(params.get('TZID'))
+        if source is None:
+            return moment.date(), moment.time()
+        moment = moment.replace(tzinfo=source)
+    moment = moment.astimezone(zone(tzid)).replace(tzinfo=None)
+    return moment.date(), moment.time()
+
+
+def iter_events(lines):
+    """
+    Yield each VEVENT in an iCalendar file as a dict from property name
+    to (params, value), with TEXT values unescaped. Only the first of a
+    repeated property is kept
+    """
+    event = None
+    depth = 0
+    for line in unfold(lines):
+        name, params, value = parse_line(line)
+        if name == 'BEGIN':
+            if value.upper() == 'VEVENT' and event is None:
+                event = {}
+                depth = 0
+            elif event is not None:
+                # a nested component such as VALARM
+                depth += 1
+        elif name == 'END':
+            if event is not None and depth:
+                depth -= 1
+            elif event is not None and value.upper() == 'VEVENT':
+                yield event
+                event = None
+        elif event is not None and not depth and name not in event:
+            if name not in _NON_TEXT:
+                value = unescape(value)
+            event[name] = (params, value)
+
+
+# properties whose values are not TEXT, so are left escaped as they are
+_NON_TEXT = {'DTSTART', 'DTEND', 'DTSTAMP', 'RRULE', 'EXDATE'}
+
+
+# Writing
+
+def escape(text):
+    """TEXT escaping for a property value"""
+    return (text.replace('\\', '\\\\').replace(';', '\\;')
+            .replace(',', '\\,').replace('\r\n', '\\n')
+            .replace('\n', '\\n'))
+
+
+def fold(line):
+    """
+    A content line folded to at most 75 octets per line, with its CRLF.
+    Never splits a UTF-8 character
+    """
+    data = line.encode('utf-8')
+    parts = []
+    limit = 75
+    while len(data) > limit:
+        cut = limit
+        while data[cut] & 0xC0 == 0x80:
+            cut -= 1
+        parts.append(data[:cut].decode('utf-8'))
+        data = data[cut:]
+        # continuation lines lose one octet to the leading space
+        limit = 74
+    parts.append(data.decode('utf-8'))
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def format_utc(moment):
+    """A datetime (naive ones are local) as a UTC DATE-TIME value"""
+    moment = moment.astimezone(timezone.utc)
+    return moment.strftime('%Y%m%dT%H%M%SZ')
+
+
+def calendar_start(name, tzid=None):
+    """
+    The lines that open a published calendar called name. tzid is only
+    a display hint (X-WR-TIMEZONE): vevent writes times in UTC, so the
+    feed needs no VTIMEZONE
+    """
+    lines = ['BEGIN:VCALENDAR', 'VERSION:2.0',
+             'PRODID:-//clump//Wellesley events//EN',
+             'CALSCALE:GREGORIAN', 'METHOD:PUBLISH',
+             'X-WR-CALNAME:' + escape(name)]
+    if tzid:
+        lines.append('X-WR-TIMEZONE:' + tzid)
+    return ''.join(fold(line) for line in lines)
+
+
+CALENDAR_END = 'END:VCALENDAR\r\n'
+
+
+def vevent(uid, stamp, start, end=None, tzid=None, **properties):
+    """
+    One VEVENT. start and end are dates (all-day) or naive datetimes in
+    the time zone tzid (local if None), written in UTC. stamp is a naive
+    local datetime. Other properties are TEXT, named in lower case
+    (summary='...'), and are skipped when empty
+    """
+    lines = ['BEGIN:VEVENT', 'UID:' + uid, 'DTSTAMP:' + format_utc(stamp)]
+    for name, value in (('DTSTART', start), ('DTEND', end)):
+        if value is None:
+            continue
+        if isinstance(value, datetime):
+            if tzid:
+                value = value.replace(tzinfo=zone(tzid))
+            lines.append(f'{name}:{format_utc(value)}')
+        else:
+            lines.append(f"{name};VALUE=DATE:{value.strftime('%Y%m%d')}")
+    for name, value in properties.items():
+        if value not in (None, ''):
+            name = name.upper().replace('_', '-')
+            lines.append(f'{name}:{escape(str(value))}')
+    lines.append('END:VEVENT')
+    return ''.join(fold(line) for line in lines)
@@ -0,0 +1,225 @@
+"""
+importer.py - Bulk import of events from CSV and iCalendar files
+authors: Beatrix Kim, Bessie Li, Samiksha Singh
+
+Rows are checked with the create event form's rules (validation.py),
+then inserted CHUNK_SIZE at a time: one executemany for the events and
+one each for their forums and the creator's participation, committed
+together. A chunk that fails is retried row by row so only the bad
+rows are reported.
+
+CSV files have a header row naming these columns (only title, date,
+start, end, city, state and category are required):
+    title, date, start, end, city, state, description, capacity,
+    category, flexible
+where category is a category name from the calendar table.
+"""
+import csv
+import io
+
+import cs304dbi as dbi
+from pymysql.err import MySQLError
+
+import form
+import ics
+import validation
+
+CHUNK_SIZE = 500
+
+CSV_COLUMNS = ['title', 'date', 'start', 'end', 'city', 'state',
+               'description', 'capacity', 'category', 'flexible']
+
+# values of the flexible column that mean yes
+TRUE_VALUES = {'1', 'y', 'yes', 'true', 'on'}
+
+
+def read_rows(filename, data, tzid=None):
+    """
+    Parse an uploaded file into a list of row dicts keyed by
+    CSV_COLUMNS, choosing the format by the filename's extension.
+    data is the file's bytes; iCalendar times are converted to the time
+    zone tzid (see ics.parse_datetime). Raises ValueError for other
+    formats
+    """
+    text = data.decode('utf-8-sig')
+    ext = filename.rsplit('.', 1)[-1].lower()
+    if ext == 'csv':
+        return read_csv(text)
+    if ext in ('ics', 'ical'):
+        return read_ics(text, tzid)
+    raise ValueError('Import files must be .csv or .ics')
+
+
+def read_csv(text):
+    """CSV rows as dicts, with header names lower-cased"""
+    reader = csv.DictReader(io.StringIO(text))
+    return [{(key or '').strip().lower(): (value or '').strip()
+             for key, value in row.items()}
+            for row in reader]
+
+
+def read_ics(text, tzid=None):
+    """
+    VEVENTs as rows: SUMMARY is the title, DTSTART/DTEND the date and
+    times, LOCATION 'City, State', CATEGORIES the category and
+    X-CLUMP-CAPACITY the capacity. Events without a start time keep it
+    blank, which validation reports
+    """
+    rows = []
+    for event in ics.iter_events(text.splitlines()):
+        row = {
+            'title': _text(event, 'SUMMARY'),
+            'description': _text(event, 'DESCRIPTION'),
+            'category': _text(event, 'CATEGORIES').split(',')[0].strip(),
+            'capacity': _text(event, 'X-CLUMP-CAPACITY'),
+            'date': '', 'start': '', 'end': '',
+        }
+        city, _, state = _text(event, 'LOCATION').rpartition(',')
+        row['city'], row['state'] = city.strip(), state.strip()
+        try:
+            if 'DTSTART' in event:
+                day, start = ics.parse_datetime(event['DTSTART'][1],
+                                                event['DTSTART'][0], tzid)
+                row['date'] = day.isoformat()
+                if start:
+                    row['start'] = start.strftime('%H:%M')
+            if 'DTEND' in event:
+                _, end = ics.parse_datetime(event['DTEND'][1],
+                                            event['DTEND'][0], tzid)
+                if end:
+                    row['end'] = end.strftime('%H:%M')
+        except ValueError:
+            # keep the raw value so validation reports its format
+            row['date'] = row['date'] or _text(event, 'DTSTART')
+        rows.append(row)
+    return rows
+
+
+def _text(event, name):
+    """A property's value, stripped, or '' if the event doesn't have it"""
+    return event.get(name, ({}, ''))[1].strip()
+
+
+def validate_rows(rows, categories):
+    """
+    Check each row with the create event rules. categories maps lower-
+    cased category names to cids. Returns (valid, errors): valid is a
+    list of (row number, insert params) and errors a list of
+    {'row', 'errors'} dicts. Row numbers count data rows from 1
+    """
+    valid = []
+    errors = []
+    for number, row in enumerate(rows, start=1):
+        fields = {key: (row.get(key) or '').strip() for key in CSV_COLUMNS}
+        category = fields['category']
+        cid_str = ''
+        if category:
+            cid = categories.get(category.lower())
+            # an unknown name fails validation's category check
+            cid_str = str(cid) if cid is not None else category
+        (cap, cid, start_str, end_str,
+         row_errors) = validation.validate_event(
+            fields['title'], fields['date'], fields['start'],
+            fields['end'], fields['city'], fields['state'],
+            fields['description'], fields['capacity'], cid_str)
+        if row_errors:
+            errors.append({'row': number, 'errors': row_errors})
+            continue
+        valid.append((number, {
+            'title': fields['title'],
+            'date_str': fields['date'],
+            'start_str': start_str,
+            'end_str': end_str,
+            'desc': fields['description'],
+            'city': fields['city'],
+            'state': fields['state'],
+            'cap': cap,
+            'cid': cid,
+            'flexible': fields['flexible'].lower() in TRUE_VALUES,
+        }))
+    return valid, errors
+
+
+def import_rows(conn, uid, rows):
+    """
+    Validate and insert rows (from read_rows) as events created by uid.
+    Returns a report dict: rows (how many were read), created (how many
+    were inserted), eids (the new events) and errors (a list of
+    {'row', 'errors'}, ordered by row)
+    """
+    curs = dbi.dict_cursor(conn)
+    curs.execute('SELECT cid, category FROM calendar')
+    categories = {row['category'].lower(): row['cid']
+                  for row in curs.fetchall()}
+
+    valid, errors = validate_rows(rows, categories)
+    eids = []
+    for i in range(0, len(valid), CHUNK_SIZE):
+        chunk = valid[i:i + CHUNK_SIZE]
+        try:
+            eids.extend(insert_chunk(conn, uid, chunk))
+        except (MySQLError, ChunkMismatch):
+            # nothing of the chunk was written: find the offending rows;
+            # the rest still go in
+            for number, params in chunk:
+                try:
+                    eids.append(form.insert_event(
+                        conn, uid=uid, filename=None, **params))
+                except MySQLError as err:
+                    errors.append({'row': number,
+                                   'errors': [_describe(err)]})
+
+    errors.sort(key=lambda error: error['row'])
+    return {'rows': len(rows), 'created': len(eids), 'eids': eids,
+            'errors': errors}
+
+
+class ChunkMismatch(Exception):
+    """insert_chunk couldn't tell which events were the chunk's"""
+
+
+def insert_chunk(conn, uid, chunk):
+    """
+    Insert a chunk of validated rows with their forums and the creator's
+    participation in one transaction and return the new eids. On any
+    error nothing is written and the error is re-raised
+    """
+    curs = dbi.cursor(conn)
+    conn.begin()
+    try:
+        # pymysql sends this as one multi-row INSERT
+        curs.executemany(form.INSERT_EVENT_SQL, [
+            [p['title'], p['start_str'] or None, p['end_str'] or None,
+             p['date_str'], p['desc'], uid, p['city'], p['state'],
+             p['cap'], p['flexible'], p['cid'], None]
+            for _, p in chunk])
+        # lastrowid is the chunk's first eid; the rest come after it
+        # (not necessarily consecutively), so find them by creator.
+        # Anything else this user created meanwhile already has a forum
+        curs.execute('''
+            SELECT e.eid FROM events e
+            WHERE e.addedBy = %s AND e.eid >= %s
+              AND NOT EXISTS (SELECT 1 FROM forum f WHERE f.eid = e.eid)
+            ORDER BY e.eid
+        ''', [uid, curs.lastrowid])
+        eids = [row[0] for row in curs.fetchall()]
+        if len(eids) != len(chunk):
+            raise ChunkMismatch(f'expected {len(chunk)} new events, '
+                                f'found {len(eids)}')
+        curs.executemany('INSERT INTO forum (eid) VALUES (%s)',
+                         [[eid] for eid in eids])
+        curs.executemany(
+            'INSERT INTO participants (eid, uid) VALUES (%s, %s)',
+            [[eid, uid] for eid in eids])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return eids
+
+
+def _describe(err):
+    """A database error as a message for the import report"""
+    if len(err.args) > 1:
+        return f'Could not save this event: {err.args[1]}'
+    return 'Could not save this event.'
@@ -0,0 +1,73 @@
+"""
+metrics.py - Prometheus metrics for routes, the database and uploads
+authors: Beatrix Kim, Bessie Li, Samiksha Singh
+
+Uses prometheus_client. Under gunicorn, set PROMETHEUS_MULTIPROC_DIR to
+an empty directory before the workers start (see gunicorn.conf.py): each
+worker then writes its samples to its own mmap'd file, with no locking
+between processes, and /metrics merges all the files when scraped.
+"""
+import os
+
+from prometheus_client import (CollectorRegistry, Counter, Gauge, Histogram,
+                               CONTENT_TYPE_LATEST, REGISTRY, generate_latest)
+from prometheus_client import multiprocess
+
+REQUEST_SECONDS = Histogram(
+    'clump_request_seconds', 'Request latency by Flask endpoint',
+    ['endpoint', 'method'])
+REQUESTS = Counter(
+    'clump_requests_total', 'Responses by Flask endpoint and status',
+    ['endpoint', 'status'])
+IN_FLIGHT = Gauge(
+    'clump_requests_in_flight', 'Requests currently being handled',
+    ['endpoint'], multiprocess_mode='livesum')
+
+DB_CONNECTIONS_OPENED = Counter(
+    'clump_db_connections_opened_total', 'Database connections opened')
+DB_CONNECTIONS_OPEN = Gauge(
+    'clump_db_connections_open', 'Database connections currently open',
+    multiprocess_mode='livesum')
+DB_QUERIES_PER_REQUEST = Histogram(
+    'clump_db_queries_per_request', 'SQL statements run per request',
+    buckets=(1, 2, 3, 5, 8, 13, 21, 34, 55, float('inf')))
+QUERY_SECONDS = Histogram(
+    'clump_db_query_seconds', 'SQL statement latency by data-access function',
+    ['func'])
+
+UPLOAD_BYTES = Histogram(
+    'clump_upload_bytes', 'Size of saved photo uploads', ['kind'],
+    buckets=(16e3, 64e3, 256e3, 512e3, 1e6, 2e6, 5e6, float('inf')))
+UPLOAD_SECONDS = Histogram(
+    'clump_upload_seconds', 'Time to save a photo upload', ['kind'])
+
+JOINS = Counter(
+    'clump_event_joins_total', 'Attempts to join an event by outcome',
+    ['outcome'])
+
+TEMPLATE_SECONDS = Histogram(
+    'clump_template_render_seconds', 'render_template time by template',
+    ['template'])
+FILTER_SECONDS = Histogram(
+    'clump_template_filter_seconds', 'Time per call of timed Jinja filters',
+    ['filter'],
+    buckets=(1e-6, 5e-6, 1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, float('inf')))
+
+PAGE_CACHE = Counter(
+    'clump_page_cache_total', 'Anonymous page cache lookups by result',
+    ['endpoint', 'result'])
+
+
+def record_query(record):
+    """querylog listener: time each statement by data-access function"""
+    QUERY_SECONDS.labels(func=record.func).observe(record.seconds)
+
+
+def render():
+    """Return (body, content type) for the /metrics endpoint"""
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,6 @@
+-- 001_profile_indexes.sql
+-- Covering indexes for the profile page (profile.get_profile_dashboard):
+-- a user's created events by date, and a user's joined events.
+
+CREATE INDEX events_addedBy_date ON events (addedBy, date);
+CREATE INDEX participants_uid_eid ON participants (uid, eid);
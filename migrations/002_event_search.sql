@@ -0,0 +1,8 @@
+-- 002_event_search.sql
+-- Ranked full-text search over events (search.search_events). InnoDB
+-- maintains the index itself on every INSERT/UPDATE/DELETE, so
+-- form.insert_event, event.update_event and event.delete_event_by_id
+-- keep it current with no extra work.
+
+ALTER TABLE events
+    ADD FULLTEXT INDEX events_search (title, `desc`, city, state);
@@ -0,0 +1,6 @@
+-- 003_event_date_index.sql
+-- The calendar week and /api/events range queries
+-- (event.range_events_query) filter on date and sort by (date, start);
+-- this index serves both with one range scan and no filesort.
+
+CREATE INDEX events_date_start ON events (date, start);
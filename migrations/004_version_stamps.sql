@@ -0,0 +1,66 @@
+-- 004_version_stamps.sql
+-- Version stamps behind the ETags of /api/event/<eid> and
+-- /api/event/<eid>/forum (event.get_event_stamp, forum.get_forum_stamp):
+-- a conditional GET reads one small row instead of rebuilding the JSON.
+--   events.updated_at       any edit to the event row itself
+--   events.participant_rev  someone joined or left
+--   forum.comment_rev       a comment was posted, edited or deleted
+-- The triggers keep the counters current, so no write path in the app
+-- has to remember to bump them. Their UPDATEs of events set updated_at
+-- to itself, so a join or a rename doesn't count as an edit of the
+-- event (ON UPDATE would bump it, and with it the feed stamps, DTSTAMPs
+-- and cached fragments). Run with the mysql client (DELIMITER).
+
+ALTER TABLE events
+    ADD COLUMN updated_at TIMESTAMP NOT NULL
+        DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    ADD COLUMN participant_rev INT UNSIGNED NOT NULL DEFAULT 0;
+
+ALTER TABLE forum
+    ADD COLUMN comment_rev INT UNSIGNED NOT NULL DEFAULT 0;
+
+CREATE TRIGGER participants_rev_insert AFTER INSERT ON participants
+    FOR EACH ROW
+    UPDATE events
+    SET participant_rev = participant_rev + 1, updated_at = updated_at
+    WHERE eid = NEW.eid;
+
+CREATE TRIGGER participants_rev_delete AFTER DELETE ON participants
+    FOR EACH ROW
+    UPDATE events
+    SET participant_rev = participant_rev + 1, updated_at = updated_at
+    WHERE eid = OLD.eid;
+
+CREATE TRIGGER comments_rev_insert AFTER INSERT ON comments
+    FOR EACH ROW
+    UPDATE forum SET comment_rev = comment_rev + 1 WHERE fid = NEW.fid;
+
+CREATE TRIGGER comments_rev_update AFTER UPDATE ON comments
+    FOR EACH ROW
+    UPDATE forum SET comment_rev = comment_rev + 1 WHERE fid = NEW.fid;
+
+CREATE TRIGGER comments_rev_delete AFTER DELETE ON comments
+    FOR EACH ROW
+    UPDATE forum SET comment_rev = comment_rev + 1 WHERE fid = OLD.fid;
+
+-- Names, pronouns and class years appear in both payloads, so a profile
+-- edit bumps every event and forum that shows this person
+DELIMITER //
+CREATE TRIGGER person_rev_update AFTER UPDATE ON person
+    FOR EACH ROW
+BEGIN
+    IF NOT (NEW.name <=> OLD.name AND NEW.pronouns <=> OLD.pronouns
+            AND NEW.year <=> OLD.year) THEN
+        UPDATE events e
+        SET e.participant_rev = e.participant_rev + 1,
+            e.updated_at = e.updated_at
+        WHERE e.addedBy = NEW.uid
+           OR e.eid IN (SELECT p.eid FROM participants p
+                        WHERE p.uid = NEW.uid);
+        UPDATE forum f
+        SET f.comment_rev = f.comment_rev + 1
+        WHERE f.fid IN (SELECT c.fid FROM comments c
+                        WHERE c.addedBy = NEW.uid);
+    END IF;
+END//
+DELIMITER ;
@@ -0,0 +1,8 @@
+-- 005_feed_tokens.sql
+-- Secret per-user token in the calendar feed URL (/feeds/user/<token>.ics),
+-- since calendar apps can't log in. Created on first visit to the
+-- profile page (profile.create_feed_token); looked up by the unique index.
+
+ALTER TABLE person
+    ADD COLUMN feed_token CHAR(32) NULL,
+    ADD UNIQUE INDEX person_feed_token (feed_token);
@@ -0,0 +1,66 @@
+-- 006_event_series.sql
+-- Recurring events (series.py): one event_series row holds the rule
+-- (every interval_weeks weeks from first_date through last_date, on
+-- first_date's weekday) and the details every occurrence shares.
+-- Occurrences are never stored; the week and range queries expand them.
+--   series_exceptions    one occurrence cancelled or moved to other times
+--   series_participants  who joined which occurrence (the creator takes
+--                        part in all of them without a row)
+-- A series has one forum, shared by its occurrences, so forum rows now
+-- belong to an event or a series.
+
+CREATE TABLE event_series (
+    sid INT AUTO_INCREMENT PRIMARY KEY,
+    title VARCHAR(30) NOT NULL,
+    `desc` VARCHAR(300),
+    `start` TIME NOT NULL,
+    `end` TIME NOT NULL,
+    first_date DATE NOT NULL,
+    last_date DATE NOT NULL,
+    interval_weeks TINYINT UNSIGNED NOT NULL DEFAULT 1,
+    addedBy INT NOT NULL,
+    city VARCHAR(30) NOT NULL,
+    state VARCHAR(20) NOT NULL,
+    cap INT NOT NULL,
+    flexible BOOLEAN NOT NULL DEFAULT FALSE,
+    cid INT NOT NULL,
+    filename VARCHAR(100),
+    updated_at TIMESTAMP NOT NULL
+        DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (addedBy) REFERENCES person (uid) ON DELETE CASCADE,
+    FOREIGN KEY (cid) REFERENCES calendar (cid),
+    -- series.CANDIDATE_SERIES_SQL: last_date >= range start is a range
+    -- scan over the series still running (ended ones are skipped), and
+    -- first_date <= range end is checked from the same index entries
+    INDEX event_series_dates (last_date, first_date),
+    INDEX event_series_addedBy (addedBy)
+);
+
+CREATE TABLE series_exceptions (
+    sid INT NOT NULL,
+    date DATE NOT NULL,
+    cancelled BOOLEAN NOT NULL DEFAULT FALSE,
+    -- replacement times for this occurrence, if moved
+    `start` TIME,
+    `end` TIME,
+    updated_at TIMESTAMP NOT NULL
+        DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (sid, date),
+    FOREIGN KEY (sid) REFERENCES event_series (sid) ON DELETE CASCADE
+);
+
+CREATE TABLE series_participants (
+    sid INT NOT NULL,
+    date DATE NOT NULL,
+    uid INT NOT NULL,
+    PRIMARY KEY (sid, date, uid),
+    INDEX series_participants_uid (uid, date),
+    FOREIGN KEY (sid) REFERENCES event_series (sid) ON DELETE CASCADE,
+    FOREIGN KEY (uid) REFERENCES person (uid) ON DELETE CASCADE
+);
+
+ALTER TABLE forum
+    MODIFY eid INT NULL,
+    ADD COLUMN sid INT NULL,
+    ADD UNIQUE INDEX forum_sid (sid),
+    ADD FOREIGN KEY (sid) REFERENCES event_series (sid) ON DELETE CASCADE;
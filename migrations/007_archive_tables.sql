@@ -0,0 +1,15 @@
+-- 007_archive_tables.sql
+-- Archive tables for archive.py, which moves events older than
+-- ARCHIVE_AFTER_DAYS out of events, participants, forum and comments so
+-- the hot tables (and their indexes) only hold recent history.
+-- CREATE TABLE ... LIKE copies the columns and indexes but not the
+-- foreign keys or the 004_version_stamps triggers: archived rows are
+-- read-only, and instead of cascading, profile.delete_user removes a
+-- deleted account's archived rows itself (archive.forget_user).
+-- A later migration that changes one of the hot tables must make the
+-- same change to its archive table (archive.py copies with SELECT *).
+
+CREATE TABLE events_archive LIKE events;
+CREATE TABLE participants_archive LIKE participants;
+CREATE TABLE forum_archive LIKE forum;
+CREATE TABLE comments_archive LIKE comments;
@@ -0,0 +1,29 @@
+-- 008_partition_archive.sql
+-- Partition events_archive by month of date, so queries over past dates
+-- (the calendar's past weeks and /api/events, event.range_events_query)
+-- read only the months they cover, and whole months can be dropped at
+-- once (flask partition-archive --drop-before).
+-- It is the archive that is partitioned, not events: MySQL can't
+-- partition a table that has foreign keys or is referenced by one, and
+-- participants and forum cascade from events. The archive has no foreign
+-- keys (007) and holds everything older than ARCHIVE_AFTER_DAYS, so it
+-- is where years of history pile up while events stays small.
+-- Every unique key must include the partitioning column, so the primary
+-- key becomes (eid, date) (archive.py copies eids, so no AUTO_INCREMENT),
+-- and partitioned tables can't have FULLTEXT indexes (the archive isn't
+-- searched).
+-- The table starts with one catch-all partition, p_future; run
+--     flask --app app partition-archive
+-- right after this migration to give each month its own partition.
+
+ALTER TABLE events_archive DROP INDEX events_search;
+
+ALTER TABLE events_archive
+    MODIFY eid INT NOT NULL,
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (eid, date);
+
+ALTER TABLE events_archive
+    PARTITION BY RANGE COLUMNS (date) (
+        PARTITION p_future VALUES LESS THAN (MAXVALUE)
+    );
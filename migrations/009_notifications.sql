@@ -0,0 +1,22 @@
+-- 009_notifications.sql
+-- Activity that organizers (and comment authors, for replies) hear about
+-- in their email digests (notify.py). forum.py records a row per
+-- recipient when a comment, reply, join or leave happens; the digest
+-- dispatcher sends each recipient's pending rows as one email and sets
+-- sent_at. fid and commId have no foreign keys: events are archived or
+-- deleted, and comments deleted, while their notifications wait.
+
+CREATE TABLE notifications (
+    nid BIGINT AUTO_INCREMENT PRIMARY KEY,
+    recipient INT NOT NULL,
+    actor INT NOT NULL,
+    kind ENUM('comment', 'reply', 'join', 'leave') NOT NULL,
+    fid INT NOT NULL,
+    commId INT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    sent_at TIMESTAMP NULL,
+    -- notify.PENDING_SQL: the pending rows, by recipient
+    INDEX notifications_pending (sent_at, recipient, nid),
+    FOREIGN KEY (recipient) REFERENCES person (uid) ON DELETE CASCADE,
+    FOREIGN KEY (actor) REFERENCES person (uid) ON DELETE CASCADE
+);
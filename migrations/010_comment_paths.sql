@@ -0,0 +1,59 @@
+-- 010_comment_paths.sql
+-- Materialized paths for comment threads (forum.py). A comment's path is
+-- the commIds of its ancestors and its own, each zero-padded to 10
+-- digits and followed by '/', e.g. '0000000042/0000000057/'. Sorting a
+-- forum's comments by path lists every thread in order (replies right
+-- after their parent), the depth is LENGTH(path) DIV 11 - 1, and a
+-- comment's subtree is one range of the (fid, path) index:
+-- path >= its path AND path < CONCAT(its path, ':') (':' sorts after
+-- the digits and '/'). forum.insert_comment / insert_reply set it in the
+-- same transaction as the INSERT. 1100 characters allow 100 levels.
+-- comments_archive gets the same column, as 007_archive_tables.sql asks
+-- (archive.py copies comments with SELECT *). Needs MySQL 8 (WITH
+-- RECURSIVE ... UPDATE) for the backfill.
+
+ALTER TABLE comments
+    ADD COLUMN path VARCHAR(1100) CHARACTER SET ascii NOT NULL DEFAULT '';
+ALTER TABLE comments_archive
+    ADD COLUMN path VARCHAR(1100) CHARACTER SET ascii NOT NULL DEFAULT '';
+
+-- Backfill from parent_commId. A reply whose parent is gone, or more
+-- than 100 levels down, becomes the root of its own thread.
+WITH RECURSIVE tree (commId, path) AS (
+    SELECT c.commId, CAST(CONCAT(LPAD(c.commId, 10, '0'), '/')
+                          AS CHAR(1100) CHARACTER SET ascii)
+    FROM comments c
+    LEFT JOIN comments parent ON c.parent_commId = parent.commId
+    WHERE parent.commId IS NULL
+    UNION ALL
+    SELECT c.commId, CONCAT(tree.path, LPAD(c.commId, 10, '0'), '/')
+    FROM comments c
+    JOIN tree ON c.parent_commId = tree.commId
+    WHERE LENGTH(tree.path) < 1100
+)
+UPDATE comments c JOIN tree ON c.commId = tree.commId
+SET c.path = tree.path;
+UPDATE comments SET path = CONCAT(LPAD(commId, 10, '0'), '/')
+WHERE path = '';
+
+WITH RECURSIVE tree (commId, path) AS (
+    SELECT c.commId, CAST(CONCAT(LPAD(c.commId, 10, '0'), '/')
+                          AS CHAR(1100) CHARACTER SET ascii)
+    FROM comments_archive c
+    LEFT JOIN comments_archive parent ON c.parent_commId = parent.commId
+    WHERE parent.commId IS NULL
+    UNION ALL
+    SELECT c.commId, CONCAT(tree.path, LPAD(c.commId, 10, '0'), '/')
+    FROM comments_archive c
+    JOIN tree ON c.parent_commId = tree.commId
+    WHERE LENGTH(tree.path) < 1100
+)
+UPDATE comments_archive c JOIN tree ON c.commId = tree.commId
+SET c.path = tree.path;
+UPDATE comments_archive SET path = CONCAT(LPAD(commId, 10, '0'), '/')
+WHERE path = '';
+
+-- forum.FORUM_COMMENTS_SQL (ORDER BY path), COMMENT_THREAD_SQL and
+-- DELETE_SUBTREE_SQL
+ALTER TABLE comments ADD INDEX comments_thread (fid, path);
+ALTER TABLE comments_archive ADD INDEX comments_thread (fid, path);
@@ -0,0 +1,64 @@
+-- 011_stamp_precision.sql
+-- Microsecond version stamps. The updated_at columns of
+-- 004_version_stamps.sql and 006_event_series.sql were plain TIMESTAMPs,
+-- which only have 1-second resolution: two edits in the same second left
+-- updated_at unchanged, so a client that fetched between them kept
+-- getting 304 Not Modified for stale data, and the event-detail fragment
+-- keys, calendar ETags and feed stamps didn't change either.
+-- events_archive keeps the same column as events (archive.py copies
+-- with SELECT *).
+-- The participant and profile triggers of 004_version_stamps.sql are
+-- recreated as they are there now: their UPDATEs of events keep
+-- updated_at (updated_at = updated_at), where the first version let
+-- ON UPDATE bump it on every join, leave and rename. Run with the mysql
+-- client (DELIMITER).
+
+ALTER TABLE events
+    MODIFY updated_at TIMESTAMP(6) NOT NULL
+        DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6);
+ALTER TABLE events_archive
+    MODIFY updated_at TIMESTAMP(6) NOT NULL
+        DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6);
+
+ALTER TABLE event_series
+    MODIFY updated_at TIMESTAMP(6) NOT NULL
+        DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6);
+ALTER TABLE series_exceptions
+    MODIFY updated_at TIMESTAMP(6) NOT NULL
+        DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6);
+
+DROP TRIGGER IF EXISTS participants_rev_insert;
+DROP TRIGGER IF EXISTS participants_rev_delete;
+DROP TRIGGER IF EXISTS person_rev_update;
+
+CREATE TRIGGER participants_rev_insert AFTER INSERT ON participants
+    FOR EACH ROW
+    UPDATE events
+    SET participant_rev = participant_rev + 1, updated_at = updated_at
+    WHERE eid = NEW.eid;
+
+CREATE TRIGGER participants_rev_delete AFTER DELETE ON participants
+    FOR EACH ROW
+    UPDATE events
+    SET participant_rev = participant_rev + 1, updated_at = updated_at
+    WHERE eid = OLD.eid;
+
+DELIMITER //
+CREATE TRIGGER person_rev_update AFTER UPDATE ON person
+    FOR EACH ROW
+BEGIN
+    IF NOT (NEW.name <=> OLD.name AND NEW.pronouns <=> OLD.pronouns
+            AND NEW.year <=> OLD.year) THEN
+        UPDATE events e
+        SET e.participant_rev = e.participant_rev + 1,
+            e.updated_at = e.updated_at
+        WHERE e.addedBy = NEW.uid
+           OR e.eid IN (SELECT p.eid FROM participants p
+                        WHERE p.uid = NEW.uid);
+        UPDATE forum f
+        SET f.comment_rev = f.comment_rev + 1
+        WHERE f.fid IN (SELECT c.fid FROM comments c
+                        WHERE c.addedBy = NEW.uid);
+    END IF;
+END//
+DELIMITER ;
@@ -0,0 +1,342 @@
+"""
+notify.py - Activity notifications and their email digests
+authors: Beatrix Kim, Bessie Li, Samiksha Singh
+
+forum.py (and series.py, for occurrences) records a notification row
+(migrations/009_notifications.sql) for each recipient of a comment,
+reply, join or leave, in the same transaction as the activity. Instead
+of one email per comment, the dispatcher (flask send-digests) wakes up
+every DIGEST_INTERVAL_SECONDS, coalesces each recipient's pending rows
+into one digest, and sends the digests over SMTP in batches, many
+messages per connection.
+"""
+import logging
+import smtplib
+from collections import defaultdict
+from datetime import date
+from email.message import EmailMessage
+
+import cs304dbi as dbi
+import series
+
+logger = logging.getLogger('clump.notify')
+
+# The organizer of a forum: the creator of its event or series
+_ORGANIZER = 'COALESCE(e.addedBy, s.addedBy)'
+_FORUM_JOINS = '''
+    FROM forum f
+    LEFT JOIN events e ON f.eid = e.eid
+    LEFT JOIN event_series s ON f.sid = s.sid
+'''
+
+# A comment (or reply) tells the forum's organizer, unless they wrote it
+# or, for a reply, already hear about it as the parent's author (the
+# subquery is NULL for a top-level comment)
+COMMENT_SQL = f'''
+    INSERT INTO notifications (recipient, actor, kind, fid, commId)
+    SELECT {_ORGANIZER}, %s, 'comment', f.fid, %s
+    {_FORUM_JOINS}
+    WHERE f.fid = %s AND {_ORGANIZER} != %s
+      AND NOT {_ORGANIZER} <=> (SELECT addedBy FROM comments
+                                WHERE commId = %s)
+'''
+
+# A reply tells the parent comment's author, unless they wrote it
+REPLY_SQL = '''
+    INSERT INTO notifications (recipient, actor, kind, fid, commId)
+    SELECT addedBy, %s, 'reply', fid, %s
+    FROM comments
+    WHERE commId = %s AND addedBy != %s
+'''
+
+# Joining or leaving tells the event's creator
+PARTICIPATION_SQL = '''
+    INSERT INTO notifications (recipient, actor, kind, fid)
+    SELECT e.addedBy, %s, %s, f.fid
+    FROM events e
+    JOIN forum f ON f.eid = e.eid
+    WHERE e.eid = %s AND e.addedBy != %s
+'''
+
+# Joining or leaving one occurrence of a series tells the series'
+# creator, through the series' shared forum
+SERIES_PARTICIPATION_SQL = '''
+    INSERT INTO notifications (recipient, actor, kind, fid)
+    SELECT s.addedBy, %s, %s, f.fid
+    FROM event_series s
+    JOIN forum f ON f.sid = s.sid
+    WHERE s.sid = %s AND s.addedBy != %s
+'''
+
+# All pending notifications of the first %s recipients that have any,
+# with what a digest shows, a recipient's together (so nobody's rows are
+# split between two digests). The title is NULL once the event is gone
+# (archived or deleted). A series forum's rule dates its link
+PENDING_SQL = '''
+    SELECT n.nid, n.recipient, n.actor, n.kind, n.fid, n.commId,
+           r.name AS recipient_name, r.email,
+           a.name AS actor_name, c.text,
+           f.eid, f.sid, COALESCE(e.title, s.title) AS title,
+           s.first_date, s.last_date, s.interval_weeks
+    FROM (SELECT DISTINCT recipient FROM notifications
+          WHERE sent_at IS NULL
+          ORDER BY recipient
+          LIMIT %s) batch
+    JOIN notifications n
+      ON n.recipient = batch.recipient AND n.sent_at IS NULL
+    JOIN person r ON n.recipient = r.uid
+    JOIN person a ON n.actor = a.uid
+    LEFT JOIN comments c ON n.commId = c.commId
+    LEFT JOIN forum f ON n.fid = f.fid
+    LEFT JOIN events e ON f.eid = e.eid
+    LEFT JOIN event_series s ON f.sid = s.sid
+    ORDER BY n.recipient, n.nid
+'''
+
+# comments quoted per event in a digest; the rest are only counted
+QUOTED_COMMENTS = 5
+SNIPPET_LENGTH = 80
+
+
+def record_comment(curs, actor, fid, commId):
+    """Notify a forum's organizer of a new comment. Runs on the caller's
+    cursor, in its transaction"""
+    curs.execute(COMMENT_SQL, [actor, commId, fid, actor, None])
+
+
+def record_reply(curs, actor, fid, commId, parent_commId):
+    """Notify the parent comment's author and the forum's organizer of a
+    reply. Runs on the caller's cursor, in its transaction"""
+    curs.execute(REPLY_SQL, [actor, commId, parent_commId, actor])
+    curs.execute(COMMENT_SQL, [actor, commId, fid, actor, parent_commId])
+
+
+def record_participation(curs, kind, actor, eid):
+    """Notify an event's creator that actor joined or left ('join' or
+    'leave'). Runs on the caller's cursor, in its transaction"""
+    curs.execute(PARTICIPATION_SQL, [actor, kind, eid, actor])
+
+
+def record_series_participation(curs, kind, actor, sid):
+    """Notify a series' creator that actor joined or left one of its
+    occurrences. Runs on the caller's cursor, in its transaction"""
+    curs.execute(SERIES_PARTICIPATION_SQL, [actor, kind, sid, actor])
+
+
+def get_pending(conn, recipients):
+    """All pending notifications of up to recipients recipients, a
+    recipient's together"""
+    curs = dbi.dict_cursor(conn)
+    curs.execute(PENDING_SQL, [recipients])
+    return curs.fetchall()
+
+
+def mark_sent(conn, nids):
+    """Mark notifications as sent (in digests or dropped)"""
+    if not nids:
+        return
+    curs = dbi.cursor(conn)
+    curs.execute(f'''
+        UPDATE notifications SET sent_at = NOW()
+        WHERE nid IN ({', '.join(['%s'] * len(nids))})
+    ''', nids)
+    conn.commit()
+
+
+def prune_sent(conn, days, limit=10000):
+    """Delete up to limit notifications sent more than days ago"""
+    curs = dbi.cursor(conn)
+    curs.execute('''
+        DELETE FROM notifications
+        WHERE sent_at < NOW() - INTERVAL %s DAY
+        LIMIT %s
+    ''', [days, limit])
+    conn.commit()
+    return curs.rowcount
+
+
+def snippet(text):
+    """A comment shortened to one line of a digest"""
+    if text is None:
+        return '(deleted)'
+    text = ' '.join(text.split())
+    if len(text) > SNIPPET_LENGTH:
+        text = text[:SNIPPET_LENGTH - 1].rstrip() + '…'
+    return f'"{text}"'
+
+
+def net_participation(rows):
+    """
+    Names of who joined and who left, from one event's join/leave rows
+    in order, netting out anyone who joined and then left (or the other
+    way around) since the last digest
+    """
+    first, last, names = {}, {}, {}
+    for row in rows:
+        first.setdefault(row['actor'], row['kind'])
+        last[row['actor']] = row['kind']
+        names[row['actor']] = row['actor_name']
+    joined = [names[actor] for actor, kind in last.items()
+              if kind == 'join' and first[actor] == 'join']
+    left = [names[actor] for actor, kind in last.items()
+            if kind == 'leave' and first[actor] == 'leave']
+    return joined, left
+
+
+def plural(count, word):
+    return f"{count} {word}{'' if count == 1 else 's'}"
+
+
+def forum_url(row, site_url, today=None):
+    """
+    Where a digest links a forum: an event's forum page, or for a series
+    (whose forum is in the calendar's side panel) the calendar week of
+    its next occurrence, or its last one once it is over
+    """
+    if row['eid']:
+        return f"{site_url}/forum/event/{row['eid']}"
+    if row['sid']:
+        today = today or date.today()
+        day = next(series.occurrence_dates(
+            row['first_date'], row['last_date'], row['interval_weeks'],
+            today, row['last_date']), row['last_date'])
+        return f'{site_url}/calendar/{day.isoformat()}'
+    return None
+
+
+def digest_body(name, rows, site_url):
+    """The text of one recipient's digest (rows all have a title)"""
+    by_forum = defaultdict(list)
+    for row in rows:
+        by_forum[row['fid']].append(row)
+
+    lines = [f'Hi {name},', '',
+             "Here's what happened on Clump since your last digest.", '']
+    for forum_rows in by_forum.values():
+        first = forum_rows[0]
+        heading = first['title']
+        url = forum_url(first, site_url)
+        if url:
+            heading += f' ({url})'
+        lines.append(heading)
+
+        comments = [row for row in forum_rows if row['kind'] == 'comment']
+        replies = [row for row in forum_rows if row['kind'] == 'reply']
+        if comments:
+            lines.append(f'  {plural(len(comments), "new comment")}:')
+        for row in comments[:QUOTED_COMMENTS]:
+            lines.append(f"    {row['actor_name']}: {snippet(row['text'])}")
+        if len(comments) > QUOTED_COMMENTS:
+            lines.append(f'    and {len(comments) - QUOTED_COMMENTS} more')
+        for row in replies[:QUOTED_COMMENTS]:
+            lines.append(f"  {row['actor_name']} replied to your comment: "
+                         f"{snippet(row['text'])}")
+        if len(replies) > QUOTED_COMMENTS:
+            lines.append(f'  and {len(replies) - QUOTED_COMMENTS} more')
+
+        joined, left = net_participation(
+            [row for row in forum_rows if row['kind'] in ('join', 'leave')])
+        if joined:
+            lines.append(f"  Joined: {', '.join(joined)}")
+        if left:
+            lines.append(f"  Left: {', '.join(left)}")
+        lines.append('')
+    lines.append('- Clump')
+    return '\n'.join(lines)
+
+
+def build_digests(rows, sender, site_url):
+    """
+    Coalesce pending rows (in get_pending order) into digests. Returns
+    (digests, dropped): digests is a list of (nids, EmailMessage), one per
+    recipient with anything to say; dropped are the nids of rows about
+    events that are gone
+    """
+    by_recipient = defaultdict(list)
+    dropped = []
+    for row in rows:
+        if row['title'] is None:
+            dropped.append(row['nid'])
+        else:
+            by_recipient[row['recipient']].append(row)
+
+    digests = []
+    for recipient_rows in by_recipient.values():
+        first = recipient_rows[0]
+        events = len({row['fid'] for row in recipient_rows})
+        message = EmailMessage()
+        message['From'] = sender
+        message['To'] = first['email']
+        message['Subject'] = (
+            f'Clump: {plural(len(recipient_rows), "update")} on '
+            f'{plural(events, "event")}')
+        message.set_content(digest_body(first['recipient_name'],
+                                        recipient_rows, site_url))
+        digests.append(([row['nid'] for row in recipient_rows], message))
+    return digests, dropped
+
+
+def smtp_connector(host, port, username=None, password=None, use_tls=False):
+    """A function that opens an SMTP connection with these settings"""
+    def connect():
+        smtp = smtplib.SMTP(host, port, timeout=30)
+        if use_tls:
+            smtp.starttls()
+        if username:
+            smtp.login(username, password)
+        return smtp
+    return connect
+
+
+def send_batch(connect_smtp, batch, delivered):
+    """
+    Send a batch of digests over one SMTP connection, appending each
+    one's nids to delivered once the server has it, and return how many
+    it accepted. A digest the server permanently refuses (5xx) is logged
+    and dropped (its nids are still delivered, so it isn't retried);
+    temporary (4xx) and connection errors are raised
+    """
+    accepted = 0
+    with connect_smtp() as smtp:
+        for nids, message in batch:
+            try:
+                smtp.send_message(message)
+                accepted += 1
+            except (smtplib.SMTPRecipientsRefused,
+                    smtplib.SMTPNotSupportedError) as ex:
+                # e.g. a non-ASCII address the server can't take
+                logger.warning('digest to %s refused: %s', message['To'], ex)
+            except smtplib.SMTPResponseException as ex:
+                if ex.smtp_code < 500:
+                    # temporary: the rest waits for the next cycle
+                    raise
+                # permanent (sender refused, message rejected): retrying
+                # would fail the same way every cycle
+                logger.warning('digest to %s rejected: %s', message['To'],
+                               ex)
+            delivered.extend(nids)
+    return accepted
+
+
+def dispatch(conn, connect_smtp, sender, site_url, batch_size=100,
+             max_recipients=1000):
+    """
+    One digest cycle: send the pending notifications of up to
+    max_recipients recipients as one digest each, batch_size messages
+    per SMTP connection, and mark them sent. Returns the number of
+    digests the server accepted (not those it refused). If the SMTP
+    server fails, whatever it accepted is still marked sent and the rest
+    waits for the next cycle
+    """
+    digests, dropped = build_digests(get_pending(conn, max_recipients),
+                                     sender, site_url)
+    mark_sent(conn, dropped)
+    sent = 0
+    for start in range(0, len(digests), batch_size):
+        batch = digests[start:start + batch_size]
+        delivered = []
+        try:
+            sent += send_batch(connect_smtp, batch, delivered)
+        finally:
+            mark_sent(conn, delivered)
+    return sent
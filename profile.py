@@ -2,7 +2,12 @@
 password.py - Database query functions for authentication
 authors: Beatrix Kim, Bessie Li, Samiksha Singh 
 """
+import secrets
+from datetime import date
+
 import cs304dbi as dbi
+import archive
+import series
 
 
 def get_user_by_email(conn, email):
@@ -65,88 +70,222 @@ def update_user_profile(conn, uid, name, bio, year, pronouns):
     conn.commit()
 
 def delete_user(conn, uid):
-    """Delete a user account from the database"""
+    """Delete a user account from the database, with their archived
+    events and comments (the archive tables don't cascade)"""
     curs = dbi.dict_cursor(conn)
-    curs.execute('DELETE FROM person WHERE uid = %s', [uid])
-    conn.commit()
+    conn.begin()
+    try:
+        archive.forget_user(curs, uid)
+        curs.execute('DELETE FROM person WHERE uid = %s', [uid])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+def get_account_profile_uids(conn, uid):
+    """
+    uids whose profile dashboards change when uid's account is deleted:
+    uid, everyone in uid's events and upcoming series occurrences, and
+    the creators of the events uid joined. Call before delete_user
+    """
+    curs = dbi.cursor(conn)
+    curs.execute('''
+        SELECT p.uid FROM participants p
+        JOIN events e ON p.eid = e.eid
+        WHERE e.addedBy = %s
+        UNION
+        SELECT sp.uid FROM series_participants sp
+        JOIN event_series s ON sp.sid = s.sid
+        WHERE s.addedBy = %s AND sp.date >= CURDATE()
+        UNION
+        SELECT e.addedBy FROM participants p
+        JOIN events e ON p.eid = e.eid
+        WHERE p.uid = %s
+    ''', [uid, uid, uid])
+    return [uid] + [row[0] for row in curs.fetchall()]
 
 def get_user_profile(conn, uid):
     """Get user profile information"""
     curs = dbi.dict_cursor(conn)
     curs.execute('''
-        SELECT uid, name, email, bio, year, pronouns, profile_filename
+        SELECT uid, name, email, bio, year, pronouns, profile_filename,
+               feed_token
         FROM person
         WHERE uid = %s
     ''', [uid])
     return curs.fetchone()
 
 
-def get_user_created_events(conn, uid, show_past=False):
-    """Get events created by a user"""
+def create_feed_token(conn, uid):
+    """
+    Give a user the secret token of their calendar feed URL, unless they
+    already have one, and return their token
+    """
     curs = dbi.dict_cursor(conn)
-    if show_past:
-        # Show all events
-        query = '''
-            SELECT e.eid, e.title, e.date, e.start,e.end, c.category,
-                COUNT(p.uid) as participant_count
-            FROM events e
-            JOIN calendar c ON e.cid = c.cid
-            LEFT JOIN participants p ON e.eid = p.eid
-            WHERE e.addedBy = %s
-            GROUP BY e.eid
-            ORDER BY e.date DESC
-        '''
-    else:
-        # Show only upcoming events
-        query = '''
-            SELECT e.eid, e.title, e.date, e.start, e.end, c.category,
-                   COUNT(p.uid) as participant_count
-            FROM events e
-            JOIN calendar c ON e.cid = c.cid
-            LEFT JOIN participants p ON e.eid = p.eid
-            WHERE e.addedBy = %s AND e.date >= CURDATE()
-            GROUP BY e.eid
-            ORDER BY e.date, e.start
-        '''
-    curs.execute(query, [uid])
-    return curs.fetchall()
+    token = secrets.token_hex(16)
+    curs.execute('''
+        UPDATE person SET feed_token = %s
+        WHERE uid = %s AND feed_token IS NULL
+    ''', [token, uid])
+    conn.commit()
+    if curs.rowcount == 0:
+        # someone (another tab) got there first
+        curs.execute('SELECT feed_token FROM person WHERE uid = %s', [uid])
+        token = curs.fetchone()['feed_token']
+    return token
 
 
-def get_user_joined_events(conn, uid, show_past=False):
-    """Get events a user is participating in,
-    excluding their own (visible in created events!)"""
+def get_uid_by_feed_token(conn, token):
+    """Return the uid whose calendar feed token this is, or None"""
     curs = dbi.dict_cursor(conn)
+    curs.execute('SELECT uid FROM person WHERE feed_token = %s', [token])
+    row = curs.fetchone()
+    return row['uid'] if row else None
 
-    if show_past:
-        # Show all events
-        query = '''
-            SELECT e.eid, e.title, e.date, e.start, c.category,
-                p2.name as creator_name
-            FROM participants part
-            JOIN events e ON part.eid = e.eid
-            JOIN calendar c ON e.cid = c.cid
-            JOIN person p2 ON e.addedBy = p2.uid
-            WHERE part.uid = %s AND e.addedBy != %s
-            ORDER BY e.date DESC
-        '''
-        curs.execute(query, [uid, uid])
-    else: 
-        # Show only upcoming events
-        query = '''
-            SELECT e.eid, e.title, e.date, e.start, e.end, c.category,
-                   p2.name as creator_name
-            FROM participants pa
-            JOIN events e ON pa.eid = e.eid
-            JOIN calendar c ON e.cid = c.cid
-            JOIN person p2 ON e.addedBy = p2.uid
-            WHERE pa.uid = %s AND e.addedBy != %s AND e.date >= CURDATE()
-            ORDER BY e.date, e.start
-        '''
-        curs.execute(query, [uid, uid])
 
+def cursor_args(before):
+    """Query arguments for the keyset condition on (date, eid)"""
+    if not before:
+        return []
+    before_date, before_eid = before
+    return [before_date, before_date, before_eid]
+
+
+def get_user_past_created_events(conn, uid, before=None, limit=20):
+    """Get one page of a user's past created events, newest first,
+    archived ones included.
+
+    before: (date, eid) of the last event on the previous page, or None
+    for the first page. Returns up to limit + 1 rows so the caller can
+    tell whether there is another page.
+    """
+    curs = dbi.dict_cursor(conn)
+    after_cursor = ('AND (e.date < %s OR (e.date = %s AND e.eid < %s))'
+                    if before else '')
+    # each half is limited too, so it stops at the page
+    args = [uid, *cursor_args(before), limit + 1]
+    curs.execute(archive.union_all('''
+        SELECT e.eid, e.title, e.date, e.start, e.end, c.category,
+               (SELECT COUNT(*) FROM {participants} p
+                WHERE p.eid = e.eid) AS participant_count
+        FROM {events} e
+        JOIN calendar c ON e.cid = c.cid
+        WHERE e.addedBy = %s AND e.date < CURDATE() {after_cursor}
+        ORDER BY e.date DESC, e.eid DESC
+        LIMIT %s
+    ''', after_cursor=after_cursor) + '''
+        ORDER BY date DESC, eid DESC
+        LIMIT %s
+    ''', [*args, *args, limit + 1])
     return curs.fetchall()
 
 
+def get_user_past_joined_events(conn, uid, before=None, limit=20):
+    """Get one page of past events a user joined (excluding their own),
+    archived ones included, newest first. before/limit work as in
+    get_user_past_created_events
+    """
+    curs = dbi.dict_cursor(conn)
+    after_cursor = ('AND (e.date < %s OR (e.date = %s AND e.eid < %s))'
+                    if before else '')
+    args = [uid, uid, *cursor_args(before), limit + 1]
+    curs.execute(archive.union_all('''
+        SELECT e.eid, e.title, e.date, e.start, e.end, c.category,
+               p2.name as creator_name
+        FROM {participants} pa
+        JOIN {events} e ON pa.eid = e.eid
+        JOIN calendar c ON e.cid = c.cid
+        JOIN person p2 ON e.addedBy = p2.uid
+        WHERE pa.uid = %s AND e.addedBy != %s AND e.date < CURDATE()
+              {after_cursor}
+        ORDER BY e.date DESC, e.eid DESC
+        LIMIT %s
+    ''', after_cursor=after_cursor) + '''
+        ORDER BY date DESC, eid DESC
+        LIMIT %s
+    ''', [*args, *args, limit + 1])
+    return curs.fetchall()
+
+
+def get_profile_series(conn, uid):
+    """The user's series still running and the series they joined
+    upcoming occurrences of, one row per series (with a 'sid' instead
+    of an eid), as (created, joined). A created series is shown as its
+    next occurrence (series.add_next_occurrences), a joined one as the
+    next occurrence they joined
+    """
+    curs = dbi.dict_cursor(conn)
+    curs.execute('''
+        (SELECT 'created' AS kind, s.sid, s.title, s.first_date,
+                s.last_date, s.interval_weeks, s.start, s.end,
+                c.category, NULL AS creator_name, NULL AS date
+         FROM event_series s
+         JOIN calendar c ON s.cid = c.cid
+         WHERE s.addedBy = %s AND s.last_date >= CURDATE())
+        UNION ALL
+        (SELECT 'joined' AS kind, s.sid, s.title, s.first_date,
+                s.last_date, s.interval_weeks, s.start, s.end,
+                c.category, p2.name AS creator_name, MIN(sp.date) AS date
+         FROM series_participants sp
+         JOIN event_series s ON sp.sid = s.sid
+         JOIN calendar c ON s.cid = c.cid
+         JOIN person p2 ON s.addedBy = p2.uid
+         WHERE sp.uid = %s AND s.addedBy != %s AND sp.date >= CURDATE()
+         GROUP BY s.sid, s.title, s.first_date, s.last_date,
+                  s.interval_weeks, s.start, s.end, c.category, p2.name)
+    ''', [uid, uid, uid])
+    rows = curs.fetchall()
+
+    created = [r for r in rows if r['kind'] == 'created']
+    joined = [r for r in rows if r['kind'] == 'joined']
+    series.add_next_occurrences(conn, created, date.today())
+    return created, joined
+
+
+def get_profile_dashboard(conn, uid):
+    """Get everything the profile page shows on first paint in three
+    round-trips: the user row, then their UPCOMING created + joined
+    events in one UNION ALL (past events are paged in separately), then
+    their series (get_profile_series), merged in by date.
+
+    Returns (user, created_events, joined_events). Participant counts
+    come from a correlated COUNT on participants instead of GROUP BY,
+    and the covering indexes on events(addedBy, date) and
+    participants(uid, eid) (migrations/001_profile_indexes.sql) keep
+    both branches index-only until the final row lookups.
+    """
+    user = get_user_profile(conn, uid)
+
+    curs = dbi.dict_cursor(conn)
+    curs.execute('''
+        (SELECT 'created' AS kind, e.eid, e.title, e.date, e.start, e.end,
+                c.category,
+                (SELECT COUNT(*) FROM participants p
+                 WHERE p.eid = e.eid) AS participant_count,
+                NULL AS creator_name
+         FROM events e
+         JOIN calendar c ON e.cid = c.cid
+         WHERE e.addedBy = %s AND e.date >= CURDATE())
+        UNION ALL
+        (SELECT 'joined' AS kind, e.eid, e.title, e.date, e.start, e.end,
+                c.category, NULL AS participant_count,
+                p2.name AS creator_name
+         FROM participants pa
+         JOIN events e ON pa.eid = e.eid
+         JOIN calendar c ON e.cid = c.cid
+         JOIN person p2 ON e.addedBy = p2.uid
+         WHERE pa.uid = %s AND e.addedBy != %s AND e.date >= CURDATE())
+        ORDER BY date, start
+    ''', [uid, uid, uid])
+    rows = curs.fetchall()
+
+    created = [r for r in rows if r['kind'] == 'created']
+    joined = [r for r in rows if r['kind'] == 'joined']
+    created_series, joined_series = get_profile_series(conn, uid)
+    return (user, list(series.merge_by_time(created, created_series)),
+            list(series.merge_by_time(joined, joined_series)))
+
+
 def get_profile_photo_filename(conn, uid):
     """Return filename for user's profile photo, or None if user not found."""
     curs = dbi.dict_cursor(conn)
@@ -0,0 +1,144 @@
+"""
+querylog.py - Per-request SQL instrumentation for the data-access modules
+authors: Beatrix Kim, Bessie Li, Samiksha Singh
+
+app.get_conn() wraps each request's connection in an
+InstrumentedConnection. Every cursor it hands out (dbi.dict_cursor and
+dbi.cursor both go through conn.cursor) records the statement's
+fingerprint, the data-access function that ran it, its duration and its
+row count, so event.py, forum.py, profile.py and form.py need no changes.
+"""
+import logging
+import re
+import sys
+import time
+
+logger = logging.getLogger('clump.sql')
+
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.)*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+\b')
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*\?\s*,?)+\)', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """
+    Normalize a statement so that runs with different parameters group
+    together: literals become ?, IN lists collapse, whitespace is squeezed
+    """
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql.replace('%s', '?'))
+    sql = _IN_LIST.sub('IN (?)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+class QueryRecord:
+    """One executed statement"""
+    __slots__ = ('fingerprint', 'func', 'seconds', 'rows')
+
+    def __init__(self, fingerprint, func, seconds, rows):
+        self.fingerprint = fingerprint
+        self.func = func
+        self.seconds = seconds
+        self.rows = rows
+
+
+class QueryStats:
+    """All statements run on one connection (i.e. one request)"""
+
+    def __init__(self):
+        self.queries = []
+        self.listeners = []
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def total_seconds(self):
+        return sum(q.seconds for q in self.queries)
+
+    def record(self, record):
+        self.queries.append(record)
+        for listener in self.listeners:
+            listener(record)
+
+
+def _caller_name():
+    """Name of the data-access function that called execute()"""
+    # 0 = _caller_name, 1 = InstrumentedCursor.execute, 2 = the caller
+    frame = sys._getframe(2)
+    return f"{frame.f_globals.get('__name__')}.{frame.f_code.co_name}"
+
+
+class InstrumentedCursor:
+    """Cursor proxy that times and records every execute()"""
+
+    def __init__(self, cursor, conn):
+        self._cursor = cursor
+        self._conn = conn
+
+    def execute(self, query, args=None):
+        func = _caller_name()
+        start = time.perf_counter()
+        try:
+            return self._cursor.execute(query, args)
+        finally:
+            self._conn._record(query, args, func,
+                               time.perf_counter() - start,
+                               self._cursor.rowcount, self._cursor)
+
+    def executemany(self, query, args):
+        func = _caller_name()
+        start = time.perf_counter()
+        try:
+            return self._cursor.executemany(query, args)
+        finally:
+            self._conn._record(query, None, func,
+                               time.perf_counter() - start,
+                               self._cursor.rowcount, self._cursor)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class InstrumentedConnection:
+    """
+    Connection proxy whose cursors are InstrumentedCursors.
+    slow_ms: statements slower than this are logged with their EXPLAIN
+    """
+
+    def __init__(self, conn, slow_ms=None):
+        self._conn = conn
+        self.slow_ms = slow_ms
+        self.stats = QueryStats()
+
+    def cursor(self, cursor=None):
+        return InstrumentedCursor(self._conn.cursor(cursor), self)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def _record(self, query, args, func, seconds, rows, cursor):
+        self.stats.record(
+            QueryRecord(fingerprint(query), func, seconds, rows))
+        if self.slow_ms is not None and seconds * 1000 >= self.slow_ms:
+            self._log_slow(query, args, func, seconds, cursor)
+
+    def _log_slow(self, query, args, func, seconds, cursor):
+        """Log a slow statement, with its EXPLAIN plan for SELECTs"""
+        plan = None
+        # An unbuffered cursor still owns the wire, so no EXPLAIN then
+        buffered = not hasattr(cursor, 'read_next')
+        if buffered and query.lstrip().upper().startswith('SELECT'):
+            try:
+                curs = self._conn.cursor()
+                curs.execute('EXPLAIN ' + query, args)
+                plan = curs.fetchall()
+            except Exception as ex:
+                plan = f'EXPLAIN failed: {ex}'
+        logger.warning('slow query %.1f ms in %s: %s\nplan: %s',
+                       seconds * 1000, func, fingerprint(query), plan)
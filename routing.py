@@ -0,0 +1,170 @@
+"""
+routing.py - Read/write splitting between the primary and read replicas
+authors: Beatrix Kim, Bessie Li, Samiksha Singh
+
+app.get_conn() hands the data-access modules a RoutingConnection, which
+sends each statement to the primary or to a replica by what it is, so
+event.py, forum.py, profile.py and form.py need no changes:
+- plain reads (SELECT, EXPLAIN, SHOW) go to a replica;
+- writes, locking reads (FOR UPDATE, LOCK IN SHARE MODE) and every
+  statement inside a transaction go to the primary;
+- once a connection has sent the primary a write, its reads go there
+  too, so a request always reads its own writes.
+Connections are opened on first use, so a read-only request never
+connects to the primary. Across requests, app.py keeps a user who just
+wrote on the primary for REPLICA_PIN_SECONDS (see pinned_to_primary).
+"""
+import collections
+import logging
+import random
+import re
+
+import cs304dbi as dbi
+
+logger = logging.getLogger('clump.routing')
+
+# union_all queries start with '('
+_READ = re.compile(r'^[\s(]*(SELECT|EXPLAIN|SHOW)\b', re.IGNORECASE)
+_LOCKING = re.compile(
+    r'\bFOR\s+(UPDATE|SHARE)\b|\bLOCK\s+IN\s+SHARE\s+MODE\b', re.IGNORECASE)
+_BEGIN = re.compile(r'^\s*(START\s+TRANSACTION|BEGIN)\b', re.IGNORECASE)
+
+
+def is_read(query):
+    """True if a statement can run on a replica"""
+    return bool(_READ.match(query)) and not _LOCKING.search(query)
+
+
+def replica_connector(cnf_files, database):
+    """
+    A function that connects to one of the replicas described by the
+    given my.cnf files (picked at random, to spread the load), or None
+    if there are none
+    """
+    if not cnf_files:
+        return None
+
+    def connect():
+        dsn = dbi.read_cnf(random.choice(cnf_files))
+        dsn['database'] = database
+        return dbi.connect(dsn)
+    return connect
+
+
+class RoutingCursor:
+    """
+    Cursor proxy that runs each statement on a cursor of the connection
+    it is routed to (opened the first time the cursor goes there)
+    """
+
+    def __init__(self, conn, cursor_class):
+        self._conn = conn
+        self._class = cursor_class
+        self._cursor = None
+        self._target = None
+
+    def _cursor_for(self, query):
+        target = self._conn._route(query)
+        if target is not self._target:
+            self._cursor = target.cursor(self._class)
+            self._target = target
+        return self._cursor
+
+    def execute(self, query, args=None):
+        return self._cursor_for(query).execute(query, args)
+
+    def executemany(self, query, args):
+        return self._cursor_for(query).executemany(query, args)
+
+    @property
+    def rowcount(self):
+        # querylog reads this even if routing failed
+        return self._cursor.rowcount if self._cursor else -1
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class RoutingConnection:
+    """
+    Connection proxy over a primary and (optionally) a replica connection.
+    connect_primary / connect_replica open them; connect_replica None
+    means there are no replicas. pinned: send everything to the primary
+    """
+
+    def __init__(self, connect_primary, connect_replica=None, pinned=False):
+        self._connect_primary = connect_primary
+        self._connect_replica = connect_replica
+        self._primary = None
+        self._replica = None
+        self.pinned = pinned
+        self.wrote = False
+        self.in_transaction = False
+        # statements sent to each, for X-Query-Routes
+        self.routes = collections.Counter()
+
+    @property
+    def primary(self):
+        if self._primary is None:
+            self._primary = self._connect_primary()
+        return self._primary
+
+    def _replica_or_primary(self):
+        if self._replica is None:
+            try:
+                self._replica = self._connect_replica()
+            except Exception as ex:
+                # reads still work, just without the replica
+                logger.warning('replica unavailable, reading from the '
+                               'primary: %s', ex)
+                self._connect_replica = None
+                return self.primary
+        return self._replica
+
+    def _route(self, query):
+        """The connection a statement runs on (see the module docstring)"""
+        if _BEGIN.match(query):
+            self.in_transaction = True
+        if (self._connect_replica and not (self.pinned or self.wrote or
+                                           self.in_transaction)
+                and is_read(query)):
+            self.routes['replica'] += 1
+            return self._replica_or_primary()
+        if not is_read(query):
+            self.wrote = True
+        self.routes['primary'] += 1
+        return self.primary
+
+    def pin(self):
+        """Send the rest of this connection's statements to the primary"""
+        self.pinned = True
+
+    def cursor(self, cursor=None):
+        return RoutingCursor(self, cursor)
+
+    def begin(self):
+        self.in_transaction = True
+        self.wrote = True
+        self.primary.begin()
+
+    def commit(self):
+        self.in_transaction = False
+        if self._primary is not None:
+            self._primary.commit()
+
+    def rollback(self):
+        self.in_transaction = False
+        if self._primary is not None:
+            self._primary.rollback()
+
+    def close(self):
+        for conn in (self._primary, self._replica):
+            if conn is not None:
+                conn.close()
+        self._primary = self._replica = None
+
+    def __getattr__(self, name):
+        return getattr(self.primary, name)
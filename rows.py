@@ -0,0 +1,129 @@
+"""
+rows.py - Compact row objects for the hot queries
+authors: Beatrix Kim, Bessie Li, Samiksha Singh
+
+dbi.dict_cursor gives every row its own dict, and for a big forum or a
+long event listing those dicts are most of a worker's memory. The
+classes below keep a row's columns in __slots__ instead (the query's
+columns, in order), and row_cursor(RowClass) is a pymysql cursor class
+that builds them, so a data function only changes its cursor:
+    curs = conn.cursor(rows.row_cursor(rows.CommentRow))
+Rows still answer row['col'] and row.get('col'), so build_forum_response,
+series.merge_by_time and the templates take them like dicts. Event rows
+format their times when start_formatted / end_formatted are read
+instead of storing the strings. bench/row_memory.py measures the savings.
+"""
+import functools
+
+import pymysql
+
+
+def format_time(time_delta):
+    """Convert timedelta (from MySQL TIME) to time string"""
+    if time_delta is None:
+        return 'TBD'
+    total_seconds = int(time_delta.total_seconds())
+    hours = total_seconds // 3600
+    minutes = (total_seconds % 3600) // 60
+    period = 'AM' if hours < 12 else 'PM'
+    display_hours = hours % 12
+    if display_hours == 0:
+        display_hours = 12
+    return f'{display_hours:02d}:{minutes:02d} {period}'
+
+
+class Row:
+    """
+    Base of the row classes. A subclass's __slots__ are its query's
+    columns, in SELECT order
+    """
+    __slots__ = ()
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+    def __getitem__(self, name):
+        try:
+            return getattr(self, name)
+        except AttributeError:
+            raise KeyError(name) from None
+
+    def get(self, name, default=None):
+        return getattr(self, name, default)
+
+    def __repr__(self):
+        key = self.__slots__[0]
+        return f'{type(self).__name__}({key}={getattr(self, key)!r}, ...)'
+
+
+class EventTimes:
+    """Formatted start and end times of an event row, made when read"""
+    __slots__ = ()
+
+    @property
+    def start_formatted(self):
+        return format_time(self.start)
+
+    @property
+    def end_formatted(self):
+        return format_time(self.end)
+
+
+class RangeEventRow(EventTimes, Row):
+    """event.RANGE_EVENTS_SQL: the calendar and /api/events"""
+    __slots__ = ('eid', 'title', 'start', 'end', 'date', 'desc', 'city',
+                 'state', 'cap', 'filename', 'updated_at', 'category')
+
+
+class ForumEventRow(EventTimes, Row):
+    """forum.EVENTS_WITH_FORUMS_SQL: the forum page"""
+    __slots__ = ('eid', 'title', 'desc', 'date', 'start', 'end', 'city',
+                 'state', 'cap', 'filename', 'updated_at', 'participant_rev',
+                 'creator_name', 'creator_uid', 'category', 'fid',
+                 'comment_rev', 'participant_count', 'comment_count')
+
+
+class CommentRow(Row):
+    """forum.FORUM_COMMENTS_SQL: a forum's comments"""
+    __slots__ = ('commId', 'text', 'postedAt', 'parent_commId',
+                 'author_name', 'author_uid')
+
+
+class ThreadCommentRow(Row):
+    """forum.COMMENT_THREAD_SQL: a comment's subtree"""
+    __slots__ = CommentRow.__slots__ + ('depth',)
+
+
+class RowCursorMixin:
+    """Builds row_class objects, like pymysql's DictCursorMixin builds
+    dicts, after checking the query's columns are row_class's"""
+    row_class = None
+
+    def _do_get_result(self):
+        super()._do_get_result()
+        if not self.description:
+            return
+        columns = tuple(column[0] for column in self.description)
+        if columns != self.row_class.__slots__:
+            raise TypeError(f'{self.row_class.__name__} has columns '
+                            f'{self.row_class.__slots__}, the query '
+                            f'returned {columns}')
+        if self._rows:
+            self._rows = [self._conv_row(row) for row in self._rows]
+
+    def _conv_row(self, row):
+        if row is None:
+            return None
+        return self.row_class(*row)
+
+
+@functools.lru_cache(maxsize=None)
+def row_cursor(row_class, unbuffered=False):
+    """
+    The pymysql cursor class whose rows are row_class objects;
+    unbuffered: stream them, like SSDictCursor
+    """
+    base = pymysql.cursors.SSCursor if unbuffered else pymysql.cursors.Cursor
+    return type(f'{row_class.__name__}Cursor', (RowCursorMixin, base),
+                {'row_class': row_class})
@@ -0,0 +1,95 @@
+"""
+sampler.py - Opt-in statistical profiler for individual requests
+authors: Beatrix Kim, Bessie Li, Samiksha Singh
+
+A RequestSampler watches one request thread from a background thread,
+grabbing its stack every few milliseconds. Each sample is filed under a
+phase - db (inside pymysql), template (inside Jinja) or python
+(everything else, e.g. format_time loops) - and saved in the "folded"
+format read by flamegraph.pl, speedscope and inferno:
+    phase;outer_frame;...;inner_frame <samples>
+"""
+import collections
+import os
+import sys
+import threading
+import time
+
+# Frames from these files count as time spent in the database
+_DB_MARKERS = (os.sep + 'pymysql' + os.sep, 'querylog.py')
+# Frames from these files (or compiled templates) count as rendering
+_TEMPLATE_MARKERS = (os.sep + 'jinja2' + os.sep, '.html')
+
+
+def _frame_name(frame):
+    """Readable frame label: module.function or template:block"""
+    code = frame.f_code
+    if code.co_filename.endswith('.html'):
+        return f'{os.path.basename(code.co_filename)}:{code.co_name}'
+    module = frame.f_globals.get('__name__', '?')
+    return f'{module}.{code.co_name}'
+
+
+def _classify(filenames):
+    """Pick the phase for a stack, given its frames' file names"""
+    if any(m in f for f in filenames for m in _DB_MARKERS):
+        return 'db'
+    if any(m in f for f in filenames for m in _TEMPLATE_MARKERS):
+        return 'template'
+    return 'python'
+
+
+class RequestSampler:
+    """Sample the stack of thread thread_id every interval seconds"""
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self.started = None
+
+    def start(self):
+        self.started = time.time()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            filenames = []
+            while frame is not None:
+                names.append(_frame_name(frame))
+                filenames.append(frame.f_code.co_filename)
+                frame = frame.f_back
+            names.reverse()
+            phase = _classify(filenames)
+            self.samples[phase + ';' + ';'.join(names)] += 1
+
+    def phase_totals(self):
+        """Samples per phase, e.g. {'db': 12, 'template': 30, ...}"""
+        totals = collections.Counter()
+        for stack, count in self.samples.items():
+            totals[stack.split(';', 1)[0]] += count
+        return totals
+
+    def save(self, directory, label):
+        """Write the folded stacks to directory; return the file path"""
+        os.makedirs(directory, exist_ok=True)
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(self.started))
+        millis = int(self.started * 1000) % 1000
+        path = os.path.join(
+            directory,
+            f'{label}-{stamp}.{millis:03d}-{os.getpid()}-{self.thread_id}'
+            '.folded')
+        with open(path, 'w') as out:
+            for stack, count in self.samples.most_common():
+                out.write(f'{stack} {count}\n')
+        return path
@@ -0,0 +1,95 @@
+"""
+search.py - Database functions for full-text event search
+authors: Beatrix Kim, Bessie Li, Samiksha Singh
+"""
+import re
+
+import cs304dbi as dbi
+
+
+def to_boolean_query(text):
+    """
+    Turn what the user typed into a MySQL BOOLEAN MODE query: every word
+    becomes an optional prefix term (so 'yog' finds 'yoga'), and any
+    operator characters the user typed are dropped
+    """
+    words = re.findall(r'\w+', text)
+    return ' '.join(word + '*' for word in words)
+
+
+def normalize_phrase(text):
+    """
+    text's words, lower-cased and space-separated with a space at each
+    end, so one phrase is in another only as whole words in order
+    ('help support' is in 'need help support', 'help' is not)
+    """
+    return ' ' + ' '.join(re.findall(r'\w+', text.lower())) + ' '
+
+
+def search_events(conn, text, date_from=None, date_to=None, category=None,
+                  limit=20, offset=0):
+    """
+    Search events by title, desc, city and state (plus their category
+    name), best matches first. Optional filters: date range and category.
+
+    Returns up to limit + 1 rows so the caller can tell whether there
+    is another page. Uses the events_search FULLTEXT index
+    (migrations/002_event_search.sql)
+    """
+    terms = to_boolean_query(text)
+    if not terms:
+        return []
+
+    # A query naming a category ("study groups") matches its events too.
+    # calendar is tiny, so resolve those cids here instead of OR-ing a
+    # second MATCH into the indexed search
+    curs = dbi.dict_cursor(conn)
+    curs.execute('SELECT cid, category FROM calendar')
+    query = normalize_phrase(text)
+    category_cids = [row['cid'] for row in curs.fetchall()
+                     if normalize_phrase(row['category']) in query]
+
+    filters = ''
+    args = [terms]
+    if date_from:
+        filters += ' AND e.date >= %s'
+        args.append(date_from)
+    if date_to:
+        filters += ' AND e.date <= %s'
+        args.append(date_to)
+    if category:
+        filters += ' AND c.category = %s'
+        args.append(category)
+
+    # Text matches, plus (unranked) events in a named category
+    category_branch = ''
+    if category_cids:
+        placeholders = ', '.join(['%s'] * len(category_cids))
+        category_branch = f'''
+            UNION
+            SELECT e.eid, 0 AS score
+            FROM events e
+            JOIN calendar c ON e.cid = c.cid
+            WHERE e.cid IN ({placeholders}) {filters}
+        '''
+        args += category_cids + args[1:]
+
+    curs.execute(f'''
+        SELECT e.eid, e.title, e.desc, e.date, e.start, e.end,
+               e.city, e.state, e.cap, c.category, m.score
+        FROM (SELECT eid, MAX(score) AS score
+              FROM (SELECT e.eid,
+                           MATCH(e.title, e.desc, e.city, e.state)
+                               AGAINST (%s IN BOOLEAN MODE) AS score
+                    FROM events e
+                    JOIN calendar c ON e.cid = c.cid
+                    WHERE MATCH(e.title, e.desc, e.city, e.state)
+                              AGAINST (%s IN BOOLEAN MODE) {filters}
+                    {category_branch}) hits
+              GROUP BY eid) m
+        JOIN events e ON e.eid = m.eid
+        JOIN calendar c ON e.cid = c.cid
+        ORDER BY m.score DESC, e.date ASC, e.eid ASC
+        LIMIT %s OFFSET %s
+    ''', [terms] + args + [limit + 1, offset])
+    return curs.fetchall()
@@ -0,0 +1,569 @@
+"""
+series.py - Database functions for recurring event series
+authors: Beatrix Kim, Bessie Li, Samiksha Singh
+
+A series is stored once, as its rule (migrations/006_event_series.sql),
+and expanded into occurrences only for the dates a query asks about.
+Occurrences are dicts shaped like event.RANGE_EVENTS_SQL rows, with
+eid None and the series' sid, so the calendar can show both alike.
+"""
+import heapq
+from datetime import date, timedelta
+
+import cs304dbi as dbi
+import notify
+
+# Series with an occurrence that may fall in [start, end], with their
+# exceptions inside the range (one row per exception, or one with NULL
+# exception columns). {series_filter} is from series_filter. See the
+# event_series_dates index
+CANDIDATE_SERIES_SQL = '''
+    SELECT s.sid, s.title, s.start, s.end, s.desc, s.city, s.state,
+           s.cap, s.filename, s.updated_at, s.first_date, s.last_date,
+           s.interval_weeks, c.category,
+           x.date AS exception_date, x.cancelled, x.start AS moved_start,
+           x.end AS moved_end, x.updated_at AS exception_updated_at
+    FROM event_series s
+    JOIN calendar c ON s.cid = c.cid
+    LEFT JOIN series_exceptions x
+        ON x.sid = s.sid AND x.date BETWEEN %s AND %s
+    WHERE s.last_date >= %s AND s.first_date <= %s {series_filter}
+'''
+
+# The occurrences on or after a date that a user joined, with their
+# exceptions (NULL exception columns if none). Joins of their own
+# series are left to CANDIDATE_SERIES_SQL
+JOINED_OCCURRENCES_SQL = '''
+    SELECT s.sid, s.title, s.start, s.end, s.desc, s.city, s.state,
+           s.cap, s.filename, s.updated_at, c.category, sp.date,
+           x.cancelled, x.start AS moved_start, x.end AS moved_end,
+           x.updated_at AS exception_updated_at
+    FROM series_participants sp
+    JOIN event_series s ON sp.sid = s.sid
+    JOIN calendar c ON s.cid = c.cid
+    LEFT JOIN series_exceptions x ON x.sid = sp.sid AND x.date = sp.date
+    WHERE sp.uid = %s AND sp.date >= %s AND s.addedBy != %s
+'''
+
+# Fingerprints of get_feed_occurrences' rows for a feed's ETag, like
+# event.FEED_STAMP_SQL: the series (and their exceptions) still running
+# on or after a date, and the occurrences a user joined
+FEED_SERIES_STAMP_SQL = '''
+    SELECT COUNT(*) AS series_rows,
+           COALESCE(BIT_XOR(CRC32(CONCAT_WS('|', s.sid, s.updated_at,
+                                            x.date, x.updated_at))),
+                    0) AS checksum
+    FROM event_series s
+    JOIN calendar c ON s.cid = c.cid
+    LEFT JOIN series_exceptions x ON x.sid = s.sid AND x.date >= %s
+    WHERE s.last_date >= %s {series_filter}
+'''
+
+FEED_JOINED_STAMP_SQL = '''
+    SELECT COUNT(*) AS joined,
+           COALESCE(BIT_XOR(CRC32(CONCAT_WS('|', sp.sid, sp.date,
+                                            s.updated_at, x.updated_at))),
+                    0) AS checksum
+    FROM series_participants sp
+    JOIN event_series s ON sp.sid = s.sid
+    LEFT JOIN series_exceptions x ON x.sid = sp.sid AND x.date = sp.date
+    WHERE sp.uid = %s AND sp.date >= %s AND s.addedBy != %s
+'''
+
+SERIES_BY_ID_SQL = '''
+    SELECT s.sid, s.title, s.start, s.end, s.desc, s.city, s.state,
+           s.cap, s.flexible, s.addedBy, s.cid, s.filename, s.updated_at,
+           s.first_date, s.last_date, s.interval_weeks,
+           p.name AS creator_name, p.year AS creator_year,
+           p.pronouns AS creator_pronouns, c.category
+    FROM event_series s
+    JOIN person p ON s.addedBy = p.uid
+    JOIN calendar c ON s.cid = c.cid
+    WHERE s.sid = %s
+'''
+
+EXCEPTION_SQL = '''
+    SELECT cancelled, start AS moved_start, end AS moved_end,
+           updated_at AS exception_updated_at
+    FROM series_exceptions
+    WHERE sid = %s AND date = %s
+'''
+
+# Version stamp for the ETag of /api/series/<sid>/<day>: the series
+# row, the day's exception (if any) and who joined that occurrence,
+# with the rule so the day can be checked without the series row
+OCCURRENCE_STAMP_SQL = '''
+    SELECT s.updated_at, s.first_date, s.last_date, s.interval_weeks,
+           x.cancelled, x.updated_at AS exception_updated_at,
+           (SELECT COUNT(*) FROM series_participants sp
+            WHERE sp.sid = s.sid AND sp.date = %s) AS joined,
+           (SELECT COALESCE(BIT_XOR(CRC32(sp.uid)), 0)
+            FROM series_participants sp
+            WHERE sp.sid = s.sid AND sp.date = %s) AS joined_checksum
+    FROM event_series s
+    LEFT JOIN series_exceptions x ON x.sid = s.sid AND x.date = %s
+    WHERE s.sid = %s
+'''
+
+OCCURRENCE_PARTICIPANTS_SQL = '''
+    SELECT p.uid, p.name, p.year, p.pronouns
+    FROM series_participants sp
+    JOIN person p ON sp.uid = p.uid
+    WHERE sp.sid = %s AND sp.date = %s
+    ORDER BY p.name
+'''
+
+
+def occurrence_dates(first_date, last_date, interval_weeks, start, end):
+    """
+    The dates a series' rule gives between start and end (inclusive),
+    computed directly rather than by walking from first_date
+    """
+    step = 7 * interval_weeks
+    skip = max(0, -(-(start - first_date).days // step))
+    day = first_date + timedelta(days=skip * step)
+    stop = min(end, last_date)
+    while day <= stop:
+        yield day
+        day += timedelta(days=step)
+
+
+def is_occurrence_date(series, day):
+    """True if the series' rule puts an occurrence on day"""
+    step = 7 * series['interval_weeks']
+    return (series['first_date'] <= day <= series['last_date']
+            and (day - series['first_date']).days % step == 0)
+
+
+def apply_exception(series, day, exception):
+    """
+    The occurrence of series on day as an event-like dict, with an
+    exception row (or None) applied. Returns None if it was cancelled
+    """
+    occurrence = {
+        'eid': None,
+        'sid': series['sid'],
+        'date': day,
+        'title': series['title'],
+        'start': series['start'],
+        'end': series['end'],
+        'desc': series['desc'],
+        'city': series['city'],
+        'state': series['state'],
+        'cap': series['cap'],
+        'filename': series['filename'],
+        'category': series['category'],
+        'updated_at': series['updated_at'],
+    }
+    if exception:
+        if exception['cancelled']:
+            return None
+        if exception['moved_start'] is not None:
+            occurrence['start'] = exception['moved_start']
+        if exception['moved_end'] is not None:
+            occurrence['end'] = exception['moved_end']
+        occurrence['updated_at'] = max(series['updated_at'],
+                                       exception['exception_updated_at'])
+    return occurrence
+
+
+def series_filter(category=None, creator=None):
+    """
+    (SQL, args) for the {series_filter} of a query on event_series s
+    and calendar c: only the series in category and/or created by the
+    user creator, if given
+    """
+    conditions = []
+    args = []
+    if category:
+        conditions.append('AND c.category = %s')
+        args.append(category)
+    if creator is not None:
+        conditions.append('AND s.addedBy = %s')
+        args.append(creator)
+    return ' '.join(conditions), args
+
+
+def get_range_occurrences(conn, start_date, end_date, category=None,
+                          creator=None):
+    """
+    Expand every series' occurrences between two dates (inclusive),
+    optionally only those in one category or created by one user.
+    Returns a list of occurrence dicts in no particular order. One
+    query, using the event_series_dates index
+    """
+    sql, filter_args = series_filter(category, creator)
+    curs = dbi.dict_cursor(conn)
+    curs.execute(CANDIDATE_SERIES_SQL.format(series_filter=sql),
+                 [start_date, end_date, start_date, end_date, *filter_args])
+
+    # one row per (series, exception in range)
+    series_rows = {}
+    exceptions = {}
+    for row in curs.fetchall():
+        series_rows.setdefault(row['sid'], row)
+        if row['exception_date'] is not None:
+            exceptions[(row['sid'], row['exception_date'])] = row
+
+    occurrences = []
+    for sid, row in series_rows.items():
+        for day in occurrence_dates(row['first_date'], row['last_date'],
+                                    row['interval_weeks'],
+                                    start_date, end_date):
+            occurrence = apply_exception(row, day,
+                                         exceptions.get((sid, day)))
+            if occurrence:
+                occurrences.append(occurrence)
+    return occurrences
+
+
+def get_feed_occurrences(conn, since, uid=None, category=None):
+    """
+    The series occurrences of a feed (see event.feed_query) on or after
+    since: those of the series user uid created and those they joined
+    if uid is given, otherwise those of the series in category (or in
+    every category if it is None). Series repeat for a bounded number
+    of weeks, so there is no end date. A list in no particular order
+    """
+    if uid is None:
+        return get_range_occurrences(conn, since, date.max, category)
+    occurrences = get_range_occurrences(conn, since, date.max, creator=uid)
+    curs = dbi.dict_cursor(conn)
+    curs.execute(JOINED_OCCURRENCES_SQL, [uid, since, uid])
+    for row in curs.fetchall():
+        exception = row if row['exception_updated_at'] is not None else None
+        occurrence = apply_exception(row, row['date'], exception)
+        if occurrence:
+            occurrences.append(occurrence)
+    return occurrences
+
+
+def get_feed_stamp(conn, since, uid=None, category=None):
+    """Like event.get_feed_stamp, for get_feed_occurrences"""
+    curs = dbi.dict_cursor(conn)
+    if uid is None:
+        sql, filter_args = series_filter(category)
+    else:
+        sql, filter_args = series_filter(creator=uid)
+    curs.execute(FEED_SERIES_STAMP_SQL.format(series_filter=sql),
+                 [since, since, *filter_args])
+    row = curs.fetchone()
+    stamp = f"{row['series_rows']}-{row['checksum']:x}"
+    if uid is not None:
+        curs.execute(FEED_JOINED_STAMP_SQL, [uid, since, uid])
+        row = curs.fetchone()
+        stamp += f"-{row['joined']}-{row['checksum']:x}"
+    return stamp
+
+
+def add_next_occurrences(conn, series_rows, day):
+    """
+    Show each series row (with at least sid, first_date, last_date,
+    interval_weeks, start and end) as one occurrence: set its 'date',
+    'start' and 'end' to those of its next occurrence on or after day,
+    skipping cancelled ones, or of its last one if there is none, and
+    set 'participant_count' to how many take part in that occurrence
+    (the creator too). One query for the exceptions and one for the
+    counts, whatever the number of rows
+    """
+    if not series_rows:
+        return series_rows
+    sids = [row['sid'] for row in series_rows]
+    marks = ', '.join(['%s'] * len(sids))
+    curs = dbi.dict_cursor(conn)
+    curs.execute(f'''
+        SELECT sid, date, cancelled, start AS moved_start, end AS moved_end
+        FROM series_exceptions
+        WHERE sid IN ({marks}) AND date >= %s
+    ''', [*sids, day])
+    exceptions = {(row['sid'], row['date']): row for row in curs.fetchall()}
+
+    for row in series_rows:
+        step = 7 * row['interval_weeks']
+        weeks = (row['last_date'] - row['first_date']).days // step
+        row['date'] = row['first_date'] + timedelta(days=weeks * step)
+        for next_day in occurrence_dates(row['first_date'], row['last_date'],
+                                         row['interval_weeks'], day,
+                                         row['last_date']):
+            exception = exceptions.get((row['sid'], next_day))
+            if exception and exception['cancelled']:
+                continue
+            row['date'] = next_day
+            if exception and exception['moved_start'] is not None:
+                row['start'] = exception['moved_start']
+            if exception and exception['moved_end'] is not None:
+                row['end'] = exception['moved_end']
+            break
+
+    pairs = ', '.join(['(%s, %s)'] * len(series_rows))
+    curs.execute(f'''
+        SELECT sid, date, COUNT(*) AS joined
+        FROM series_participants
+        WHERE (sid, date) IN ({pairs})
+        GROUP BY sid, date
+    ''', [value for row in series_rows
+          for value in (row['sid'], row['date'])])
+    joined = {(row['sid'], row['date']): row['joined']
+              for row in curs.fetchall()}
+    for row in series_rows:
+        row['participant_count'] = joined.get((row['sid'], row['date']),
+                                              0) + 1
+    return series_rows
+
+
+def display_order(evt):
+    """Sort key matching ORDER BY date, start (NULL start first)"""
+    return (evt['date'], evt['start'] is not None,
+            evt['start'] or timedelta(0))
+
+
+def merge_by_time(events, occurrences):
+    """
+    Iterate over events (already in display order, e.g. rows streaming
+    from event.iter_range_events) and occurrences together, in display
+    order, without reading all the events first
+    """
+    return heapq.merge(events, sorted(occurrences, key=display_order),
+                       key=display_order)
+
+
+def get_series_by_id(conn, sid):
+    """
+    Get a series' rule and details, including creator info
+    Returns dictionary or None if not found
+    """
+    curs = dbi.dict_cursor(conn)
+    curs.execute(SERIES_BY_ID_SQL, [sid])
+    return curs.fetchone()
+
+
+def get_occurrence(conn, series, day):
+    """
+    The occurrence of series (a get_series_by_id row) on day, with the
+    series' creator details, or None if there isn't one
+    """
+    if not is_occurrence_date(series, day):
+        return None
+    curs = dbi.dict_cursor(conn)
+    curs.execute(EXCEPTION_SQL, [series['sid'], day])
+    occurrence = apply_exception(series, day, curs.fetchone())
+    if occurrence:
+        for key in ('flexible', 'addedBy', 'cid', 'creator_name'):
+            occurrence[key] = series[key]
+    return occurrence
+
+
+def get_occurrence_stamp(conn, sid, day):
+    """
+    Get the version stamp of one occurrence (like event.get_event_stamp)
+    Returns dictionary, or None if the series has no occurrence on day
+    (none by its rule, or cancelled)
+    """
+    curs = dbi.dict_cursor(conn)
+    curs.execute(OCCURRENCE_STAMP_SQL, [day, day, day, sid])
+    stamp = curs.fetchone()
+    if not stamp or stamp['cancelled'] or not is_occurrence_date(stamp, day):
+        return None
+    return stamp
+
+
+def get_occurrence_participants(conn, series, day):
+    """
+    Participants of one occurrence: the creator first, then everyone
+    who joined it
+    """
+    creator = {'uid': series['addedBy'], 'name': series['creator_name'],
+               'year': series['creator_year'],
+               'pronouns': series['creator_pronouns']}
+    curs = dbi.dict_cursor(conn)
+    curs.execute(OCCURRENCE_PARTICIPANTS_SQL, [series['sid'], day])
+    return [creator] + list(curs.fetchall())
+
+
+def insert_series(conn, title, date_str, last_date_str, start_str, end_str,
+                  desc, uid, city, state, cap, flexible, cid, filename,
+                  interval_weeks=1):
+    """
+    Insert a new series and its forum in one transaction and return the
+    new sid. On any error nothing is written and the error is re-raised
+    """
+    curs = dbi.cursor(conn)
+    conn.begin()
+    try:
+        curs.execute('''
+            INSERT INTO event_series
+                (title, `start`, `end`, first_date, last_date,
+                 interval_weeks, `desc`, addedBy, city, state, cap,
+                 flexible, cid, filename)
+            VALUES
+                (%s, %s, %s, %s, %s,
+                 %s, %s, %s, %s, %s, %s,
+                 %s, %s, %s)
+        ''', [title, start_str, end_str, date_str, last_date_str,
+              interval_weeks, desc, uid, city, state, cap,
+              flexible, cid, filename])
+        sid = curs.lastrowid
+        curs.execute('INSERT INTO forum (sid) VALUES (%s)', [sid])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return sid
+
+
+def is_occurrence_participant(conn, sid, day, uid):
+    """True if the user joined the occurrence of series sid on day"""
+    curs = dbi.cursor(conn)
+    curs.execute('''
+        SELECT 1 FROM series_participants
+        WHERE sid = %s AND date = %s AND uid = %s
+    ''', [sid, day, uid])
+    return curs.fetchone() is not None
+
+
+def add_occurrence_participant(conn, series, day, uid):
+    """
+    Add a user to one occurrence, if it has room (the creator counts).
+    Returns True if added, False if the occurrence is full. Like
+    forum.add_participant, the series row is locked while counting
+    """
+    curs = dbi.dict_cursor(conn)
+    try:
+        curs.execute('START TRANSACTION')
+        curs.execute('SELECT cap FROM event_series WHERE sid = %s '
+                     'FOR UPDATE', [series['sid']])
+        row = curs.fetchone()
+        if not row:
+            conn.rollback()
+            return False
+        curs.execute('''
+            SELECT COUNT(*) AS joined FROM series_participants
+            WHERE sid = %s AND date = %s
+        ''', [series['sid'], day])
+        if curs.fetchone()['joined'] + 1 >= row['cap']:
+            conn.rollback()
+            return False
+        curs.execute('''
+            INSERT INTO series_participants (sid, date, uid)
+            VALUES (%s, %s, %s)
+        ''', [series['sid'], day, uid])
+        # Tell the creator, in their next digest
+        notify.record_series_participation(curs, 'join', uid,
+                                           series['sid'])
+        conn.commit()
+        return True
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def remove_occurrence_participant(conn, sid, day, uid):
+    """Remove a user from one occurrence, notifying the series' creator"""
+    curs = dbi.cursor(conn)
+    conn.begin()
+    try:
+        curs.execute('''
+            DELETE FROM series_participants
+            WHERE sid = %s AND date = %s AND uid = %s
+        ''', [sid, day, uid])
+        if curs.rowcount:
+            notify.record_series_participation(curs, 'leave', uid, sid)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def cancel_occurrence(conn, sid, day):
+    """Cancel one occurrence, keeping the rest of the series"""
+    curs = dbi.cursor(conn)
+    conn.begin()
+    try:
+        curs.execute('''
+            INSERT INTO series_exceptions (sid, date, cancelled)
+            VALUES (%s, %s, TRUE)
+            ON DUPLICATE KEY UPDATE cancelled = TRUE
+        ''', [sid, day])
+        curs.execute('DELETE FROM series_participants WHERE sid = %s '
+                     'AND date = %s', [sid, day])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def move_occurrence(conn, sid, day, start_str, end_str):
+    """
+    Give one occurrence its own start and end times (a series_exceptions
+    row), keeping the rest of the series and who joined it
+    """
+    curs = dbi.cursor(conn)
+    curs.execute('''
+        INSERT INTO series_exceptions (sid, date, `start`, `end`)
+        VALUES (%s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE `start` = VALUES(`start`),
+                                `end` = VALUES(`end`)
+    ''', [sid, day, start_str, end_str])
+    conn.commit()
+
+
+def update_series(conn, sid, title, desc, last_date_str, start_str, end_str,
+                  city, state, cap, flexible, cid, filename=None):
+    """
+    Update a series' details, times and last date in one transaction
+    (filename None keeps the photo). Exceptions and joins of dates the
+    series no longer reaches are deleted with it. On any error nothing
+    is written and the error is re-raised
+    """
+    curs = dbi.cursor(conn)
+    photo = ', filename=%s' if filename is not None else ''
+    args = [title, desc, last_date_str, start_str, end_str, city, state,
+            cap, flexible, cid]
+    if filename is not None:
+        args.append(filename)
+    conn.begin()
+    try:
+        curs.execute(f'''
+            UPDATE event_series
+            SET title=%s, `desc`=%s, last_date=%s, `start`=%s, `end`=%s,
+                city=%s, state=%s, cap=%s, flexible=%s, cid=%s{photo}
+            WHERE sid=%s
+        ''', args + [sid])
+        for table in ('series_exceptions', 'series_participants'):
+            curs.execute(f'DELETE FROM {table} WHERE sid = %s AND date > %s',
+                         [sid, last_date_str])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def delete_series(conn, sid):
+    """
+    Delete a series with all its occurrences: its exceptions, joins and
+    forum go with it (ON DELETE CASCADE)
+    """
+    curs = dbi.cursor(conn)
+    curs.execute('DELETE FROM event_series WHERE sid = %s', [sid])
+    conn.commit()
+
+
+def get_series_profile_uids(conn, series):
+    """
+    uids whose profile dashboards show a series (a get_series_by_id
+    row): its creator and everyone who joined an upcoming occurrence.
+    Call before deleting the series
+    """
+    curs = dbi.cursor(conn)
+    curs.execute('''
+        SELECT DISTINCT uid FROM series_participants
+        WHERE sid = %s AND date >= CURDATE()
+    ''', [series['sid']])
+    return [series['addedBy']] + [row[0] for row in curs.fetchall()]
+
+
+def get_forum_stamp(conn, sid):
+    """Like forum.get_forum_stamp, for a series' shared forum"""
+    curs = dbi.dict_cursor(conn)
+    curs.execute('SELECT fid, comment_rev FROM forum WHERE sid = %s', [sid])
+    return curs.fetchone()
@@ -5,28 +5,408 @@
   Purpose:
     Displays events on a weekly calendar grid and allows users to
     view, join, leave, edit, and delete events through a detail panel.
+    Week navigation and the detail panel are served from a client cache
+    (memory + IndexedDB, revalidated with ETags), and the previous and
+    next weeks are prefetched while the browser is idle.
 */
 
 
 
 // Initialize when DOM is loaded
 document.addEventListener('DOMContentLoaded', function() {
-    // Add click handlers to event blocks
-    document.querySelectorAll('.event-block').forEach(function(eventBlock) {
-        eventBlock.addEventListener('click', function() {
-            const eventId = this.getAttribute('data-eid');
-            openEventPanel(eventId);
+    // Event blocks are redrawn on week changes, so listen on the grid
+    const grid = document.querySelector('.calendar-grid');
+    if (grid) {
+        grid.addEventListener('click', function(event) {
+            const eventBlock = event.target.closest('.event-block');
+            if (eventBlock) {
+                openEventPanel(eventBlock.dataset.api);
+            }
         });
-    });
+    }
 
     // Add click handler to close button
     const closeBtn = document.querySelector('.close-panel-btn');
     if (closeBtn) {
         closeBtn.addEventListener('click', closeEventPanel);
     }
-    
+
+    setUpWeekNavigation();
 });
 
+
+// =================================
+// CLIENT CACHE (memory + IndexedDB)
+// =================================
+
+const CACHE_DB_NAME = 'clump-cache';
+const CACHE_STORE = 'responses';
+// Entries older than this are dropped instead of revalidated
+const CACHE_MAX_AGE_MS = 7 * 24 * 60 * 60 * 1000;
+// Reuse without asking the server at all for this long
+const WEEK_FRESH_MS = 60 * 1000;
+const EVENT_FRESH_MS = 15 * 1000;
+
+const memoryCache = new Map();
+let cacheDbPromise = null;
+
+// Open the IndexedDB store once; resolves to null where unavailable
+// (e.g. some private browsing modes), leaving just the memory cache
+function openCacheDb() {
+    if (!cacheDbPromise) {
+        cacheDbPromise = new Promise(resolve => {
+            if (!window.indexedDB) {
+                resolve(null);
+                return;
+            }
+            const request = indexedDB.open(CACHE_DB_NAME, 1);
+            request.onupgradeneeded = () => {
+                request.result.createObjectStore(CACHE_STORE);
+            };
+            request.onsuccess = () => resolve(request.result);
+            request.onerror = () => resolve(null);
+        });
+    }
+    return cacheDbPromise;
+}
+
+// Look up {etag, data, savedAt} for a URL, memory first
+function readCacheEntry(url) {
+    if (memoryCache.has(url)) {
+        return Promise.resolve(memoryCache.get(url));
+    }
+    return openCacheDb().then(db => new Promise(resolve => {
+        if (!db) {
+            resolve(null);
+            return;
+        }
+        const request = db.transaction(CACHE_STORE)
+            .objectStore(CACHE_STORE).get(url);
+        request.onsuccess = () => {
+            const entry = request.result;
+            if (entry && Date.now() - entry.savedAt < CACHE_MAX_AGE_MS) {
+                memoryCache.set(url, entry);
+                resolve(entry);
+            } else {
+                resolve(null);
+            }
+        };
+        request.onerror = () => resolve(null);
+    }));
+}
+
+function writeCacheEntry(url, entry) {
+    memoryCache.set(url, entry);
+    openCacheDb().then(db => {
+        if (db) {
+            db.transaction(CACHE_STORE, 'readwrite')
+                .objectStore(CACHE_STORE).put(entry, url);
+        }
+    });
+}
+
+// Drop a URL from both caches (e.g. after joining or leaving)
+function forgetCached(url) {
+    memoryCache.delete(url);
+    openCacheDb().then(db => {
+        if (db) {
+            db.transaction(CACHE_STORE, 'readwrite')
+                .objectStore(CACHE_STORE).delete(url);
+        }
+    });
+}
+
+/**
+ * Fetch JSON through the cache. onData (optional) gets a cached copy
+ * right away, then the server's copy only if it changed. A copy younger
+ * than freshMs is used without a request; an older one is revalidated
+ * with If-None-Match, so an unchanged resource costs a bodiless 304.
+ * Resolves with the newest data.
+ */
+function cachedJSON(url, onData, freshMs) {
+    return readCacheEntry(url).then(entry => {
+        if (entry && onData) {
+            onData(entry.data);
+        }
+        if (entry && Date.now() - entry.savedAt < (freshMs || 0)) {
+            return entry.data;
+        }
+
+        const headers = {};
+        if (entry && entry.etag) {
+            headers['If-None-Match'] = entry.etag;
+        }
+        return fetch(url, { headers: headers, credentials: 'same-origin' })
+            .then(response => {
+                if (response.status === 304 && entry) {
+                    entry.savedAt = Date.now();
+                    writeCacheEntry(url, entry);
+                    return entry.data;
+                }
+                if (!response.ok) {
+                    throw new Error(
+                        `HTTP error! status: ${response.status}`);
+                }
+                const etag = response.headers.get('ETag');
+                return response.json().then(data => {
+                    if (etag) {
+                        writeCacheEntry(url, {
+                            etag: etag, data: data, savedAt: Date.now()
+                        });
+                    }
+                    if (onData) {
+                        onData(data);
+                    }
+                    return data;
+                });
+            });
+    });
+}
+
+
+// =================================
+// WEEK NAVIGATION (no page reloads)
+// =================================
+
+const MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+                'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'];
+const prefetchedWeeks = new Set();
+
+// 'YYYY-MM-DD' <-> local Date (no time zone shifts)
+function parseISODate(str) {
+    const [year, month, day] = str.split('-').map(Number);
+    return new Date(year, month - 1, day);
+}
+
+function isoDate(date) {
+    const month = String(date.getMonth() + 1).padStart(2, '0');
+    const day = String(date.getDate()).padStart(2, '0');
+    return `${date.getFullYear()}-${month}-${day}`;
+}
+
+function addDays(date, days) {
+    return new Date(date.getFullYear(), date.getMonth(),
+                    date.getDate() + days);
+}
+
+// The Sunday on or before date, like the calendar route
+function weekStartOf(date) {
+    return addDays(date, -date.getDay());
+}
+
+// Page URL for a week, matching url_for('calendar', ...)
+function weekPageUrl(weekStart, category) {
+    let url = `/calendar/${isoDate(weekStart)}`;
+    if (category && category !== 'all') {
+        url += '?' + new URLSearchParams({ category: category });
+    }
+    return url;
+}
+
+// iCalendar feed URL for a category, matching url_for('category_feed', ...)
+function categoryFeedUrl(category) {
+    return `/feeds/category/${encodeURIComponent(category || 'all')}.ics`;
+}
+
+// /api/events URL for a week's data
+function weekDataUrl(weekStart, category) {
+    const params = new URLSearchParams({
+        from: isoDate(weekStart),
+        to: isoDate(addDays(weekStart, 6))
+    });
+    if (category && category !== 'all') {
+        params.set('category', category);
+    }
+    return `/api/events?${params}`;
+}
+
+// Plain left clicks only; let ctrl/cmd-click open a new tab as usual
+function isPlainClick(event) {
+    return event.button === 0 && !event.metaKey && !event.ctrlKey &&
+        !event.shiftKey && !event.altKey;
+}
+
+function setUpWeekNavigation() {
+    const section = document.querySelector('.calendar-section');
+    if (!section || !window.history.pushState) return;
+
+    const weekStart = parseISODate(section.dataset.weekStart);
+    const category = section.dataset.category || 'all';
+    history.replaceState({ week: isoDate(weekStart), category: category },
+                         '');
+
+    const navButtons = [
+        ['prev-week-btn', () => addDays(currentWeekStart(), -7)],
+        ['next-week-btn', () => addDays(currentWeekStart(), 7)],
+        ['today-week-btn', () => weekStartOf(new Date())]
+    ];
+    navButtons.forEach(([id, targetWeek]) => {
+        const button = document.getElementById(id);
+        if (!button) return;
+        button.addEventListener('click', function(event) {
+            if (!isPlainClick(event)) return;
+            event.preventDefault();
+            showWeek(targetWeek(), section.dataset.category, true);
+        });
+    });
+
+    document.querySelectorAll('.filter-toggle').forEach(filter => {
+        filter.addEventListener('click', function(event) {
+            if (!isPlainClick(event)) return;
+            event.preventDefault();
+            showWeek(currentWeekStart(), this.dataset.category, true);
+        });
+    });
+
+    window.addEventListener('popstate', function(event) {
+        if (event.state && event.state.week) {
+            showWeek(parseISODate(event.state.week),
+                     event.state.category, false);
+        }
+    });
+
+    prefetchAdjacentWeeks(weekStart, category);
+}
+
+function currentWeekStart() {
+    const section = document.querySelector('.calendar-section');
+    return parseISODate(section.dataset.weekStart);
+}
+
+// Switch the grid to another week/category, from cache when possible
+function showWeek(weekStart, category, pushHistory) {
+    const section = document.querySelector('.calendar-section');
+    const week = isoDate(weekStart);
+    section.dataset.weekStart = week;
+    section.dataset.category = category;
+    if (pushHistory) {
+        history.pushState({ week: week, category: category }, '',
+                          weekPageUrl(weekStart, category));
+    }
+    updateWeekChrome(weekStart, category);
+
+    const isCurrent = () => section.dataset.weekStart === week &&
+        section.dataset.category === category;
+
+    cachedJSON(weekDataUrl(weekStart, category), data => {
+        // Ignore answers for a week the user already clicked away from
+        if (isCurrent()) {
+            renderWeekEvents(data);
+        }
+    }, WEEK_FRESH_MS)
+    .then(() => prefetchAdjacentWeeks(weekStart, category))
+    .catch(error => {
+        console.error('Error loading week:', error);
+        // Fall back to the server-rendered page
+        if (isCurrent()) {
+            window.location.href = weekPageUrl(weekStart, category);
+        }
+    });
+}
+
+// Header, dates, today highlight and link targets for a week
+function updateWeekChrome(weekStart, category) {
+    const weekEnd = addDays(weekStart, 6);
+    const pad = n => String(n).padStart(2, '0');
+    document.getElementById('current-week-display').textContent =
+        `Week of ${MONTHS[weekStart.getMonth()]} ${pad(weekStart.getDate())}` +
+        ` - ${MONTHS[weekEnd.getMonth()]} ${pad(weekEnd.getDate())}, ` +
+        `${weekEnd.getFullYear()}`;
+
+    const today = isoDate(new Date());
+    document.querySelectorAll('.day-column').forEach(column => {
+        const date = addDays(weekStart, Number(column.dataset.day));
+        const isToday = isoDate(date) === today;
+        column.dataset.date = isoDate(date);
+        column.classList.toggle('today-highlight', isToday);
+
+        const label = column.querySelector('.date-label');
+        label.classList.toggle('today-date', isToday);
+        label.textContent = pad(date.getDate());
+        if (isToday) {
+            const indicator = document.createElement('span');
+            indicator.className = 'today-indicator';
+            indicator.textContent = 'Today';
+            label.appendChild(indicator);
+        }
+        // Events arrive from the cache or the API
+        column.querySelector('.events-container').innerHTML = '';
+    });
+
+    document.getElementById('prev-week-btn').href =
+        weekPageUrl(addDays(weekStart, -7), category);
+    document.getElementById('next-week-btn').href =
+        weekPageUrl(addDays(weekStart, 7), category);
+    document.getElementById('today-week-btn').href =
+        weekPageUrl(weekStartOf(new Date()), category);
+    document.querySelectorAll('.filter-toggle').forEach(filter => {
+        filter.classList.toggle('active',
+                                filter.dataset.category === category);
+        filter.href = weekPageUrl(weekStart, filter.dataset.category);
+    });
+    const feedLink = document.getElementById('category-feed-link');
+    if (feedLink) {
+        feedLink.href = categoryFeedUrl(category);
+    }
+}
+
+// Fill the day columns from an /api/events payload
+function renderWeekEvents(data) {
+    const col = {};
+    data.fields.forEach((field, i) => { col[field] = i; });
+
+    const containers = {};
+    document.querySelectorAll('.day-column').forEach(column => {
+        const container = column.querySelector('.events-container');
+        container.innerHTML = '';
+        containers[column.dataset.date] = container;
+    });
+
+    data.rows.forEach(row => {
+        const container = containers[row[col.date]];
+        if (!container) return;
+
+        const block = document.createElement('div');
+        block.className = 'event-block';
+        block.dataset.eid = row[col.eid];
+        block.dataset.api = eventApiUrl(row[col.eid], row[col.sid],
+                                        row[col.date]);
+        block.dataset.category = row[col.category];
+
+        [['event-time', row[col.start]],
+         ['event-location', `${row[col.city]}, ${row[col.state]}`],
+         ['event-cal-title', row[col.title]]].forEach(([cls, text]) => {
+            const div = document.createElement('div');
+            div.className = cls;
+            div.textContent = text;
+            block.appendChild(div);
+        });
+        container.appendChild(block);
+    });
+}
+
+// API path of an event, or of one occurrence of a series, matching
+// the data-api attributes the calendar template writes
+function eventApiUrl(eid, sid, date) {
+    return sid ? `/api/series/${sid}/${date}` : `/api/event/${eid}`;
+}
+
+// Warm the cache with the weeks on either side, when the tab is idle
+function prefetchAdjacentWeeks(weekStart, category) {
+    const whenIdle = window.requestIdleCallback ||
+        (callback => setTimeout(callback, 500));
+    whenIdle(() => {
+        [-7, 7].forEach(days => {
+            const url = weekDataUrl(addDays(weekStart, days), category);
+            if (prefetchedWeeks.has(url)) return;
+            prefetchedWeeks.add(url);
+            cachedJSON(url, null, WEEK_FRESH_MS)
+                .catch(() => prefetchedWeeks.delete(url));
+        });
+    });
+}
+
+
 /**
  * Update navigation based on login status
  */
@@ -48,150 +428,28 @@ function updateNavigation(loggedIn) {
 }
 
 
-// Open event panel (split screen)
-function openEventPanel(eventId) {
+// Open event panel (split screen) for an event's API path, as given
+// by eventApiUrl
+function openEventPanel(eventUrl) {
     // Store for forum reload
-    window.currentEventId = eventId;
-    
-    // Clear previous event data and messages
-    const panel = document.getElementById('event-panel');
-    const eventActions = document.getElementById('event-actions');
-    
-    // Clear any "Event is full" messages from previous events
-    const fullMessages = eventActions.querySelectorAll('p:not(#login-prompt)');
-    fullMessages.forEach(msg => msg.remove());
+    window.currentEventUrl = eventUrl;
     
     // Show loading state
     document.getElementById('panel-event-title').textContent = 'Loading...';
     
-    fetch(`/api/event/${eventId}`)
-        .then(response => {
-            if (!response.ok) {
-                throw new Error(`HTTP error! status: ${response.status}`);
-            }
-            return response.json();
-        })
+    // A cached copy (if any) is shown at once, then replaced if stale
+    const render = data => {
+        // Skip if another event was clicked in the meantime
+        if (window.currentEventUrl === eventUrl) {
+            renderEventPanel(data);
+        }
+    };
+    cachedJSON(eventUrl, render, EVENT_FRESH_MS)
         .then(data => {
-            // Populate panel with event details
-            document.getElementById('panel-event-title')
-                .textContent = data.title;
-            document.getElementById('panel-event-date').textContent = 
-                data.date;
-            document.getElementById('panel-event-time').textContent = 
-                `${data.start} - ${data.end}`;
-            document.getElementById('panel-event-location').textContent = 
-                `${data.city}, ${data.state}`;
-            document.getElementById('panel-event-category')
-                .textContent = data.category;
-            document.getElementById('panel-event-creator')
-                .textContent = data.creator_name;
-            document.getElementById('panel-event-desc')
-                .textContent = data.desc || 'No description provided.';
-            document.getElementById('panel-event-capacity').textContent = 
-                `${data.current_participants}/${data.cap} spots filled`;
-
-            const photoEl = document.getElementById('panel-event-photo');
-            if (photoEl) {
-                if (data.photo_url) {
-                    photoEl.src = data.photo_url;
-                    photoEl.style.display = 'block';
-                } else {
-                    photoEl.removeAttribute('src');
-                    photoEl.style.display = 'none';
-                }
-            }
-            // Display participants
-            const participantsList = 
-                document.getElementById('panel-participants-list');
-            participantsList.innerHTML = '';
-            if (data.participants && data.participants.length > 0) {
-                data.participants.forEach(participant => {
-                    const li = document.createElement('li');
-                    li.textContent = 
-                        `${participant.name} (${participant.pronouns}) - 
-                        Class of ${participant.year}`;
-                    participantsList.appendChild(li);
-                });
-            } else {
-                participantsList.textContent = 'No participants yet';
-            }
-
-            // Show/hide action buttons based on user status
-            const joinBtn = document.getElementById('join-event-btn');
-            const leaveBtn = document.getElementById('leave-event-btn');
-            const editBtn = document.getElementById('edit-event-btn');
-            const deleteBtn = document.getElementById('delete-event-btn');
-            const loginPrompt = document.getElementById('login-prompt');
-
-            // Hide all buttons first
-            joinBtn.style.display = 'none';
-            leaveBtn.style.display = 'none';
-            editBtn.style.display = 'none';
-            deleteBtn.style.display = 'none';
-            loginPrompt.style.display = 'none';
-
-            if (!data.logged_in) {
-                // Not logged in - show login prompt
-                loginPrompt.style.display = 'block';
-            } else if (data.is_creator) {
-                // User is the creator - show edit/delete buttons
-                editBtn.style.display = 'inline-block';
-                deleteBtn.style.display = 'inline-block';
-                
-                // Set up edit button
-                editBtn.onclick = function() {
-                    window.location.href = `/event/${data.eid}/edit`;
-                };
-                
-                // Set up delete button
-                deleteBtn.onclick = function() {
-                    showConfirmModal(
-                        'Delete this event? This action cannot be undone.',
-                        () => deleteEvent(data.eid),
-                        'Delete Event'
-                    );
-                };
-            } else {
-                // Regular logged-in user
-                const isFull = data.current_participants >= data.cap;
-                const hasPassed = data.event_has_passed;
-                
-                if (data.is_participant) {
-                    // User is already a participant - show leave button
-                    leaveBtn.style.display = 'inline-block';
-                    leaveBtn.onclick = function() {
-                        leaveEvent(data.eid);
-                    };
-                } else if (hasPassed) {
-                    // Event has passed, show message
-                    const passedMsg = document.createElement('p');
-                    passedMsg.className = 'event-status-message';
-                    passedMsg.textContent = 'This event has passed!';
-                    eventActions.appendChild(passedMsg);
-                } else if (!isFull) { // User not participant, event not full
-                    // show join button
-                    joinBtn.style.display = 'inline-block';
-                    joinBtn.onclick = function() {
-                        joinEvent(data.eid);
-                    };
-                } else {
-                    // Event is full
-                    const fullMsg = document.createElement('p');
-                    fullMsg.className = 'event-full-message';
-                    fullMsg.textContent = 'This event is full';
-                    eventActions.appendChild(fullMsg);
-                }
-            }
-
-            // Show panel with slide-in animation (if not already open)
-            if (!panel.classList.contains('panel-open')) {
-                panel.classList.add('panel-open');
-            }
-            panel.setAttribute('aria-hidden', 'false');
-
             // Load forum comments if function exists
-            if (typeof loadForumComments === 'function') {
-                loadForumComments(data.eid, data.logged_in);
+            if (window.currentEventUrl === eventUrl &&
+                    typeof loadForumComments === 'function') {
+                loadForumComments(eventUrl, data.logged_in);
             }
         })
         .catch(error => {
@@ -200,8 +458,144 @@ function openEventPanel(eventId) {
         });
 }
 
-function deleteEvent(eventId) {
-    fetch(`/api/event/${eventId}/delete`, {
+// Fill the event panel from an /api/event/<eid> payload
+function renderEventPanel(data) {
+    const panel = document.getElementById('event-panel');
+    const eventActions = document.getElementById('event-actions');
+
+    // Clear any "Event is full" messages from earlier renders
+    const fullMessages =
+        eventActions.querySelectorAll('p:not(#login-prompt)');
+    fullMessages.forEach(msg => msg.remove());
+
+    // Populate panel with event details
+    document.getElementById('panel-event-title')
+        .textContent = data.title;
+    document.getElementById('panel-event-date').textContent = 
+        data.date;
+    document.getElementById('panel-event-time').textContent = 
+        `${data.start} - ${data.end}`;
+    document.getElementById('panel-event-location').textContent = 
+        `${data.city}, ${data.state}`;
+    document.getElementById('panel-event-category')
+        .textContent = data.category;
+    document.getElementById('panel-event-creator')
+        .textContent = data.creator_name;
+    document.getElementById('panel-event-desc')
+        .textContent = data.desc || 'No description provided.';
+    document.getElementById('panel-event-capacity').textContent = 
+        `${data.current_participants}/${data.cap} spots filled`;
+
+    const photoEl = document.getElementById('panel-event-photo');
+    if (photoEl) {
+        if (data.photo_url) {
+            photoEl.src = data.photo_url;
+            photoEl.style.display = 'block';
+        } else {
+            photoEl.removeAttribute('src');
+            photoEl.style.display = 'none';
+        }
+    }
+    // Display participants
+    const participantsList = 
+        document.getElementById('panel-participants-list');
+    participantsList.innerHTML = '';
+    if (data.participants && data.participants.length > 0) {
+        data.participants.forEach(participant => {
+            const li = document.createElement('li');
+            li.textContent = 
+                `${participant.name} (${participant.pronouns}) - 
+                Class of ${participant.year}`;
+            participantsList.appendChild(li);
+        });
+    } else {
+        participantsList.textContent = 'No participants yet';
+    }
+
+    // Show/hide action buttons based on user status
+    const joinBtn = document.getElementById('join-event-btn');
+    const leaveBtn = document.getElementById('leave-event-btn');
+    const editBtn = document.getElementById('edit-event-btn');
+    const deleteBtn = document.getElementById('delete-event-btn');
+    const loginPrompt = document.getElementById('login-prompt');
+
+    // Hide all buttons first
+    joinBtn.style.display = 'none';
+    leaveBtn.style.display = 'none';
+    editBtn.style.display = 'none';
+    deleteBtn.style.display = 'none';
+    loginPrompt.style.display = 'none';
+
+    if (!data.logged_in) {
+        // Not logged in - show login prompt
+        loginPrompt.style.display = 'block';
+    } else if (data.is_creator) {
+        // User is the creator - show edit/delete buttons (for a series
+        // occurrence, edit opens the series' form, where this date can
+        // be moved, and delete cancels just this date)
+        editBtn.style.display = 'inline-block';
+        deleteBtn.style.display = 'inline-block';
+        
+        // Set up edit button
+        const eventUrl = window.currentEventUrl;
+        editBtn.onclick = function() {
+            // an occurrence's URL ends in its date (/api/series/<sid>/<day>)
+            window.location.href = data.sid ?
+                `/series/${data.sid}/edit?day=${eventUrl.split('/').pop()}` :
+                `/event/${data.eid}/edit`;
+        };
+        
+        // Set up delete button
+        deleteBtn.onclick = function() {
+            showConfirmModal(
+                data.sid ?
+                    'Cancel this occurrence? The rest of the series stays.' :
+                    'Delete this event? This action cannot be undone.',
+                () => deleteEvent(eventUrl),
+                'Delete Event'
+            );
+        };
+    } else {
+        // Regular logged-in user
+        const isFull = data.current_participants >= data.cap;
+        const hasPassed = data.event_has_passed;
+        
+        if (data.is_participant) {
+            // User is already a participant - show leave button
+            leaveBtn.style.display = 'inline-block';
+            leaveBtn.onclick = function() {
+                leaveEvent(window.currentEventUrl);
+            };
+        } else if (hasPassed) {
+            // Event has passed, show message
+            const passedMsg = document.createElement('p');
+            passedMsg.className = 'event-status-message';
+            passedMsg.textContent = 'This event has passed!';
+            eventActions.appendChild(passedMsg);
+        } else if (!isFull) { // User not participant, event not full
+            // show join button
+            joinBtn.style.display = 'inline-block';
+            joinBtn.onclick = function() {
+                joinEvent(window.currentEventUrl);
+            };
+        } else {
+            // Event is full
+            const fullMsg = document.createElement('p');
+            fullMsg.className = 'event-full-message';
+            fullMsg.textContent = 'This event is full';
+            eventActions.appendChild(fullMsg);
+        }
+    }
+
+    // Show panel with slide-in animation (if not already open)
+    if (!panel.classList.contains('panel-open')) {
+        panel.classList.add('panel-open');
+    }
+    panel.setAttribute('aria-hidden', 'false');
+}
+
+function deleteEvent(eventUrl) {
+    fetch(`${eventUrl}/delete`, {
         method: 'DELETE'
     })
     .then(response => response.json())
@@ -220,15 +614,16 @@ function deleteEvent(eventId) {
     })
 }
 
-function joinEvent(eventId) {
-    fetch(`/api/event/${eventId}/join`, {
+function joinEvent(eventUrl) {
+    fetch(`${eventUrl}/join`, {
         method: 'POST'
     })
     .then(response => response.json())
     .then(data => {
         if (data.success) {
             // Reload the event panel to show updated participant list
-            openEventPanel(eventId);
+            forgetCached(eventUrl);
+            openEventPanel(eventUrl);
         } else {
             showFlashMessage(data.error || 'Failed to join event', 'error');
         }
@@ -240,18 +635,19 @@ function joinEvent(eventId) {
 }
 
 // Leave an event
-function leaveEvent(eventId) {
+function leaveEvent(eventUrl) {
     showConfirmModal(
         'Are you sure you want to leave this event?',
         () => {
-            fetch(`/api/event/${eventId}/leave`, {
+            fetch(`${eventUrl}/leave`, {
                 method: 'POST'
             })
             .then(response => response.json())
             .then(data => {
                 if (data.success) {
                     // Reload event panel to show updated participant list
-                    openEventPanel(eventId);
+                    forgetCached(eventUrl);
+                    openEventPanel(eventUrl);
                 } else {
                     showFlashMessage(
                         data.error || 'Failed to leave event', 'error');
@@ -278,10 +674,25 @@ function closeEventPanel() {
 // =================================
 
 
+// Turn a ?format=compact forum payload back into comment objects
+function expandComments(data) {
+    if (data.fields) {
+        data.comments = data.comments.map(values => {
+            const comment = {};
+            data.fields.forEach((field, i) => {
+                comment[field] = values[i];
+            });
+            return comment;
+        });
+    }
+    return data;
+}
+
 // Load forum comments for an event
-function loadForumComments(eventId, loggedIn) {
-    fetch(`/api/event/${eventId}/forum`)
+function loadForumComments(eventUrl, loggedIn) {
+    fetch(`${eventUrl}/forum?format=compact`)
         .then(response => response.json())
+        .then(expandComments)
         .then(data => {
             const commentsContainer = 
                 document.getElementById('forum-comments');
@@ -299,7 +710,7 @@ function loadForumComments(eventId, loggedIn) {
                 const submitBtn = 
                     document.getElementById('submit-comment-btn');
                 submitBtn.onclick = function() {
-                    submitComment(eventId);
+                    submitComment(eventUrl);
                 };
             } else {
                 commentFormContainer.style.display = 'none';
@@ -310,27 +721,23 @@ function loadForumComments(eventId, loggedIn) {
             if (data.comments && data.comments.length > 0) {
                 commentsContainer.innerHTML = '';
 
-                // Build parent → children map
-                const childrenByParent = {};
+                // Comments come in thread order (every reply after its
+                // parent), so each one nests under an element already made
+                const containerById = {};
                 data.comments.forEach(comment => {
-                    const parent = comment.parent_commId || null;
-                    if (!childrenByParent[parent]) {
-                        childrenByParent[parent] = [];
-                    }
-                    childrenByParent[parent].push(comment);
-                });
-
-                // Render top-level comments (parent_commId = null)
-                const topLevel = childrenByParent[null] || [];
-                topLevel.forEach(comment => {
                     const commentDiv = createCommentElement(
                         comment,
                         data.current_uid,
                         loggedIn,
-                        eventId,
-                        childrenByParent
+                        eventUrl
                     );
-                    commentsContainer.appendChild(commentDiv);
+                    const parent = containerById[comment.parent_commId];
+                    if (parent) {
+                        repliesOf(parent).appendChild(commentDiv);
+                    } else {
+                        commentsContainer.appendChild(commentDiv);
+                    }
+                    containerById[comment.commId] = commentDiv;
                 });
             } else {
                 commentsContainer.innerHTML = '';
@@ -354,9 +761,8 @@ function loadForumComments(eventId, loggedIn) {
         });
 }
 
-// Create a comment element (with nested replies)
-function createCommentElement(comment, currentUid, loggedIn, 
-                            eventId, childrenByParent) {
+// Create a comment element (its replies are added with repliesOf)
+function createCommentElement(comment, currentUid, loggedIn, eventUrl) {
     // Wrapper holds comment + timestamp (NOT replies)
     const wrapper = document.createElement('div');
     wrapper.className = 'forum-comment-wrapper';
@@ -386,7 +792,7 @@ function createCommentElement(comment, currentUid, loggedIn,
         replyBtn.textContent = 'Reply';
         replyBtn.className = 'action-btn reply-btn';
         replyBtn.onclick = function () {
-            showInlineReplyForm(commentDiv, comment.commId, eventId);
+            showInlineReplyForm(commentDiv, comment.commId, eventUrl);
         };
         actionsDiv.appendChild(replyBtn);
     }
@@ -397,7 +803,8 @@ function createCommentElement(comment, currentUid, loggedIn,
         deleteBtn.className = 'action-btn delete-btn';
         deleteBtn.onclick = function () {
             showConfirmModal(
-                'Delete this comment? This action cannot be undone.',
+                'Delete this comment and its replies? ' +
+                    'This action cannot be undone.',
                 () => deleteComment(comment.commId),
                 'Delete Comment'
             );
@@ -430,32 +837,23 @@ function createCommentElement(comment, currentUid, loggedIn,
     container.className = 'forum-comment-container';
     container.appendChild(wrapper);
 
-    // Replies go AFTER the wrapper, in a separate div
-    const children = 
-        (childrenByParent && childrenByParent[comment.commId]) || [];
-    if (children.length > 0) {
-        const repliesContainer = document.createElement('div');
+    return container;
+}
+
+// The div a comment container's replies go in, AFTER the wrapper
+// (created with the first reply)
+function repliesOf(container) {
+    let repliesContainer = container.querySelector(':scope > .forum-replies');
+    if (!repliesContainer) {
+        repliesContainer = document.createElement('div');
         repliesContainer.className = 'forum-replies';
-        
-        children.forEach(child => {
-            const childEl = createCommentElement(
-                child,
-                currentUid,
-                loggedIn,
-                eventId,
-                childrenByParent
-            );
-            repliesContainer.appendChild(childEl);
-        });
-        
         container.appendChild(repliesContainer);
     }
-
-    return container;
+    return repliesContainer;
 }
 
 // Show an inline reply form under a comment
-function showInlineReplyForm(commentDiv, parentCommId, eventId) {
+function showInlineReplyForm(commentDiv, parentCommId, eventUrl) {
     // Avoid adding multiple reply forms under the same comment
     if (commentDiv.querySelector('.inline-reply-form')) {
         return;
@@ -499,7 +897,7 @@ function showInlineReplyForm(commentDiv, parentCommId, eventId) {
             showFlashMessage('Reply must be 300 characters or less', 'error');
             return;
         }
-        submitReply(parentCommId, eventId, text);
+        submitReply(parentCommId, eventUrl, text);
     };
 
     cancelBtn.onclick = function() {
@@ -521,7 +919,7 @@ function showInlineReplyForm(commentDiv, parentCommId, eventId) {
 }
 
 // Send reply via AJAX and reload comments (no full page refresh)
-function submitReply(parentCommId, eventId, text) {
+function submitReply(parentCommId, eventUrl, text) {
     fetch(`/api/comment/${parentCommId}/reply`, {
         method: 'POST',
         headers: {
@@ -534,7 +932,7 @@ function submitReply(parentCommId, eventId, text) {
     .then(data => {
         if (data.success) {
             // Reload all comments for this event (still no page reload)
-            loadForumComments(eventId, true);
+            loadForumComments(eventUrl, true);
         } else {
             showFlashMessage(data.error || 'Failed to post reply', 'error');
         }
@@ -567,7 +965,7 @@ function formatCommentTime(timestamp) {
 }
 
 // Submit a new comment
-function submitComment(eventId) {
+function submitComment(eventUrl) {
     const commentText = document.getElementById('comment-text').value.trim();
     
     if (!commentText) {
@@ -580,7 +978,7 @@ function submitComment(eventId) {
         return;
     }
     
-    fetch(`/api/event/${eventId}/forum/comment`, {
+    fetch(`${eventUrl}/forum/comment`, {
         method: 'POST',
         headers: {
             'Content-Type': 'application/json'
@@ -593,7 +991,7 @@ function submitComment(eventId) {
             // Clear the textarea
             document.getElementById('comment-text').value = '';
             // Reload comments
-            loadForumComments(eventId, true);
+            loadForumComments(eventUrl, true);
         } else {
             showFlashMessage(data.error || 'Failed to post comment', 'error');
         }
@@ -613,8 +1011,8 @@ function deleteComment(commId) {
     .then(data => {
         if (data.success) {
             // Reload comments for current event
-            if (window.currentEventId) {
-                loadForumComments(window.currentEventId, true);
+            if (window.currentEventUrl) {
+                loadForumComments(window.currentEventUrl, true);
             }
         } else {
             showFlashMessage(
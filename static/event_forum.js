@@ -90,10 +90,25 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 });
 
+// Turn a ?format=compact forum payload back into comment objects
+function expandComments(data) {
+    if (data.fields) {
+        data.comments = data.comments.map(values => {
+            const comment = {};
+            data.fields.forEach((field, i) => {
+                comment[field] = values[i];
+            });
+            return comment;
+        });
+    }
+    return data;
+}
+
 // Load forum comments (reuse from calendar.js with slight modifications)
 function loadForumComments(eventId, loggedIn) {
-    fetch(`/api/event/${eventId}/forum`)
+    fetch(`/api/event/${eventId}/forum?format=compact`)
         .then(response => response.json())
+        .then(expandComments)
         .then(data => {
             const commentsContainer = document.getElementById('comments-list');
             const commentCount = document.getElementById('comment-count');
@@ -107,27 +122,25 @@ function loadForumComments(eventId, loggedIn) {
             if (data.comments && data.comments.length > 0) {
                 commentsContainer.innerHTML = '';
 
-                // Build parent → children map
-                const childrenByParent = {};
+                // Comments come in thread order (every reply after its
+                // parent), so each one nests under an element already made
+                const repliesById = {};
                 data.comments.forEach(comment => {
-                    const parent = comment.parent_commId || null;
-                    if (!childrenByParent[parent]) {
-                        childrenByParent[parent] = [];
-                    }
-                    childrenByParent[parent].push(comment);
-                });
-
-                // Render top-level comments
-                const topLevel = childrenByParent[null] || [];
-                topLevel.forEach(comment => {
                     const commentDiv = createCommentElement(
                         comment,
                         data.current_uid,
                         loggedIn,
-                        eventId,
-                        childrenByParent
+                        eventId
                     );
-                    commentsContainer.appendChild(commentDiv);
+                    const parentReplies = repliesById[comment.parent_commId];
+                    if (parentReplies) {
+                        commentDiv.classList.add('comment-reply');
+                        parentReplies.appendChild(commentDiv);
+                    } else {
+                        commentsContainer.appendChild(commentDiv);
+                    }
+                    repliesById[comment.commId] =
+                        commentDiv.querySelector(':scope > .comment-replies');
                 });
             } else {
                 commentsContainer.innerHTML = `
@@ -142,9 +155,8 @@ function loadForumComments(eventId, loggedIn) {
         });
 }
 
-// Create comment element with nested replies
-function createCommentElement(comment, currentUid, loggedIn, 
-                            eventId, childrenByParent) {
+// Create comment element with an (empty) container for its replies
+function createCommentElement(comment, currentUid, loggedIn, eventId) {
     const commentDiv = document.createElement('div');
     commentDiv.className = 'comment';
     commentDiv.dataset.commId = comment.commId;
@@ -198,7 +210,8 @@ function createCommentElement(comment, currentUid, loggedIn,
         deleteBtn.className = 'delete-comment-btn';
         deleteBtn.onclick = function() {
             showConfirmModal(
-                'Delete this comment? This action cannot be undone.',
+                'Delete this comment and its replies? ' +
+                    'This action cannot be undone.',
                 () => deleteComment(comment.commId, eventId),
                 'Delete Comment'
             );
@@ -208,24 +221,9 @@ function createCommentElement(comment, currentUid, loggedIn,
 
     commentDiv.appendChild(actionsDiv);
 
-    // Nested replies container
+    // Nested replies container (filled by loadForumComments)
     const repliesContainer = document.createElement('div');
     repliesContainer.className = 'comment-replies';
-
-    const children = 
-        (childrenByParent && childrenByParent[comment.commId]) || [];
-    children.forEach(child => {
-        const childEl = createCommentElement(
-            child,
-            currentUid,
-            loggedIn,
-            eventId,
-            childrenByParent
-        );
-        childEl.classList.add('comment-reply');
-        repliesContainer.appendChild(childEl);
-    });
-
     commentDiv.appendChild(repliesContainer);
 
     return commentDiv;
@@ -26,6 +26,19 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
     
+    // Deleting a whole series (edit form of a series) asks first
+    const deleteSeriesForm = document.getElementById('delete-series-form');
+    if (deleteSeriesForm) {
+        deleteSeriesForm.addEventListener('submit', function(e) {
+            e.preventDefault();
+            showConfirmModal(
+                'Delete every date of this event? This cannot be undone.',
+                () => deleteSeriesForm.submit(),
+                'Delete Event'
+            );
+        });
+    }
+
     // ===================================
     // SIGNUP FORM VALIDATION
     // ===================================
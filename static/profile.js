@@ -4,7 +4,7 @@
 
   Purpose:
     Makes event cards on the profile page clickable so users can
-    view full event details.
+    view full event details, and pages in past events on demand.
 */
 
 
@@ -12,16 +12,13 @@
 document.addEventListener('DOMContentLoaded', function() {
     // Handle event item clicks
     const eventItems = document.querySelectorAll('.event-item');
-    eventItems.forEach(item => {
-        item.addEventListener('click', function() {
-            const url = this.dataset.eventUrl;
-            if (url) {
-                window.location.href = url;
-            }
+    eventItems.forEach(makeClickable);
+
+    // Handle "Show Past Events" buttons (one page per click)
+    document.querySelectorAll('.load-past-btn').forEach(btn => {
+        btn.addEventListener('click', function() {
+            loadPastEvents(btn);
         });
-        
-        // Add hover cursor
-        item.style.cursor = 'pointer';
     });
 
     // Handle delete account button
@@ -36,4 +33,98 @@ document.addEventListener('DOMContentLoaded', function() {
             );
         });
     }
-});
\ No newline at end of file
+});
+
+// Open an event's page when its card is clicked
+function makeClickable(item) {
+    item.addEventListener('click', function() {
+        const url = this.dataset.eventUrl;
+        if (url) {
+            window.location.href = url;
+        }
+    });
+    
+    // Add hover cursor
+    item.style.cursor = 'pointer';
+}
+
+// Fetch the next page of past events for one section and append it
+function loadPastEvents(btn) {
+    const url = new URL(btn.dataset.url, window.location.origin);
+    if (btn.dataset.cursor) {
+        url.searchParams.set('cursor', btn.dataset.cursor);
+    }
+    btn.disabled = true;
+
+    fetch(url)
+        .then(response => {
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+            return response.json();
+        })
+        .then(data => {
+            const list = document.getElementById(btn.dataset.target);
+            data.events.forEach(evt => {
+                list.appendChild(createPastEventItem(evt, btn.dataset.kind));
+            });
+
+            if (list.children.length === 0) {
+                const empty = document.createElement('div');
+                empty.className = 'empty-state';
+                empty.textContent = 'No past events.';
+                list.appendChild(empty);
+            }
+
+            if (data.next_cursor) {
+                btn.dataset.cursor = data.next_cursor;
+                btn.textContent = 'Load More Past Events';
+                btn.disabled = false;
+            } else {
+                btn.remove();
+            }
+        })
+        .catch(error => {
+            console.error('Error loading past events:', error);
+            showFlashMessage('Failed to load past events', 'error');
+            btn.disabled = false;
+        });
+}
+
+// Build an event card matching the server-rendered ones in profile.html
+function createPastEventItem(evt, kind) {
+    const item = document.createElement('div');
+    item.className = 'event-item past-event-item';
+    item.dataset.eventUrl = evt.url;
+
+    const header = document.createElement('div');
+    header.className = 'event-item-header';
+
+    const title = document.createElement('div');
+    title.className = 'event-item-title';
+    title.textContent = evt.title;
+
+    const badge = document.createElement('span');
+    badge.className = 'event-category-badge';
+    badge.dataset.category = evt.category;
+    badge.textContent = evt.category;
+
+    header.appendChild(title);
+    header.appendChild(badge);
+
+    const info = document.createElement('div');
+    info.className = 'event-item-info';
+    if (kind === 'created') {
+        const count = evt.participant_count;
+        info.textContent = `📅 ${evt.date} at ${evt.start_formatted} • ` +
+            `👥 ${count} participant${count !== 1 ? 's' : ''}`;
+    } else {
+        info.textContent = `📅 ${evt.date} at ${evt.start_formatted} • ` +
+            `Created by ${evt.creator_name}`;
+    }
+
+    item.appendChild(header);
+    item.appendChild(info);
+    makeClickable(item);
+    return item;
+}
@@ -0,0 +1,112 @@
+"""
+conftest.py - Shared fixtures for the test suite
+authors: Beatrix Kim, Bessie Li, Samiksha Singh
+
+The tests need no MySQL server: before app.py is imported, cs304dbi's
+conf and connect are replaced, so every connection the app opens is a
+FakeConnection whose statements return no rows (unit tests can give
+one canned answers instead). querylog.py still counts each statement,
+so the per-route QUERY_BUDGETS are enforced (app.testing turns an
+over-budget request into an AssertionError).
+"""
+import cs304dbi as dbi
+import pytest
+
+
+# Aggregate statements (the feed and range version stamps) always return
+# one row, so they are answered, by a column they select, with the row
+# of an empty table
+AGGREGATE_ROWS = {
+    'AS events': [{'events': 0, 'checksum': 0, 'last_change': None}],
+    'AS series_rows': [{'series_rows': 0, 'checksum': 0}],
+    'AS joined,': [{'joined': 0, 'checksum': 0}],
+}
+
+
+class FakeCursor:
+    """A cursor of FakeConnection: records statements and returns the
+    rows of the first of its connection's answers the statement
+    contains, or none"""
+    rowcount = 0
+    lastrowid = None
+    description = None
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.rows = []
+
+    def execute(self, query, args=None):
+        self.conn.statements.append(query)
+        self.rows = next((list(rows) for text, rows in self.conn.answers
+                          if text in query), [])
+        self.rowcount = len(self.rows)
+        return self.rowcount
+
+    def executemany(self, query, args):
+        self.conn.statements.append(query)
+        return 0
+
+    def fetchone(self):
+        return self.rows.pop(0) if self.rows else None
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def fetchmany(self, size=None):
+        return self.fetchall()
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """
+    An in-memory stand-in for a cs304dbi (pymysql) connection. answers
+    maps text in a statement to the rows it returns (dicts, or tuples
+    for plain cursors), checked in order after AGGREGATE_ROWS
+    """
+
+    def __init__(self, answers=None):
+        self.statements = []
+        self.answers = list(AGGREGATE_ROWS.items())
+        self.answers += list((answers or {}).items())
+        self.committed = 0
+        self.rolled_back = 0
+
+    def cursor(self, cursor_class=None):
+        return FakeCursor(self)
+
+    def begin(self):
+        pass
+
+    def commit(self):
+        self.committed += 1
+
+    def rollback(self):
+        self.rolled_back += 1
+
+    def close(self):
+        pass
+
+
+dbi.conf = lambda db=None: {'database': db}
+dbi.connect = lambda *args, **kwargs: FakeConnection()
+
+import app as clump  # noqa: E402  (after the cs304dbi stand-ins)
+import caching  # noqa: E402
+
+
+@pytest.fixture
+def client():
+    """A test client of the app, with app.testing on and empty caches
+    (a cached page would answer without any queries)"""
+    clump.app.testing = True
+    caching.cache.clear()
+    with clump.app.test_client() as test_client:
+        yield test_client
+    caching.cache.clear()
+
@@ -0,0 +1,97 @@
+"""
+test_ics.py - Reading and writing iCalendar content lines (ics.py)
+authors: Beatrix Kim, Bessie Li, Samiksha Singh
+"""
+from datetime import date, time
+
+import pytest
+
+import ics
+
+
+def test_unfold_joins_continuations_and_drops_blank_lines():
+    lines = ['SUMMARY:Morning\r\n', ' yoga\r\n', '\tclass\r\n', '\r\n',
+             'LOCATION:Wellesley\r\n']
+    assert list(ics.unfold(lines)) == ['SUMMARY:Morningyogaclass',
+                                       'LOCATION:Wellesley']
+
+
+@pytest.mark.parametrize('line', [
+    'SUMMARY:short',
+    'DESCRIPTION:' + 'x' * 200,
+    'DESCRIPTION:' + 'é' * 100,
+    'DESCRIPTION:' + 'ab€' * 60,
+])
+def test_fold_round_trips_through_unfold(line):
+    folded = ics.fold(line)
+    assert folded.endswith('\r\n')
+    physical = folded.split('\r\n')[:-1]
+    # 75 octets a line, continuation space included
+    assert all(len(part.encode('utf-8')) <= 75 for part in physical)
+    assert list(ics.unfold(folded.splitlines(keepends=True))) == [line]
+
+
+@pytest.mark.parametrize('text', [
+    'plain',
+    'Tea, cake; and a \\ backslash',
+    'two\nlines',
+    'windows\r\nline',
+])
+def test_escape_round_trips_through_unescape(text):
+    escaped = ics.escape(text)
+    assert '\n' not in escaped
+    assert ics.unescape(escaped) == text.replace('\r\n', '\n')
+
+
+def test_parse_line_keeps_colons_in_quoted_params():
+    assert ics.parse_line('ATTENDEE;CN="Kim: Beatrix":mailto:bk@x.edu') == (
+        'ATTENDEE', {'CN': 'Kim: Beatrix'}, 'mailto:bk@x.edu')
+
+
+CALENDAR = '''BEGIN:VCALENDAR
+BEGIN:VEVENT
+SUMMARY:Tea\\, cake
+DTSTART;TZID=America/Los_Angeles:20260105T090000
+DTEND:20260105T190000Z
+BEGIN:VALARM
+DESCRIPTION:not the event's
+END:VALARM
+DESCRIPTION:first
+DESCRIPTION:second
+END:VEVENT
+BEGIN:VEVENT
+SUMMARY:All day
+DTSTART;VALUE=DATE:20260106
+END:VEVENT
+END:VCALENDAR
+'''
+
+
+def test_iter_events_reads_each_vevent():
+    first, second = ics.iter_events(CALENDAR.splitlines())
+    assert first['SUMMARY'] == ({}, 'Tea, cake')
+    # the first of a repeated property, never a nested component's
+    assert first['DESCRIPTION'] == ({}, 'first')
+    assert first['DTSTART'] == ({'TZID': 'America/Los_Angeles'},
+                                '20260105T090000')
+    assert second['DTSTART'] == ({'VALUE': 'DATE'}, '20260106')
+    assert 'DTEND' not in second
+
+
+def test_iter_events_times_convert_from_tzid_and_utc():
+    event, _ = ics.iter_events(CALENDAR.splitlines())
+    tzid = 'America/New_York'
+    params, value = event['DTSTART']
+    assert ics.parse_datetime(value, params, tzid) == (date(2026, 1, 5),
+                                                        time(12, 0))
+    params, value = event['DTEND']
+    assert ics.parse_datetime(value, params, tzid) == (date(2026, 1, 5),
+                                                        time(14, 0))
+
+
+def test_parse_datetime_keeps_floating_and_unknown_zone_times():
+    assert ics.parse_datetime('20260105T090000', {}, 'Asia/Tokyo') == (
+        date(2026, 1, 5), time(9, 0))
+    assert ics.parse_datetime('20260105T090000', {'TZID': 'Nowhere/Else'},
+                              'Asia/Tokyo') == (date(2026, 1, 5), time(9, 0))
+    assert ics.parse_datetime('20260106', {}) == (date(2026, 1, 6), None)
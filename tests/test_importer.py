@@ -0,0 +1,96 @@
+"""
+test_importer.py - Checking and inserting imported rows (importer.py)
+authors: Beatrix Kim, Bessie Li, Samiksha Singh
+"""
+from pymysql.err import IntegrityError
+
+from conftest import FakeConnection
+import form
+import importer
+
+CATEGORIES = {'sports': 1, 'arts': 2}
+
+
+def row(**values):
+    """A valid import row, with values replaced"""
+    fields = {'title': 'Pickup soccer', 'date': '2026-11-02',
+              'start': '9:30', 'end': '11:00', 'city': 'Wellesley',
+              'state': 'MA', 'description': '', 'capacity': '',
+              'category': 'Sports', 'flexible': 'yes'}
+    fields.update(values)
+    return fields
+
+
+def test_validate_rows_turns_valid_rows_into_insert_params():
+    valid, errors = importer.validate_rows([row()], CATEGORIES)
+    assert errors == []
+    assert valid == [(1, {
+        'title': 'Pickup soccer', 'date_str': '2026-11-02',
+        'start_str': '09:30', 'end_str': '11:00', 'desc': '',
+        'city': 'Wellesley', 'state': 'MA', 'cap': 10, 'cid': 1,
+        'flexible': True})]
+
+
+def test_validate_rows_reports_bad_rows_by_number():
+    rows = [row(), row(title='', start='25:00'), row(category='Chess'),
+            row(capacity='1', flexible='no')]
+    valid, errors = importer.validate_rows(rows, CATEGORIES)
+    assert [number for number, _ in valid] == [1]
+    assert errors == [
+        {'row': 2, 'errors': ['Title is required.',
+                              'Start time must be HH:MM.']},
+        {'row': 3, 'errors': ['Invalid category.']},
+        {'row': 4, 'errors': ['Capacity must be at least 2.']},
+    ]
+
+
+def test_validate_rows_treats_missing_columns_as_blank():
+    _, errors = importer.validate_rows([{'title': 'Only a title'}],
+                                       CATEGORIES)
+    assert errors[0]['errors'] == [
+        'Date is required.', 'Start time is required.',
+        'End time is required.', 'City is required.',
+        'State is required.', 'Category is required.']
+
+
+def category_rows():
+    return {'FROM calendar': [{'cid': 1, 'category': 'Sports'}]}
+
+
+def test_import_rows_inserts_chunks(monkeypatch):
+    monkeypatch.setattr(importer, 'insert_chunk',
+                        lambda conn, uid, chunk: [10 + n for n, _ in chunk])
+    report = importer.import_rows(FakeConnection(category_rows()), 'u1',
+                                  [row(), row(title=''), row()])
+    assert report['rows'] == 3
+    assert report['eids'] == [11, 13]
+    assert report['created'] == 2
+    assert [error['row'] for error in report['errors']] == [2]
+
+
+def test_chunk_mismatch_falls_back_to_row_by_row(monkeypatch):
+    def insert_chunk(conn, uid, chunk):
+        raise importer.ChunkMismatch('expected 3 new events, found 4')
+
+    def insert_event(conn, uid, filename, **params):
+        assert filename is None
+        if params['title'] == 'Duplicate':
+            raise IntegrityError(1062, "Duplicate entry 'Duplicate'")
+        inserted.append(params['title'])
+        return 100 + len(inserted)
+
+    inserted = []
+    monkeypatch.setattr(importer, 'insert_chunk', insert_chunk)
+    monkeypatch.setattr(form, 'insert_event', insert_event)
+    report = importer.import_rows(
+        FakeConnection(category_rows()), 'u1',
+        [row(title='First'), row(title='Duplicate'), row(date=''),
+         row(title='Last')])
+    assert inserted == ['First', 'Last']
+    assert report['eids'] == [101, 102]
+    # validation errors and database errors, in row order
+    assert report['errors'] == [
+        {'row': 2, 'errors': ["Could not save this event: "
+                              "Duplicate entry 'Duplicate'"]},
+        {'row': 3, 'errors': ['Date is required.']},
+    ]
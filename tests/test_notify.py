@@ -0,0 +1,164 @@
+"""
+test_notify.py - Digest text and sending (notify.py)
+authors: Beatrix Kim, Bessie Li, Samiksha Singh
+"""
+import smtplib
+from datetime import date
+from email.message import EmailMessage
+
+import pytest
+
+import notify
+
+SITE = 'https://clump.example'
+
+
+def activity(kind, actor, actor_name=None, fid=1, eid=5, text=None,
+             title='Pickup soccer'):
+    """A get_pending row"""
+    return {'nid': None, 'recipient': 'org', 'recipient_name': 'Org',
+            'email': 'org@example.edu', 'kind': kind, 'actor': actor,
+            'actor_name': actor_name or actor.title(), 'fid': fid,
+            'eid': eid, 'sid': None, 'commId': None, 'text': text,
+            'title': title}
+
+
+def test_net_participation_nets_out_changed_minds():
+    rows = [activity('join', 'ana'), activity('join', 'bo'),
+            activity('leave', 'bo'), activity('leave', 'cy'),
+            activity('join', 'cy'), activity('leave', 'di'),
+            activity('join', 'ed'), activity('leave', 'ed'),
+            activity('join', 'ed')]
+    assert notify.net_participation(rows) == (['Ana', 'Ed'], ['Di'])
+
+
+def test_snippet_shortens_to_one_line():
+    assert notify.snippet('  two\n  lines ') == '"two lines"'
+    long = notify.snippet('word ' * 40)
+    assert len(long) == notify.SNIPPET_LENGTH + 2
+    assert long.endswith('…"')
+    assert notify.snippet(None) == '(deleted)'
+
+
+def test_digest_body_truncates_comments_and_replies():
+    extra = 3
+    count = notify.QUOTED_COMMENTS + extra
+    rows = ([activity('comment', f'c{n}', text=f'comment {n}')
+             for n in range(count)]
+            + [activity('reply', f'r{n}', text=f'reply {n}')
+               for n in range(count)])
+    body = notify.digest_body('Org', rows, SITE)
+    assert f'Pickup soccer ({SITE}/forum/event/5)' in body
+    assert f'  {count} new comments:' in body
+    assert body.count(': "comment ') == notify.QUOTED_COMMENTS
+    assert f'    and {extra} more' in body
+    assert body.count('replied to your comment') == notify.QUOTED_COMMENTS
+    assert f'\n  and {extra} more' in body
+    assert f'comment {notify.QUOTED_COMMENTS}"' not in body
+
+
+def test_digest_body_groups_by_forum():
+    rows = [activity('join', 'ana'),
+            activity('comment', 'bo', fid=2, eid=6, title='Book club',
+                     text='See you there'),
+            activity('leave', 'cy')]
+    body = notify.digest_body('Org', rows, SITE)
+    assert body.startswith('Hi Org,')
+    soccer, book = body.index('Pickup soccer'), body.index('Book club')
+    assert soccer < body.index('Joined: Ana') < body.index('Left: Cy') < book
+    assert '  1 new comment:\n    Bo: "See you there"' in body
+
+
+def test_forum_url_links_series_to_their_next_occurrence():
+    row = dict(activity('join', 'ana', eid=None, title='Run club'),
+               sid=7, first_date=date(2026, 1, 5),
+               last_date=date(2026, 3, 30), interval_weeks=2)
+    assert notify.forum_url(row, SITE, today=date(2026, 1, 6)) == (
+        f'{SITE}/calendar/2026-01-19')
+    assert notify.forum_url(row, SITE, today=date(2026, 1, 1)) == (
+        f'{SITE}/calendar/2026-01-05')
+    # once the series is over, its last occurrence
+    assert notify.forum_url(row, SITE, today=date(2026, 6, 1)) == (
+        f'{SITE}/calendar/2026-03-30')
+    assert notify.forum_url(activity('join', 'ana'), SITE) == (
+        f'{SITE}/forum/event/5')
+
+
+class FakeSMTP:
+    """Stands in for smtplib.SMTP: send_message raises the error given
+    for a recipient, if any, and otherwise keeps the message"""
+
+    def __init__(self, errors):
+        self.errors = errors
+        self.sent = []
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.closed = True
+
+    def send_message(self, message):
+        error = self.errors.get(message['To'])
+        if error:
+            raise error
+        self.sent.append(message['To'])
+
+
+def digest(to, nids):
+    message = EmailMessage()
+    message['To'] = to
+    return nids, message
+
+
+def test_send_batch_drops_permanent_refusals():
+    smtp = FakeSMTP({
+        'gone@x.edu': smtplib.SMTPResponseException(550, b'no mailbox'),
+        'bad@x.edu': smtplib.SMTPRecipientsRefused({}),
+    })
+    delivered = []
+    accepted = notify.send_batch(lambda: smtp, [digest('a@x.edu', [1, 2]),
+                                                digest('gone@x.edu', [3]),
+                                                digest('bad@x.edu', [4]),
+                                                digest('b@x.edu', [5])],
+                                 delivered)
+    assert accepted == 2
+    assert smtp.sent == ['a@x.edu', 'b@x.edu']
+    # refused digests are marked sent too, so they aren't retried
+    assert delivered == [1, 2, 3, 4, 5]
+    assert smtp.closed
+
+
+def test_send_batch_raises_temporary_failures():
+    smtp = FakeSMTP({
+        'busy@x.edu': smtplib.SMTPResponseException(451, b'try later'),
+    })
+    delivered = []
+    with pytest.raises(smtplib.SMTPResponseException):
+        notify.send_batch(lambda: smtp, [digest('a@x.edu', [1]),
+                                         digest('busy@x.edu', [2]),
+                                         digest('b@x.edu', [3])], delivered)
+    # what the server took is kept; the rest waits for the next cycle
+    assert smtp.sent == ['a@x.edu']
+    assert delivered == [1]
+    assert smtp.closed
+
+
+def test_dispatch_counts_only_accepted_digests(monkeypatch):
+    rows = [dict(activity('join', 'ana'), nid=1),
+            dict(activity('join', 'bo'), nid=2, recipient='gone',
+                 email='gone@x.edu'),
+            dict(activity('join', 'cy'), nid=3, recipient='b',
+                 email='b@x.edu')]
+    marked = []
+    monkeypatch.setattr(notify, 'get_pending', lambda conn, limit: rows)
+    monkeypatch.setattr(notify, 'mark_sent',
+                        lambda conn, nids: marked.extend(nids))
+    smtp = FakeSMTP({
+        'gone@x.edu': smtplib.SMTPResponseException(550, b'no mailbox'),
+    })
+    sent = notify.dispatch(None, lambda: smtp, 'clump@x.edu', SITE,
+                           batch_size=2)
+    assert sent == 2
+    assert sorted(marked) == [1, 2, 3]
@@ -0,0 +1,59 @@
+"""
+test_query_budgets.py - Per-route statement budgets (QUERY_BUDGETS)
+authors: Beatrix Kim, Bessie Li, Samiksha Singh
+"""
+import pytest
+
+from conftest import clump
+
+# A request to each budgeted endpoint (see QUERY_BUDGETS in app.py),
+# and whether it needs a login
+BUDGETED_REQUESTS = [
+    ('calendar', '/calendar/2026-10-21', False),
+    ('forum', '/forum', False),
+    ('view_event_forum', '/forum/event/1', False),
+    ('profile', '/profile', True),
+    ('get_event_details', '/api/event/1', False),
+    ('get_event_forum', '/api/event/1/forum', False),
+    ('api_search_events', '/api/search?q=yoga', False),
+    ('api_range_events', '/api/events?from=2026-10-18&to=2026-10-24',
+     False),
+    ('user_feed', '/feeds/user/abc.ics', False),
+    ('category_feed', '/feeds/category/all.ics', False),
+    ('get_comment_thread', '/api/comment/1/thread', False),
+]
+
+
+def test_every_budget_is_exercised():
+    assert ({endpoint for endpoint, _, _ in BUDGETED_REQUESTS}
+            == set(clump.app.config['QUERY_BUDGETS']))
+
+
+@pytest.mark.parametrize('endpoint, path, login', BUDGETED_REQUESTS)
+def test_request_within_budget(client, endpoint, path, login):
+    if login:
+        with client.session_transaction() as session:
+            session['uid'] = 1
+    response = client.get(path)
+    assert response.status_code < 500
+    assert clump.app.url_map.bind('').match(path.split('?')[0])[0] \
+        == endpoint
+
+
+@pytest.mark.parametrize('endpoint, path, login', BUDGETED_REQUESTS)
+def test_request_over_budget_fails(client, monkeypatch, endpoint, path,
+                                   login):
+    # every endpoint runs at least one statement
+    monkeypatch.setitem(clump.app.config['QUERY_BUDGETS'], endpoint, 0)
+    if login:
+        with client.session_transaction() as session:
+            session['uid'] = 1
+    with pytest.raises(AssertionError, match=rf'{endpoint} ran \d+ '
+                                             r'queries \(budget 0\)'):
+        client.get(path)
+
+
+def test_budget_only_fails_under_testing(client, monkeypatch):
+    monkeypatch.setitem(clump.app.config['QUERY_BUDGETS'], 'forum', 0)
+    monkeypatch.setattr(clump.app, 'testing', False)
+    assert client.get('/forum').status_code == 200
@@ -0,0 +1,139 @@
+"""
+test_series.py - Expanding series rules into occurrences (series.py)
+authors: Beatrix Kim, Bessie Li, Samiksha Singh
+"""
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import series
+
+MONDAY = date(2026, 1, 5)
+
+
+def make_series(**values):
+    """A series row as SERIES_BY_ID_SQL returns it, with values replaced"""
+    row = {'sid': 7, 'title': 'Run club', 'first_date': MONDAY,
+           'last_date': date(2026, 3, 30), 'interval_weeks': 1,
+           'start': timedelta(hours=7), 'end': timedelta(hours=8),
+           'desc': '', 'city': 'Wellesley', 'state': 'MA', 'cap': 10,
+           'filename': None, 'category': 'Sports',
+           'updated_at': datetime(2026, 1, 1, 12, 0)}
+    row.update(values)
+    return row
+
+
+@pytest.mark.parametrize('interval, start, end, expected', [
+    # a range before the first date starts at the first date
+    (1, date(2025, 12, 1), date(2026, 1, 20),
+     [MONDAY, date(2026, 1, 12), date(2026, 1, 19)]),
+    # mid-series ranges skip straight to the next occurrence
+    (2, date(2026, 1, 6), date(2026, 2, 2),
+     [date(2026, 1, 19), date(2026, 2, 2)]),
+    (3, date(2026, 1, 26), date(2026, 2, 16), [date(2026, 1, 26),
+                                               date(2026, 2, 16)]),
+    # a range between two occurrences has none
+    (2, date(2026, 1, 6), date(2026, 1, 18), []),
+    # nothing after the last date
+    (4, date(2026, 3, 1), date(2026, 12, 31), [date(2026, 3, 2),
+                                               date(2026, 3, 30)]),
+])
+def test_occurrence_dates(interval, start, end, expected):
+    dates = series.occurrence_dates(MONDAY, date(2026, 3, 30), interval,
+                                    start, end)
+    assert list(dates) == expected
+
+
+def test_occurrence_dates_match_walking_the_rule():
+    last = date(2026, 12, 28)
+    for interval in (1, 2, 3, 5):
+        walked = [MONDAY + timedelta(weeks=interval * n) for n in range(60)]
+        walked = [day for day in walked if day <= last]
+        for offset in range(0, 70, 3):
+            start = MONDAY + timedelta(days=offset)
+            end = start + timedelta(days=45)
+            expected = [day for day in walked if start <= day <= end]
+            assert list(series.occurrence_dates(
+                MONDAY, last, interval, start, end)) == expected
+            assert all(series.is_occurrence_date(
+                make_series(interval_weeks=interval, last_date=last), day)
+                for day in expected)
+
+
+@pytest.mark.parametrize('day, expected', [
+    (MONDAY, True),
+    (date(2026, 1, 19), True),
+    (date(2026, 1, 12), False),   # an off week
+    (date(2026, 1, 6), False),    # not a Monday
+    (date(2025, 12, 22), False),  # before the first date
+    (date(2026, 4, 13), False),   # after the last date
+])
+def test_is_occurrence_date(day, expected):
+    assert series.is_occurrence_date(make_series(interval_weeks=2),
+                                     day) is expected
+
+
+def test_apply_exception_without_one_copies_the_series():
+    occurrence = series.apply_exception(make_series(), MONDAY, None)
+    assert occurrence['eid'] is None
+    assert occurrence['sid'] == 7
+    assert occurrence['date'] == MONDAY
+    assert (occurrence['start'], occurrence['end']) == (
+        timedelta(hours=7), timedelta(hours=8))
+
+
+def exception(**values):
+    row = {'cancelled': False, 'moved_start': None, 'moved_end': None,
+           'exception_updated_at': datetime(2026, 1, 2, 9, 0)}
+    row.update(values)
+    return row
+
+
+def test_apply_exception_cancelled():
+    assert series.apply_exception(make_series(), MONDAY,
+                                  exception(cancelled=True)) is None
+
+
+def test_apply_exception_moved():
+    occurrence = series.apply_exception(
+        make_series(), MONDAY, exception(moved_start=timedelta(hours=18),
+                                         moved_end=timedelta(hours=19)))
+    assert (occurrence['start'], occurrence['end']) == (
+        timedelta(hours=18), timedelta(hours=19))
+    assert occurrence['updated_at'] == datetime(2026, 1, 2, 9, 0)
+
+
+def test_apply_exception_keeps_the_later_updated_at():
+    occurrence = series.apply_exception(
+        make_series(updated_at=datetime(2026, 1, 3)), MONDAY,
+        exception(moved_end=timedelta(hours=9)))
+    assert occurrence['start'] == timedelta(hours=7)
+    assert occurrence['end'] == timedelta(hours=9)
+    assert occurrence['updated_at'] == datetime(2026, 1, 3)
+
+
+def row(eid, day, hour):
+    return {'eid': eid, 'date': day,
+            'start': None if hour is None else timedelta(hours=hour)}
+
+
+def test_merge_by_time_orders_like_the_events_query():
+    events = iter([row(1, MONDAY, None), row(2, MONDAY, 9),
+                   row(3, date(2026, 1, 6), 8)])
+    occurrences = [row('b', date(2026, 1, 6), 7), row('a', MONDAY, 10),
+                   row('c', MONDAY, None)]
+    merged = series.merge_by_time(events, occurrences)
+    assert [evt['eid'] for evt in merged] == [1, 'c', 2, 'a', 'b', 3]
+
+
+def test_merge_by_time_reads_events_lazily():
+    read = []
+
+    def events():
+        for evt in (row(1, MONDAY, 9), row(2, date(2026, 1, 6), 9)):
+            read.append(evt['eid'])
+            yield evt
+
+    merged = series.merge_by_time(events(), [row('a', MONDAY, 10)])
+    assert next(merged)['eid'] == 1
+    assert read == [1]
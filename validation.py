@@ -0,0 +1,124 @@
+"""
+validation.py - Field rules for new events, shared by the create event
+form (app.create_event) and the bulk importer (importer.py)
+authors: Beatrix Kim, Bessie Li, Samiksha Singh
+"""
+from datetime import datetime
+
+
+def validate_event(title, date_str, start_str, end_str, city, state,
+                   desc, cap_str, cid_str):
+    """
+    Check the (stripped) text values of a new event.
+    Returns (cap, cid, start_str, end_str, errors): the capacity (10 if
+    blank) and category id as ints, or None where invalid, the start and
+    end times as HH:MM (as given if blank or invalid), and the list of
+    error messages in the order the create event form shows them
+    """
+    errors = []
+
+    # LENGTH VALIDATIONS
+    if len(title) > 30:
+        errors.append("Title must be 30 characters or less.")
+    if len(city) > 30:
+        errors.append("City must be 30 characters or less.")
+    if len(state) > 20:
+        errors.append("State must be 20 characters or less.")
+    if desc and len(desc) > 300:
+        errors.append("Description must be 300 characters or less.")
+
+    #required field checks
+    if not title:
+        errors.append("Title is required.")
+    if not date_str:
+        errors.append("Date is required.")
+    if not start_str:
+        errors.append("Start time is required.")
+    if not end_str:
+        errors.append("End time is required.")
+    if not city:
+        errors.append("City is required.")
+    if not state:
+        errors.append("State is required.")
+    if not cid_str:
+        errors.append("Category is required.")
+
+    # FORMAT VALIDATIONS (the form's date/time inputs always pass these)
+    if date_str and not _parses(date_str, '%Y-%m-%d'):
+        errors.append("Invalid date format.")
+    start = parse_time(start_str)
+    end = parse_time(end_str)
+    for label, value, parsed in (('Start', start_str, start),
+                                 ('End', end_str, end)):
+        if value and parsed is None:
+            errors.append(f"{label} time must be HH:MM.")
+
+    # TIME VALIDATION (as times: '9:30' is before '10:30')
+    if start and end and start > end:
+        errors.append("End time cannot be before start time.")
+    if start:
+        start_str = start.strftime('%H:%M')
+    if end:
+        end_str = end.strftime('%H:%M')
+
+    #capacity handling that defaults to 10
+    cap = None
+    if cap_str:
+        try:
+            cap = int(cap_str)
+            if cap < 2:
+                errors.append("Capacity must be at least 2.")
+            elif cap > 10000:
+                errors.append("Capacity cannot exceed 10,000.")
+        except (ValueError, OverflowError):
+            errors.append("Capacity must be a valid positive integer.")
+    else:
+        cap = 10
+
+    #checking valid category
+    cid = None
+    if cid_str:
+        if cid_str.isnumeric():
+            cid = int(cid_str)
+        else:
+            errors.append("Invalid category.")
+
+    return cap, cid, start_str, end_str, errors
+
+
+def parse_time(value):
+    """A time given as H:MM or H:MM:SS, or None if it isn't one"""
+    for fmt in ('%H:%M', '%H:%M:%S'):
+        try:
+            return datetime.strptime(value, fmt).time()
+        except ValueError:
+            pass
+    return None
+
+
+def _parses(value, fmt):
+    """True if value matches the strptime format fmt"""
+    try:
+        datetime.strptime(value, fmt)
+        return True
+    except ValueError:
+        return False
+
+
+def validate_repeat(date_str, until_str, max_weeks):
+    """
+    Check the last date of a weekly series starting on date_str (both
+    'YYYY-MM-DD'). Returns the list of error messages
+    """
+    if not _parses(until_str, '%Y-%m-%d'):
+        return ["Invalid repeat until date."]
+    if not _parses(date_str, '%Y-%m-%d'):
+        # reported by validate_event
+        return []
+    first = datetime.strptime(date_str, '%Y-%m-%d').date()
+    last = datetime.strptime(until_str, '%Y-%m-%d').date()
+    if last <= first:
+        return ["Repeat until must be after the event date."]
+    if (last - first).days // 7 >= max_weeks:
+        return [f"A series can repeat for at most {max_weeks} weeks."]
+    return []